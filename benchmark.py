@@ -0,0 +1,198 @@
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import manyToOneSat as M
+
+#
+# Benchmark suite: time every axiom of manyToOneSat and saveCNF over a grid of market sizes, keep the results in a JSON history and compare runs
+#
+#   python benchmark.py run [--grid 2x2,2x3,3x2] [--axioms fair,nonWasteful] [--timeout 600] [--history benchmark-history.json]
+#   python benchmark.py compare [--base REV] [--head REV] [--threshold 0.2] [--history benchmark-history.json]
+#
+
+DEFAULT_GRID = [(2, 2), (2, 3), (3, 2)]
+DEFAULT_HISTORY = 'benchmark-history.json'
+MAX_PROFILES = 10**7  # markets with more profiles than this are recorded as skipped instead of run
+NOISE = 0.05  # differences of less seconds than this are never a regression
+
+
+def gitRevision():  # the commit the benchmark runs on, with '+' when the tree has changes
+    try:
+        here = os.path.dirname(os.path.abspath(__file__))
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=here, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=here, capture_output=True, text=True, check=True).stdout.strip()
+        return rev + ('+' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def countLines(filename):
+    count = 0
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            count += block.count(b'\n')
+    return count
+
+def peakRSS():  # the peak resident set size of this process in bytes
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+def axiomJob(n, m, axiom, workdir):  # write the CNF of axiom in workdir and return its measures; runs in a fresh process
+    os.chdir(workdir)
+    mk = M.Market(n, m, cache=False)
+    start = time.time()
+    mk.writeAxiom(axiom)
+    seconds = time.time() - start
+    filename = mk.axiomFilename(axiom)
+    clauses = countLines(filename)
+    return {'seconds': seconds, 'clauses': clauses, 'clausesPerSecond': clauses / seconds if seconds > 0 else None, 'bytes': os.path.getsize(filename), 'peakRSS': peakRSS()}
+
+def saveCNFJob(n, m, axioms, workdir):  # join the CNFs of axioms written in workdir with saveCNF and return its measures; runs in a fresh process
+    os.chdir(workdir)
+    mk = M.Market(n, m, cache=False)
+    filenames = [mk.axiomFilename(axiom) for axiom in axioms]
+    start = time.time()
+    mk.saveCNF(filenames, 'all.cnf', 'all.dict')
+    seconds = time.time() - start
+    clauses = sum(countLines(filename) for filename in filenames)
+    return {'seconds': seconds, 'clauses': clauses, 'clausesPerSecond': clauses / seconds if seconds > 0 else None, 'bytes': os.path.getsize('all.cnf'), 'peakRSS': peakRSS(), 'inputs': list(axioms)}
+
+def runIsolated(job, args, timeout):  # run job(*args) in its own process, so that its peak memory is its own; return (status, measures)
+    pool = multiprocessing.Pool(1, maxtasksperchild=1)
+    try:
+        measures = pool.apply_async(job, args).get(timeout)
+        return ('ok', measures)
+    except multiprocessing.TimeoutError:
+        return ('timeout', {})
+    except Exception as e:
+        return ('error: ' + repr(e), {})
+    finally:
+        pool.terminate()
+        pool.join()
+
+def runSuite(grid, axioms, timeout, maxProfiles=MAX_PROFILES):  # return the results of every axiom and of saveCNF over the grid, printing them as they come
+    results = []
+    for n, m in grid:
+        allPH, allPI, allPQ = M.Market(n, m).profileCounts()
+        workdir = tempfile.mkdtemp(prefix='benchmark')
+        os.mkdir(os.path.join(workdir, 'data'))
+        written = []
+        try:
+            for axiom in axioms + ['saveCNF']:
+                if allPH * allPI * allPQ > maxProfiles:
+                    status, measures = ('skipped', {})
+                elif axiom == 'saveCNF':
+                    status, measures = runIsolated(saveCNFJob, (n, m, written, workdir), timeout) if written else ('skipped', {})
+                else:
+                    status, measures = runIsolated(axiomJob, (n, m, axiom, workdir), timeout)
+                    if status == 'ok':
+                        written.append(axiom)
+                result = dict({'n': n, 'm': m, 'axiom': axiom, 'status': status}, **measures)
+                results.append(result)
+                print(describe(result), flush=True)
+        finally:
+            shutil.rmtree(workdir)
+    return results
+
+def describe(result):
+    s = '(' + str(result['n']) + ',' + str(result['m']) + ') ' + result['axiom'].ljust(36)
+    if result['status'] != 'ok':
+        return s + result['status']
+    return s + str(round(result['seconds'], 2)).rjust(9) + 's ' + str(result['clauses']).rjust(11) + ' clauses ' + str(int(result['clausesPerSecond'] or 0)).rjust(9) + ' clauses/s ' + str(result['bytes'] >> 10).rjust(9) + ' KiB ' + str(result['peakRSS'] >> 20).rjust(6) + ' MiB RSS'
+
+def loadHistory(filename):
+    if not os.path.exists(filename):
+        return []
+    with open(filename, 'r') as file:
+        return json.load(file)
+
+def appendHistory(filename, run):  # add a run to the history, atomically
+    history = loadHistory(filename)
+    history.append(run)
+    with open(filename + '.tmp', 'w') as file:
+        json.dump(history, file, indent=1)
+    os.replace(filename + '.tmp', filename)
+
+def findRun(history, revision):  # the last run of the history on revision (a prefix of it), or the last run when revision is None
+    for run in reversed(history):
+        if revision is None or run['revision'].startswith(revision):
+            return run
+    raise SystemExit('no benchmark run of ' + str(revision) + ' in the history')
+
+def compareRuns(base, head, threshold):  # print the differences between two runs and return the regressions: slower by more than threshold (relative) and NOISE (absolute), or a different output
+    regressions = []
+    baseResults = {(r['n'], r['m'], r['axiom']): r for r in base['results']}
+    for r in head['results']:
+        key = (r['n'], r['m'], r['axiom'])
+        b = baseResults.get(key)
+        if b is None or b['status'] != 'ok' or r['status'] != 'ok' or b.get('inputs') != r.get('inputs'):
+            continue
+        ratio = r['seconds'] / b['seconds'] if b['seconds'] > 0 else 1.0
+        flags = []
+        if r['seconds'] - b['seconds'] > NOISE and ratio > 1 + threshold:
+            flags.append('SLOWER')
+        if r['clauses'] != b['clauses'] or r['bytes'] != b['bytes']:
+            flags.append('OUTPUT CHANGED')
+        print('(' + str(key[0]) + ',' + str(key[1]) + ') ' + key[2].ljust(36) + str(round(b['seconds'], 2)).rjust(9) + 's -> ' + str(round(r['seconds'], 2)).rjust(9) + 's  x' + str(round(ratio, 2)).ljust(6) + ' ' + ' '.join(flags))
+        if flags:
+            regressions.append((key, flags))
+    return regressions
+
+def parseGrid(text):
+    return [tuple(int(x) for x in size.split('x')) for size in text.split(',')]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='benchmark the CNF generators of manyToOneSat')
+    parser.add_argument('--history', default=DEFAULT_HISTORY)
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='run the suite and append it to the history')
+    run.add_argument('--grid', type=parseGrid, default=DEFAULT_GRID, help='market sizes as NxM,NxM,... (default 2x2,2x3,3x2)')
+    run.add_argument('--axioms', type=lambda text: text.split(','), default=list(M.AXIOMS), help='axioms of manyToOneSat.AXIOMS, comma separated (default all)')
+    run.add_argument('--timeout', type=float, default=600, help='seconds before a job is recorded as timed out')
+    run.add_argument('--max-profiles', type=int, default=MAX_PROFILES, help='skip the markets with more profiles')
+    compare = commands.add_parser('compare', help='compare two runs of the history; exit with 1 on a regression')
+    compare.add_argument('--base', help='revision of the base run (default: the run before the head run)')
+    compare.add_argument('--head', help='revision of the head run (default: the last run)')
+    compare.add_argument('--threshold', type=float, default=0.2, help='relative slow-down counted as a regression')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        for axiom in args.axioms:
+            if axiom not in M.AXIOMS:
+                parser.error('unknown axiom: ' + axiom)
+        results = runSuite(args.grid, args.axioms, args.timeout, args.max_profiles)
+        appendHistory(args.history, {
+            'revision': gitRevision(),
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': results,
+        })
+        return 0
+
+    history = loadHistory(args.history)
+    head = findRun(history, args.head)
+    if args.base is None:
+        earlier = history[:history.index(head)]
+        if not earlier:
+            raise SystemExit('the history has no run before ' + head['revision'])
+        base = earlier[-1]
+    else:
+        base = findRun(history, args.base)
+    print('base ' + base['revision'] + ' (' + base['date'] + ')  head ' + head['revision'] + ' (' + head['date'] + ')')
+    regressions = compareRuns(base, head, args.threshold)
+    print(str(len(regressions)) + ' regression(s)')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
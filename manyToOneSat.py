@@ -1,8 +1,19 @@
-from math import factorial
+from math import comb, factorial, isqrt, log10
 from itertools import permutations
-from itertools import chain,combinations
-from collections import defaultdict
-import pickle
+from itertools import chain,combinations,product,islice
+from array import array
+from functools import cached_property
+import contextlib
+import hashlib
+import heapq
+import inspect
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import time
 
 #
 # Tools
@@ -13,780 +24,3342 @@ def powerset(iterable):  # takes an iterable object and returns an iterable obje
     s = list(iterable)
     return chain.from_iterable(combinations(s, r) for r in range(len(s)+1))
 
+def permutationIndex(perm):  # return the position of the permutation perm of range(len(perm)) in the order of permutations(), i.e. its index format
+    rest = sorted(perm)
+    index = 0
+    for k, x in enumerate(perm):
+        j = rest.index(x)
+        index += j * factorial(len(perm) - k - 1)
+        del rest[j]
+    return index
+
+def indexToPermutation(index, size):  # inverse of permutationIndex: the index-th permutation of range(size)
+    rest = list(range(size))
+    perm = []
+    for k in range(size-1, -1, -1):
+        j, index = divmod(index, factorial(k))
+        perm.append(rest.pop(j))
+    return tuple(perm)
+
+def digitCount(lo, hi):  # return the total number of decimal digits of the integers lo..hi (lo >= 1)
+    total = 0
+    low, digits = 1, 1
+    while low <= hi:
+        high = low * 10 - 1
+        if high >= lo:
+            total += digits * (min(hi, high) - max(lo, low) + 1)
+        low, digits = low * 10, digits + 1
+    return total
+
+class MixedRadix:  # numbers written with digits d[0] (least significant) .. d[k-1], d[j] < radices[j], as offset + sum d[j] * weights[j]
+    # the weights default to the products of the lower radices; larger weights (as in the literals of posLiteral) work as long as every weight exceeds what the lower digits can add up to
+    def __init__(self, radices, weights=None, offset=0):
+        self.radices = tuple(radices)
+        if weights is None:
+            weights = [1]
+            for r in self.radices[:-1]:
+                weights.append(weights[-1] * r)
+        self.weights = tuple(weights)
+        self.offset = offset
+
+    def size(self):  # the number of digit tuples
+        size = 1
+        for r in self.radices:
+            size *= r
+        return size
+
+    def encode(self, digits):
+        return self.offset + sum(d * w for d, w in zip(digits, self.weights))
+
+    def decode(self, x):  # return the digits of x, the least significant first
+        rest = x - self.offset
+        digits = [0] * len(self.radices)
+        for j in range(len(self.radices) - 1, -1, -1):
+            digits[j], rest = divmod(rest, self.weights[j])
+        return tuple(digits)
+
+    def digit(self, x, j):
+        return ((x - self.offset) // self.weights[j]) % self.radices[j]
+
+    def odometer(self):  # generate the digit tuples of all numbers in increasing order, by carrying instead of dividing
+        if self.size() == 0:
+            return
+        digits = [0] * len(self.radices)
+        while True:
+            yield tuple(digits)
+            j = 0
+            while j < len(digits):
+                digits[j] += 1
+                if digits[j] < self.radices[j]:
+                    break
+                digits[j] = 0
+                j += 1
+            else:
+                return
+
+    def encodeBatch(self, columns):  # encode the digit columns (column j holds the j-th digits); NumPy columns are encoded with array arithmetic
+        if hasattr(columns[0], 'dtype'):
+            x = self.offset + columns[0] * self.weights[0]
+            for c, w in zip(columns[1:], self.weights[1:]):
+                x = x + c * w
+            return x
+        return array('q', [self.encode(digits) for digits in zip(*columns)])
+
+    def decodeBatch(self, xs):  # return the digit columns of the numbers xs; a NumPy array is decoded with array arithmetic
+        if hasattr(xs, 'dtype'):
+            rest = xs - self.offset
+            columns = [None] * len(self.radices)
+            for j in range(len(self.radices) - 1, -1, -1):
+                columns[j] = rest // self.weights[j]
+                rest = rest - columns[j] * self.weights[j]
+            return columns
+        columns = [array('q') for _ in self.radices]
+        for x in xs:
+            for column, d in zip(columns, self.decode(x)):
+                column.append(d)
+        return columns
+
+CODEC_TABLE_LIMIT = 1 << 20  # the largest number of hospital's responsive profiles whose digits Market tabulates
+
+AMO_ENCODINGS = ('pairwise', 'sequential', 'commander', 'product', 'bimander')
+
+def amoClauses(lits, newVar, encoding='pairwise'):  # return clauses stating that at most one of lits is true; newVar() must return a fresh auxiliary variable
+    k = len(lits)
+    pairwise = [[-lits[a], -lits[b]] for a in range(k) for b in range(a+1, k)]
+    if encoding == 'pairwise' or k <= 1:
+        return pairwise
+    if encoding == 'sequential':  # Sinz's sequential counter: s[j] is true when one of lits[0..j] is
+        s = [newVar() for _ in range(k-1)]
+        cnf = [[-lits[0], s[0]]]
+        for j in range(1, k-1):
+            cnf += [[-lits[j], s[j]], [-s[j-1], s[j]], [-lits[j], -s[j-1]]]
+        cnf.append([-lits[k-1], -s[k-2]])
+        return cnf
+    if encoding == 'commander':  # groups of 3 lits, each with a commander variable true iff one of them is, and at most one commander
+        if k <= 3:
+            return pairwise
+        cnf = []
+        commanders = []
+        for j in range(0, k, 3):
+            group = lits[j:j+3]
+            c = newVar()
+            commanders.append(c)
+            cnf += amoClauses(group, newVar, 'pairwise')
+            cnf += [[-x, c] for x in group]
+            cnf.append([-c] + group)
+        return cnf + amoClauses(commanders, newVar, 'commander')
+    if encoding == 'product':  # Chen's product encoding: lits on a grid, at most one row and at most one column
+        if k <= 4:
+            return pairwise
+        rows = isqrt(k - 1) + 1
+        cols = (k + rows - 1) // rows
+        r = [newVar() for _ in range(rows)]
+        c = [newVar() for _ in range(cols)]
+        cnf = []
+        for j, x in enumerate(lits):
+            cnf += [[-x, r[j // cols]], [-x, c[j % cols]]]
+        return cnf + amoClauses(r, newVar, 'product') + amoClauses(c, newVar, 'product')
+    if encoding == 'bimander':  # pairs of lits, every pair tied to its index in binary
+        groups = [lits[j:j+2] for j in range(0, k, 2)]
+        if len(groups) == 1:
+            return pairwise
+        bits = [newVar() for _ in range((len(groups) - 1).bit_length())]
+        cnf = []
+        for gi, group in enumerate(groups):
+            cnf += amoClauses(group, newVar, 'pairwise')
+            for x in group:
+                for b, bit in enumerate(bits):
+                    cnf.append([-x, bit] if gi >> b & 1 else [-x, -bit])
+        return cnf
+    raise ValueError('unknown at-most-one encoding: ' + str(encoding))
+
+def linearExtensions(size, succ):  # generate, in lexicographic order, all orderings of range(size) which put x before every element of succ[x]
+    indeg = [0] * size
+    for x in range(size):
+        for y in succ[x]:
+            indeg[y] += 1
+    placed = [False] * size
+    order = []
+    def extend():
+        if len(order) == size:
+            yield tuple(order)
+            return
+        for x in range(size):
+            if not placed[x] and indeg[x] == 0:
+                placed[x] = True
+                order.append(x)
+                for y in succ[x]:
+                    indeg[y] -= 1
+                yield from extend()
+                for y in succ[x]:
+                    indeg[y] += 1
+                order.pop()
+                placed[x] = False
+    return extend()
+
 
 #
-# Market Dimension
+# Axioms and their files
 #
 
-# the default value for dimensions (n:total number of hospitals, m:total number of interns)
-n = 2
-m = 2
-
-# change the value of dimensions
-def setDimension(k, l):   
-    global n, m
-    n = k
-    m = l
-
-# return the current value of dimensions
-def getDimension():
-    return (n, m)
+AXIOMS = {  # axiom -> (file name in ./data, generator of its clauses over Market.outerProfiles())
+    'mechanism': ('mechanism', 'mechanismClauses'),
+    'notBlockedByInterns': ('notBlockedByInterns', 'notBlockedByInternsClauses'),
+    'notBlockedByHospitals': ('notBlockedByHospitals', 'notBlockedByHospitalsClauses'),
+    'fair': ('fair', 'fairClauses'),
+    'nonWasteful': ('non-wasteful', 'nonWastefulClauses'),
+    'strategyProofForInterns': ('strategyProofForInterns', 'strategyProofForInternsClauses'),
+    'strategyProofForHospitals': ('strategyProofForHospitals', 'strategyProofForHospitalsClauses'),
+    'strategyProofForCapacities': ('strategyProofForCapacities', 'strategyProofForCapacitiesClauses'),
+    'strategyProofForInternsTruncation': ('strategyProofForInternsTruncation', 'strategyProofForInternsTruncationClauses'),
+    'strategyProofForInternsDropping': ('strategyProofForInternsDropping', 'strategyProofForInternsDroppingClauses'),
+    'strategyProofForHospitalsTruncation': ('strategyProofForHospitalsTruncation', 'strategyProofForHospitalsTruncationClauses'),
+    'strategyProofForHospitalsDropping': ('strategyProofForHospitalsDropping', 'strategyProofForHospitalsDroppingClauses'),
+    'respectingImprovements': ('respectingImprovements', 'respectingImprovementsClauses'),
+}
+
+# axioms whose clauses are not invariant under renaming hospitals and interns (hospitalsDropping and internsDropping compare the groups and the hospitals in index order),
+# and so cannot be encoded with Market.symmetry; Market.checkSymmetry finds them
+ASYMMETRIC_AXIOMS = ('strategyProofForInternsDropping', 'strategyProofForHospitalsDropping')
+
+ORBIT_CACHE_SIZE = 1 << 16  # the most orbits a Market keeps, see Market.orbit
+
+# axiom -> (the part of the profile its clauses compare: 'p_H', 'p_I' or 'p_q', the agents taken in turn: 'hospitals' or 'interns', the method returning the variants of that part for an agent);
+# the axioms not listed never link two profiles, see Market.closeDomain
+DOMAIN_RELATIONS = {
+    'strategyProofForInterns': ('p_I', 'interns', 'iVariantsForInterns'),
+    'strategyProofForHospitals': ('p_H', 'hospitals', 'iVariantsForHospitals_R'),
+    'strategyProofForCapacities': ('p_q', 'hospitals', 'iVariantsForCapacities'),
+    'strategyProofForInternsTruncation': ('p_I', 'interns', 'iTruncationVariantsForInterns'),
+    'strategyProofForInternsDropping': ('p_I', 'interns', 'iDroppingVariantsForInterns'),
+    'strategyProofForHospitalsTruncation': ('p_H', 'hospitals', 'iTruncationVariantsForHospitals'),
+    'strategyProofForHospitalsDropping': ('p_H', 'hospitals', 'iDroppingVariantsForHospitals'),
+    'respectingImprovements': ('p_I', 'hospitals', 'variants_ImprovementForHospital'),
+}
 
 
 #
-# Indices, Preferences, Profiles of Hospiutals/Interns
+# Market
 #
 
-def allHospitalsIndices():
-    return range(n)
+class Market:  # a market of n hospitals and m interns; every table derived from (n, m) is built once, on first use
+    def __init__(self, n=2, m=2, workers=1, propagate=(), amo='pairwise', symmetry=False, cache=True, instrument=False, domain=None, dedup=False):
+        self.n = n
+        self.m = m
+        self.domain = domain  # None, or the frozenset of the profile indices ((p_H * allPI + p_I) * allPQ + p_q) the axioms are restricted to, see restrictDomain
+        self.symmetry = symmetry  # encode only anonymous and neutral mechanisms, on one representative profile per orbit, see innerProfiles; UNSAT then only rules out the anonymous and neutral mechanisms
+        self.cache = cache  # keep the CNF of every axiom in CACHE_DIR under its cacheKey and reuse it instead of generating it again
+        self.amo = amo  # the at-most-one encoding of cnfMechanism, one of AMO_ENCODINGS
+        self.workers = workers  # number of processes writing an axiom's CNF, see writeAxiom
+        self.propagate = tuple(propagate)  # the sources of forced assignments applied while writing, see UNIT_SOURCES
+        self.propagationStats = {}  # axiom -> what propagation removed from its last written CNF
+        self.dedup = dedup  # drop the repeated clauses and the ones subsumed by units and binary clauses from every written CNF, see dedupCNF
+        self.dedupStats = {}  # axiom -> what dedupCNF removed from its last written CNF
+        self.instrument = instrument  # count the calls of COUNTED_PREDICATES and print progress lines and a summary while writing, see writeAxiom
+        self.generationMetrics = {}  # axiom -> the metrics of its last write, see newMetrics
+
+    def __getstate__(self):  # only the settings are sent to worker processes, the tables are rebuilt there on first use
+        return {k: v for k, v in self.__dict__.items() if not k.startswith('_')}
+
+    def getDimension(self):
+        return (self.n, self.m)
+
+    #
+    # Cached tables
+    #
+
+    @cached_property
+    def _internPrefLists(self):  # all preferences of an intern, i.e. permutations of (0: unmatched, 1..n: hospitals)
+        return list(permutations(range(self.n+1)))
+
+    @cached_property
+    def _hospitalPrefLists(self):  # all preferences of a hospital over groups, as permutations of group indices
+        return list(permutations(range(2**self.m)))
+
+    @cached_property
+    def _groups(self):  # all groups of interns, in the order of powerset
+        return list(powerset(range(self.m)))
+
+    @cached_property
+    def _groupIndex(self):  # group -> index of the group
+        return {g: k for k, g in enumerate(self._groups)}
+
+    @cached_property
+    def _responsiveTable(self):  # (indices, list formats, index -> position) of all responsive preferences of hospitals
+        ids = []
+        lists = []
+        pw = self._groups
+        for p, perm in self.responsivePreferences():
+            ids.append(p)
+            lists.append([pw[g] for g in perm])
+        return (ids, lists, {p: k for k, p in enumerate(ids)})
+
+    @cached_property
+    def _responsivePreferences(self):  # the responsive preferences of hospitals, as indices of all hospital's preferences
+        return self._responsiveTable[0]
+
+    @cached_property
+    def _responsivePrefLists(self):  # the responsive preferences of hospitals in list format
+        return self._responsiveTable[1]
+
+    @cached_property
+    def _groupMasks(self):  # group index -> the bitmask of its interns
+        return [sum(1 << i for i in J) for J in self._groups]
+
+    @cached_property
+    def _internsCodec(self):  # intern's profiles: the digit i is the preference of intern i
+        return MixedRadix([factorial(self.n+1)] * self.m)
+
+    @cached_property
+    def _hospitalsCodec(self):  # hospital's profiles: the digit h is the preference of hospital h
+        return MixedRadix([factorial(2**self.m)] * self.n)
+
+    @cached_property
+    def _responsiveCodec(self):  # hospital's responsive profiles: the digit h is the position of the responsive preference of hospital h
+        return MixedRadix([len(self._responsivePreferences)] * self.n)
+
+    @cached_property
+    def _capacitiesCodec(self):  # capacity profiles: the digit h is the capacity of hospital h minus 1
+        return MixedRadix([self.m] * self.n)
+
+    @cached_property
+    def _literalCodec(self):  # the variables of posLiteral: digits (g, h, p_q, p_I, p_H)
+        W = self.n * (2**self.m)
+        allPH, allPI, allPQ = self.profileCounts()
+        return MixedRadix([2**self.m, self.n, allPQ, allPI, allPH], [1, 2**self.m, W, allPH * allPQ * W, allPH * allPI * allPQ * W], W + 1)
+
+    @cached_property
+    def _internDigits(self):  # intern's profile -> the preferences of the interns
+        return list(self._internsCodec.odometer())
+
+    @cached_property
+    def _capacityDigits(self):  # capacity profile -> the capacities of the hospitals minus 1
+        return list(self._capacitiesCodec.odometer())
+
+    @cached_property
+    def _responsiveDigits(self):  # hospital's responsive profile -> the positions of the preferences of the hospitals, or None when there are too many profiles to tabulate
+        if self._responsiveCodec.size() > CODEC_TABLE_LIMIT:
+            return None
+        return list(self._responsiveCodec.odometer())
+
+    @cached_property
+    def _internTruncations(self):  # intern's preference ip -> its truncation preferences, in increasing index
+        return [self.internsPreferences(lambda newpref: (newpref != ip) & self.internsTruncation(newpref, ip)) for ip in self.allInternsPreferences()]
+
+    @cached_property
+    def _internDroppings(self):  # intern's preference ip -> its dropping preferences, in increasing index
+        return [self.internsPreferences(lambda newpref: (newpref != ip) & self.internsDropping(newpref, ip)) for ip in self.allInternsPreferences()]
+
+    @cached_property
+    def _hospitalTruncations(self):  # position of a responsive preference -> the positions of its truncation preferences, in increasing order
+        y = self._responsivePreferences
+        return [self.hospitalsPreferences_R(lambda newpref: (newpref != k) & self.hospitalsTruncation(y[newpref], y[k])) for k in range(len(y))]
+
+    @cached_property
+    def _hospitalDroppings(self):  # position of a responsive preference -> the positions of its dropping preferences, in increasing order
+        y = self._responsivePreferences
+        return [self.hospitalsPreferences_R(lambda newpref: (newpref != k) & self.hospitalsDropping(y[newpref], y[k])) for k in range(len(y))]
+
+    @cached_property
+    def _improvements(self):  # hospital h -> intern's preference ip2 -> the preferences ip1 (ip2 included) that are improvements for h of ip2, in increasing index
+        return [[self.internsPreferences(lambda ip1: self.improvementForHospital_pref(ip1, ip2, h)) for ip2 in self.allInternsPreferences()] for h in self.allHospitalsIndices()]
+
+    @cached_property
+    def _internRanks(self):  # [ip * (n+1) + v] -> the rank of v (0: unmatched, 1..n: hospitals) in the intern's preference ip, 0 being the best
+        ranks = array('h', [0]) * (len(self._internPrefLists) * (self.n+1))
+        for ip, prefList in enumerate(self._internPrefLists):
+            for k, v in enumerate(prefList):
+                ranks[ip * (self.n+1) + v] = k
+        return ranks
+
+    @cached_property
+    def _responsiveRanks(self):  # [y * 2^m + g] -> the rank of the group g in the y-th responsive preference of hospitals, 0 being the best
+        ranks = array('h', [0]) * (len(self._responsivePrefLists) * (2**self.m))
+        for y, prefList in enumerate(self._responsivePrefLists):
+            for k, J in enumerate(prefList):
+                ranks[y * (2**self.m) + self._groupIndex[J]] = k
+        return ranks
+
+    #
+    # Indices, Preferences, Profiles of Hospiutals/Interns
+    #
+
+    def allHospitalsIndices(self):
+        return range(self.n)
+
+    def allHospitalsCapacityIndices(self):
+        return range(1, self.m+1)
+
+    def allInternsIndices(self):
+        return range(self.m) 
+
+    def allInternGroupsIndices(self):
+        return range(2**self.m)
+
+    def allHospitalsPreferences(self):
+        return range(factorial(2 ** self.m))
+
+    def allInternsPreferences(self):
+        return range(factorial(self.n+1))
+
+    def allHospitalsProfiles(self):
+        return range((factorial(2 ** self.m)) ** self.n)
+
+    def allInternsProfiles(self):
+        return range((factorial(self.n+1)) ** self.m)
+
+    def allHospitalsCapacities(self):
+        return range(self.m ** self.n)
+    
 
-def allHospitalsCapacityIndices():
-    return range(1, m+1)
+    #
+    # Reasoning about preferences/profiles
+    #
 
-def allInternsIndices():
-    return range(m) 
+    def internsPrefId(self, i, p):  # extract the preference of intern i from the intern's profile p in index format
+        return self._internDigits[p][i]
 
-def allInternGroupsIndices():
-    return range(2**m)
+    def hospitalsPrefId(self, i, p):  # extract the preference of hospital i from the hospital's profile p in index format
+        return self._hospitalsCodec.digit(p, i)
 
-def allHospitalsPreferences():
-    return range(factorial(2 ** m))
+    def hospitalsCapa(self, i, q):  # extract the capacity of hospital i from the hospital's capacity profile q in index format
+        return self._capacityDigits[q][i] + 1
 
-def allInternsPreferences():
-    return range(factorial(n+1))
+    def internsPrefList(self, i, p):   # extract the preference of intern i from the intern's profile p in list format
+        return self._internPrefLists[self.internsPrefId(i, p)]
 
-def allHospitalsProfiles():
-    return range((factorial(2 ** m)) ** n)
+    def hospitalsPrefList(self, i, p):  # extract the preference of hospital i from the hospital's profile p in list format
+        pw = self._groups
+        return [pw[i] for i in self._hospitalPrefLists[self.hospitalsPrefId(i, p)]]
 
-def allInternsProfiles():
-    return range((factorial(n+1)) ** m)
+    def internsRanks(self, i, p):  # return the ranks of unmatched (0) and the hospitals (1..n) in the preference of intern i in profile p, a smaller rank being preferred
+        base = self.internsPrefId(i, p) * (self.n+1)
+        return self._internRanks[base:base + self.n+1]
 
-def allHospitalsCapacities():
-    return range(m ** n)
-    
+    def internsPrefers(self, i, h1, h2, p):  # check whether intern i prefers hospital h1 to h2 in profile p
+        base = self.internsPrefId(i, p) * (self.n+1)
+        return self._internRanks[base + h1+1] < self._internRanks[base + h2+1]
 
-#
-# Reasoning about preferences/profiles
-#
+    def hospitalsPrefers(self, h, g1, g2, p):  # check whether hospital h prefers intern's group g1 to g2 in profile p
+        mylist = self.hospitalsPrefList(h, p)
+        return mylist.index(g1) < mylist.index(g2)
 
-def internsPrefId(i, p):  # extract the preference of intern i from the intern's profile p in index format
-    base = factorial(n+1)
-    return ( p % (base ** (i+1)) ) // (base ** i)
-
-def hospitalsPrefId(i, p):  # extract the preference of hospital i from the hospital's profile p in index format
-    base = factorial(2**m)
-    return ( p % (base ** (i+1)) ) // (base ** i)
-
-def hospitalsCapa(i, q):  # extract the capacity of hospital i from the hospital's capacity profile q in index format
-    base = m
-    return (( q % (base ** (i+1)) ) // (base ** i)) + 1
-
-def internsPrefList(i, p):   # extract the preference of intern i from the intern's profile p in list format
-    preflists = list(permutations(range(n+1)))
-    return preflists[internsPrefId(i, p)]
-
-def hospitalsPrefList(i, p):  # extract the preference of hospital i from the hospital's profile p in list format
-    preflists = list(permutations(range(2**m)))
-    pw = list(powerset(allInternsIndices()))
-    return [pw[i] for i in preflists[hospitalsPrefId(i, p)]]
-
-def internsPrefers(i, h1, h2, p):  # check whether intern i prefers hospital h1 to h2 in profile p
-    mylist = internsPrefList(i, p)
-    return mylist.index(h1+1) < mylist.index(h2+1)
-
-def hospitalsPrefers(h, g1, g2, p):  # check whether hospital h prefers intern's group g1 to g2 in profile p
-    mylist = hospitalsPrefList(h, p)
-    return mylist.index(g1) < mylist.index(g2)
-
-def responsiveCondition(J_index, prList):  # check whether the preference relation prList satisfies the responsible condition for a subset J of the set of all interns.
-    powerI_index = 2**m - 1
-    powerI = list(powerset(range(m)))
-    J = powerI[J_index]
-    IminusJ = powerI[powerI_index-J_index]
-    for i in IminusJ:
-        Jplusi = tuple(sorted(J + (i,)))
-        if (prList.index(Jplusi) < prList.index(J)):
-            if prList.index(()) < prList.index((i,)):
-                return False
-        if prList.index((i,)) < prList.index(()):
-            if prList.index(J) < prList.index(Jplusi):
+    def responsiveCondition(self, J_index, prList):  # check whether the preference relation prList satisfies the responsible condition for a subset J of the set of all interns.
+        powerI_index = 2**self.m - 1
+        powerI = self._groups
+        J = powerI[J_index]
+        IminusJ = powerI[powerI_index-J_index]
+        for i in IminusJ:
+            Jplusi = tuple(sorted(J + (i,)))
+            if (prList.index(Jplusi) < prList.index(J)):
+                if prList.index(()) < prList.index((i,)):
+                    return False
+            if prList.index((i,)) < prList.index(()):
+                if prList.index(J) < prList.index(Jplusi):
+                    return False
+            for j in IminusJ:
+                if i != j:
+                    Jplusj = tuple(sorted(J + (j,)))
+                    if prList.index(Jplusi) < prList.index(Jplusj):
+                        if prList.index((j,)) < prList.index((i,)):
+                            return False
+                    if prList.index((i,)) < prList.index((j,)):
+                        if prList.index(Jplusj) < prList.index(Jplusi):
+                            return False
+        return True
+
+    def responsivePref(self, prList):  # check whether preference list prList is responsive
+        allJ = 2 ** self.m
+        for j in range(allJ):
+            if not(self.responsiveCondition(j, prList)):
                 return False
-        for j in IminusJ:
-            if i != j:
-                Jplusj = tuple(sorted(J + (j,)))
-                if prList.index(Jplusi) < prList.index(Jplusj):
-                    if prList.index((j,)) < prList.index((i,)):
-                        return False
-                if prList.index((i,)) < prList.index((j,)):
-                    if prList.index(Jplusj) < prList.index(Jplusi):
-                        return False
-    return True
+        return True
 
-def responsivePref(prList):  # check whether preference list prList is responsive
-    allJ = 2 ** m
-    for j in range(allJ):
-        if not(responsiveCondition(j, prList)):
-            return False
-    return True
+    def responsiveExtensions(self, order):  # generate responsive preferences whose restriction to the empty group and the single interns is order, as permutations of group indices in lexicographic order
+        # order ranks the interns and the empty group () from the best to the worst: the interns before () are the acceptable ones
+        rank = {x: k for k, x in enumerate(order)}
+        pw = self._groups
+        succ = [[] for _ in pw]
+        for J in pw:
+            rest = [i for i in self.allInternsIndices() if i not in J]
+            for i in rest:
+                Jplusi = self._groupIndex[tuple(sorted(J + (i,)))]
+                if rank[i] < rank[()]:
+                    succ[Jplusi].append(self._groupIndex[J])
+                else:
+                    succ[self._groupIndex[J]].append(Jplusi)
+                for j in rest:
+                    if rank[i] < rank[j]:
+                        succ[Jplusi].append(self._groupIndex[tuple(sorted(J + (j,)))])
+        return linearExtensions(len(pw), succ)
 
-def allHospitalsResponsivePreferences():  # return all responsive preferences of hospitals
-    ans = []
-    preflists = list(permutations(range(2**m)))
-    pw = list(powerset(allInternsIndices()))
-    for p in allHospitalsPreferences():
-        prefList = [pw[i] for i in preflists[p]]
-        if responsivePref(prefList):
-            ans.append(p)
-    return (range(len(ans)), ans)
+    def responsivePreferences(self):  # generate (index, permutation of group indices) of every responsive preference of hospitals, in increasing index
+        items = [()] + list(self.allInternsIndices())
+        for perm in heapq.merge(*[self.responsiveExtensions(order) for order in permutations(items)]):
+            yield (permutationIndex(perm), perm)
 
-def allHospitalsResponsiveProfiles(): # return all responsive profiles of hospitals
-    _, y = allHospitalsResponsivePreferences()
-    return (range(len(y) ** n), y)
+    def responsivePrefPosition(self, p):  # return the position of the responsive preference p (index format) among all responsive preferences, or None
+        return self._responsiveTable[2].get(p)
 
-def hospitalsPrefId_R(i, p):  # extract the preference of hospital i from the hospital's responsive profile p in index format
-    _, y = allHospitalsResponsivePreferences()
-    base = len(y)
-    y_ind = ( p % (base ** (i+1)) ) // (base ** i)
-    return y_ind
+    def allHospitalsResponsivePreferences(self):  # return all responsive preferences of hospitals
+        ans = self._responsivePreferences
+        return (range(len(ans)), ans)
 
-def hospitalsPrefList_R(i, p):  # extract the preference of hospital i from the hospital's responsive profile p in list format
-    _, y = allHospitalsResponsivePreferences()
-    preflists = list(permutations(range(2**m)))
-    pw = list(powerset(allInternsIndices()))
-    return [pw[i] for i in preflists[y[hospitalsPrefId_R(i, p)]]]
+    def allHospitalsResponsiveProfiles(self): # return all responsive profiles of hospitals
+        _, y = self.allHospitalsResponsivePreferences()
+        return (range(len(y) ** self.n), y)
 
-def hospitalsPrefers_R(h, g1, g2, p):  # check whether hospital h prefers intern's group g1 to g2 in hospital's responsive profile p
-    mylist = hospitalsPrefList_R(h, p)
-    return mylist.index(g1) < mylist.index(g2)
+    def hospitalsPrefId_R(self, i, p):  # extract the preference of hospital i from the hospital's responsive profile p in index format
+        if self._responsiveDigits is not None:
+            return self._responsiveDigits[p][i]
+        return self._responsiveCodec.digit(p, i)
 
+    def hospitalsPrefList_R(self, i, p):  # extract the preference of hospital i from the hospital's responsive profile p in list format
+        return self._responsivePrefLists[self.hospitalsPrefId_R(i, p)]
 
-def visualize_HospitalPreference(p):  # visualize a hospital's preference
-    preflists = list(permutations(range(2**m)))
-    pw = list(powerset(allInternsIndices()))
-    prefList = [pw[i] for i in preflists[p]]
-    return prefList
+    def hospitalsRanks_R(self, h, p):  # return the ranks of the groups (by index) in the preference of hospital h in the responsive profile p, a smaller rank being preferred
+        base = self.hospitalsPrefId_R(h, p) * (2**self.m)
+        return self._responsiveRanks[base:base + 2**self.m]
 
-def visualize_InternPreference(p):
-    preflists = list(permutations(range(n+1)))
-    return preflists[p]
+    def hospitalsPrefers_R(self, h, g1, g2, p):  # check whether hospital h prefers intern's group g1 to g2 in hospital's responsive profile p
+        base = self.hospitalsPrefId_R(h, p) * (2**self.m)
+        return self._responsiveRanks[base + self._groupIndex[g1]] < self._responsiveRanks[base + self._groupIndex[g2]]
 
 
-def inGroup(i, g):  # check whether intern i belongs to group g
-    allG = list(powerset(range(m)))
-    return (i in allG[g])
+    def visualize_HospitalPreference(self, p):  # visualize a hospital's preference
+        k = self.responsivePrefPosition(p)
+        if k is not None:
+            return list(self._responsivePrefLists[k])
+        pw = self._groups
+        prefList = [pw[i] for i in indexToPermutation(p, 2**self.m)]
+        return prefList
 
-def toGroup(i):  # returns the index of a group consisting of only intern i
-    allG = list(powerset(range(m)))
-    return allG.index((i,))
+    def visualize_InternPreference(self, p):
+        return self._internPrefLists[p]
 
-def indexToGroup(g):  # takes an index of a group and returns the actual group
-    allG = list(powerset(range(m)))
-    return allG[g]
 
-def groupSize(g, q):  # check whether the group g is size q
-    allG = list(powerset(range(m)))
-    return(len(allG[g]) == q)
+    def inGroup(self, i, g):  # check whether intern i belongs to group g
+        return (i in self._groups[g])
 
+    def toGroup(self, i):  # returns the index of a group consisting of only intern i
+        return self._groupIndex[(i,)]
 
-#
-# Operations of profiles
-#
+    def indexToGroup(self, g):  # takes an index of a group and returns the actual group
+        return self._groups[g]
 
-def internsIndices(condition):  # return interns that satisfies the condition
-    return [x for x in allInternsIndices() if condition(x)]
+    def groupSize(self, g, q):  # check whether the group g is size q
+        return(len(self._groups[g]) == q)
 
-def internGroupsIndices(condition):  # return groups of interns that satisfy the condition
-    return [x for x in allInternGroupsIndices() if condition(x)]
 
-def hospitalsIndices(condition):  # return hospitals that satisfy the condition
-    return [x for x in allHospitalsIndices() if condition(x)]
+    #
+    # Operations of profiles
+    #
 
-def internsPreferences(condition):  # return intern's prefeerences that satisfy the condition
-    return [x for x in allInternsPreferences() if condition(x)]
+    def internsIndices(self, condition):  # return interns that satisfies the condition
+        return [x for x in self.allInternsIndices() if condition(x)]
 
-def hospitalsPreferences(condition):  # return hospital's preferences that satisfy the condition
-    return [x for x in allHospitalsPreferences() if condition(x)]
+    def internGroupsIndices(self, condition):  # return groups of interns that satisfy the condition
+        return [x for x in self.allInternGroupsIndices() if condition(x)]
 
-def hospitalsPreferences_R(condition):
-    allHPrange, _ = allHospitalsResponsivePreferences()
-    return [x for x in allHPrange if condition(x)]
+    def hospitalsIndices(self, condition):  # return hospitals that satisfy the condition
+        return [x for x in self.allHospitalsIndices() if condition(x)]
 
-def hospitalsCapacities(condition):  # return hospital's capacities that satisfy the condition
-    return [c for c in range(m) if condition(c)]
+    def internsPreferences(self, condition):  # return intern's prefeerences that satisfy the condition
+        return [x for x in self.allInternsPreferences() if condition(x)]
 
-def internsProfiles(condition):  # return profiles of interns that satisfy the condition
-    return [x for x in allInternsProfiles() if condition(x)]
+    def hospitalsPreferences(self, condition):  # return hospital's preferences that satisfy the condition
+        return [x for x in self.allHospitalsPreferences() if condition(x)]
 
-def hospitalsProfiles(condition):  # return profiles of hospitals that satisfy the condition
-    return [x for x in allHospitalsProfiles() if condition(x)]
-    
-def hospitalsProfiles_R(condition):
-    allRPs, _ = allHospitalsResponsiveProfiles()
-    return [x for x in allRPs if condition(x)]
-
-def hospitalsPreferInPref(g1, g2, hp):
-    hp_list = visualize_HospitalPreference(hp)
-    pw = list(powerset(allInternsIndices()))
-    return(hp_list.index(pw[g1]) < hp_list.index(pw[g2])) 
-
-def hospitalsRankInPref(g, hp):
-    hp_list = visualize_HospitalPreference(hp)
-    pw = list(powerset(allInternsIndices()))
-    return hp_list.index(pw[g])
-
-def hospitalsTruncation(hp1, hp2):  # check whether an hospital's preference hp1 is a truncation preference of hp2
-    for g1 in range(1, 2**m):
-        for g2 in range(g1+1, 2**m):
-            if not ((hospitalsPreferInPref(g1, g2, hp1) & hospitalsPreferInPref(g1, g2, hp2)) | (hospitalsPreferInPref(g2, g1, hp1) & hospitalsPreferInPref(g2, g1, hp2))):
-                return False
-    if (hospitalsRankInPref(0, hp1) < hospitalsRankInPref(0, hp2)):
-        return True
-    return False
+    def hospitalsPreferences_R(self, condition):
+        allHPrange, _ = self.allHospitalsResponsivePreferences()
+        return [x for x in allHPrange if condition(x)]
 
-def hospitalsDropping(hp1, hp2):  # check whether an hospital's preference hp1 is a dropping preference of hp2
-    for g2 in range(2**m):
-        for g1 in range(g2+1, 2**m):
-            if (hospitalsPreferInPref(0, g1, hp2)):
-                if not (hospitalsPreferInPref(0, g1, hp1)):
-                    return False
-            if (hospitalsPreferInPref(g1, 0, hp1) & hospitalsPreferInPref(g1, g2, hp2)):
-                if not (hospitalsPreferInPref(g1, g2, hp1)):
+    def hospitalsCapacities(self, condition):  # return hospital's capacities that satisfy the condition
+        return [c for c in range(self.m) if condition(c)]
+
+    def internsProfiles(self, condition):  # return profiles of interns that satisfy the condition
+        return [x for x in self.allInternsProfiles() if condition(x)]
+
+    def hospitalsProfiles(self, condition):  # return profiles of hospitals that satisfy the condition
+        return [x for x in self.allHospitalsProfiles() if condition(x)]
+    
+    def hospitalsProfiles_R(self, condition):
+        allRPs, _ = self.allHospitalsResponsiveProfiles()
+        return [x for x in allRPs if condition(x)]
+
+    def hospitalsPreferInPref(self, g1, g2, hp):
+        return self.hospitalsRankInPref(g1, hp) < self.hospitalsRankInPref(g2, hp)
+
+    def hospitalsRankInPref(self, g, hp):
+        k = self.responsivePrefPosition(hp)
+        if k is not None:
+            return self._responsiveRanks[k * (2**self.m) + g]
+        return indexToPermutation(hp, 2**self.m).index(g)
+
+    def hospitalsTruncation(self, hp1, hp2):  # check whether an hospital's preference hp1 is a truncation preference of hp2
+        for g1 in range(1, 2**self.m):
+            for g2 in range(g1+1, 2**self.m):
+                if not ((self.hospitalsPreferInPref(g1, g2, hp1) & self.hospitalsPreferInPref(g1, g2, hp2)) | (self.hospitalsPreferInPref(g2, g1, hp1) & self.hospitalsPreferInPref(g2, g1, hp2))):
                     return False
-    return True
-
-def internsPreferInPref(h1, h2, ip):
-    preflists = list(permutations(range(n+1)))
-    ip_list = preflists[ip]
-    return(ip_list.index(h1) < ip_list.index(h2))
-
-def internsRankInPref(h, ip):
-    preflists = list(permutations(range(n+1)))
-    ip_list = preflists[ip]
-    return(ip_list.index(h))
-
-def internsTruncation(ip1, ip2):  # check whether an intern's preference ip1 is a truncation preference of ip2
-    for h1 in range(1, n+1):
-        for h2 in range(h1+1, n+1):
-            if not ((internsPreferInPref(h1, h2, ip1) & internsPreferInPref(h1, h2, ip2)) | (internsPreferInPref(h2, h1, ip1) & internsPreferInPref(h2, h1, ip2))):
-                return False
-    if (internsRankInPref(0, ip1) < internsRankInPref(0, ip2)):
+        if (self.hospitalsRankInPref(0, hp1) < self.hospitalsRankInPref(0, hp2)):
+            return True
+        return False
+
+    def hospitalsDropping(self, hp1, hp2):  # check whether an hospital's preference hp1 is a dropping preference of hp2
+        for g2 in range(2**self.m):
+            for g1 in range(g2+1, 2**self.m):
+                if (self.hospitalsPreferInPref(0, g1, hp2)):
+                    if not (self.hospitalsPreferInPref(0, g1, hp1)):
+                        return False
+                if (self.hospitalsPreferInPref(g1, 0, hp1) & self.hospitalsPreferInPref(g1, g2, hp2)):
+                    if not (self.hospitalsPreferInPref(g1, g2, hp1)):
+                        return False
         return True
-    return False
 
-def internsDropping(ip1, ip2):  # check whether an intern's preference ip1 is a dropping preference of ip2  
-    for h2 in range(n+1):
-        for h1 in range(h2+1, n+1):
-            if (internsPreferInPref(0, h1, ip2)):
-                if not (internsPreferInPref(0, h1, ip1)):
+    def internsPreferInPref(self, h1, h2, ip):
+        return self._internRanks[ip * (self.n+1) + h1] < self._internRanks[ip * (self.n+1) + h2]
+
+    def internsRankInPref(self, h, ip):
+        return self._internRanks[ip * (self.n+1) + h]
+
+    def internsTruncation(self, ip1, ip2):  # check whether an intern's preference ip1 is a truncation preference of ip2
+        for h1 in range(1, self.n+1):
+            for h2 in range(h1+1, self.n+1):
+                if not ((self.internsPreferInPref(h1, h2, ip1) & self.internsPreferInPref(h1, h2, ip2)) | (self.internsPreferInPref(h2, h1, ip1) & self.internsPreferInPref(h2, h1, ip2))):
                     return False
-            if (internsPreferInPref(h1, 0, ip1) & internsPreferInPref(h1, h2, ip2)):
-                if not (internsPreferInPref(h1, h2, ip1)):
+        if (self.internsRankInPref(0, ip1) < self.internsRankInPref(0, ip2)):
+            return True
+        return False
+
+    def internsDropping(self, ip1, ip2):  # check whether an intern's preference ip1 is a dropping preference of ip2  
+        for h2 in range(self.n+1):
+            for h1 in range(h2+1, self.n+1):
+                if (self.internsPreferInPref(0, h1, ip2)):
+                    if not (self.internsPreferInPref(0, h1, ip1)):
+                        return False
+                if (self.internsPreferInPref(h1, 0, ip1) & self.internsPreferInPref(h1, h2, ip2)):
+                    if not (self.internsPreferInPref(h1, h2, ip1)):
+                        return False
+        return True 
+
+    def improvementForHospital_pref(self, ip1, ip2, h):
+        for h1 in range(self.n+1):
+            if (self.internsPreferInPref(h+1, h1, ip2)):
+                if not (self.internsPreferInPref(h+1, h1, ip1)):
                     return False
-    return True 
+            for h2 in range(h1+1, self.n+1):
+                if (h1 != h+1) & (h2 != h+1):
+                    if (self.internsPreferInPref(h1, h2, ip1)):
+                        if not (self.internsPreferInPref(h1, h2, ip2)):
+                            return False
+                    if (self.internsPreferInPref(h1, h2, ip2)):
+                        if not (self.internsPreferInPref(h1, h2, ip1)):
+                            return False
+        return True
 
-def improvementForHospital_pref(ip1, ip2, h):
-    for h1 in range(n+1):
-        if (internsPreferInPref(h+1, h1, ip2)):
-            if not (internsPreferInPref(h+1, h1, ip1)):
+    def improvementForHospital(self, iProf1, iProf2, h):
+        for i in self.allInternsIndices():
+            if not (self.improvementForHospital_pref(self.internsPrefId(i, iProf1), self.internsPrefId(i, iProf2), h)):
                 return False
-        for h2 in range(h1+1, n+1):
-            if (h1 != h+1) & (h2 != h+1):
-                if (internsPreferInPref(h1, h2, ip1)):
-                    if not (internsPreferInPref(h1, h2, ip2)):
-                        return False
-                if (internsPreferInPref(h1, h2, ip2)):
-                    if not (internsPreferInPref(h1, h2, ip1)):
-                        return False
-    return True
+        return True
 
-def improvementForHospital(iProf1, iProf2, h):
-    for i in allInternsIndices():
-        if not (improvementForHospital_pref(internsPrefId(i, iProf1), internsPrefId(i, iProf2), h)):
+    def variants_ImprovementForHospital(self, iProf2, h):  # return the intern's profiles other than iProf2 that are improvements for h of it, in increasing index
+        # every intern's preference is taken independently from _improvements, the last intern being the most significant digit
+        variants = [0]
+        for i in reversed(self.allInternsIndices()):
+            choices = self._improvements[h][self.internsPrefId(i, iProf2)]
+            factor = self._internsCodec.weights[i]
+            variants = [v + c * factor for v in variants for c in choices]
+        return [v for v in variants if v != iProf2]
+
+
+    def iVariantsForInterns(self, i, p):  # return i-variants of the intern's profile p
+        currpref = self.internsPrefId(i, p)
+        factor = self._internsCodec.weights[i]
+        rest = p - currpref * factor
+        variants = []
+        for newpref in self.internsPreferences(lambda newpref: newpref != currpref):
+            variants.append(rest + newpref * factor)
+        return variants
+
+    def iVariantsForHospitals(self, i, p):  # return i-variants of the hosputal's profile p
+        currpref = self.hospitalsPrefId(i, p)
+        factor = self._hospitalsCodec.weights[i]
+        rest = p - currpref * factor
+        variants = []
+        for newpref in self.hospitalsPreferences(lambda newpref: newpref != currpref):
+            variants.append(rest + newpref * factor)
+        return variants
+
+    def iVariantsForCapacities(self, i, q):  # return i-variants of the hospital's capacity vector q
+        currcapa = self.hospitalsCapa(i, q) - 1
+        factor = self._capacitiesCodec.weights[i]
+        rest = q - currcapa * factor
+        variants = []
+        for newcapa in self.hospitalsCapacities(lambda newcapa: newcapa < currcapa):
+            variants.append(rest + newcapa * factor)
+        return variants
+
+    def iVariantsForHospitals_R(self, i, p):  # return i-variants of the hosputal's responsive profile p
+        currpref = self.hospitalsPrefId_R(i, p)
+        factor = self._responsiveCodec.weights[i]
+        rest = p - currpref * factor
+        variants = []
+        for newpref in self.hospitalsPreferences_R(lambda newpref: newpref != currpref):
+            variants.append(rest + newpref * factor)
+        return variants
+
+    def iTruncationVariantsForInterns(self, i, p):
+        currpref = self.internsPrefId(i, p)
+        factor = self._internsCodec.weights[i]
+        rest = p - currpref * factor
+        return [rest + newpref * factor for newpref in self._internTruncations[currpref]]
+
+    def iTruncationVariantsForHospitals(self, i, p):
+        currpref = self.hospitalsPrefId_R(i, p)
+        factor = self._responsiveCodec.weights[i]
+        rest = p - currpref * factor
+        return [rest + newpref * factor for newpref in self._hospitalTruncations[currpref]]
+
+    def iDroppingVariantsForInterns(self, i, p):
+        currpref = self.internsPrefId(i, p)
+        factor = self._internsCodec.weights[i]
+        rest = p - currpref * factor
+        return [rest + newpref * factor for newpref in self._internDroppings[currpref]]
+
+    def iDroppingVariantsForHospitals(self, i, p):
+        currpref = self.hospitalsPrefId_R(i, p)
+        factor = self._responsiveCodec.weights[i]
+        rest = p - currpref * factor
+        return [rest + newpref * factor for newpref in self._hospitalDroppings[currpref]]
+
+
+
+    #
+    # Creating and Editing CNF
+    #
+
+    def profileOffset(self, p_H, p_I, p_q, allPH, allPI, allPQ):  # return the part of the literals of profile (p_H, p_I, p_q) that does not depend on (h, g)
+        p = (p_H * (allPH * allPI * allPQ)) + (p_I * (allPH * allPQ)) + p_q + 1
+        return p * (self.n * (2**self.m))
+
+    def posLiteral(self, p_H, p_I, p_q, h, g, allPH, allPI, allPQ):  # return a positive literal which represents that hospital h matches group of interns g in profile (p_H, p_I, p_q)
+        return self.profileOffset(p_H, p_I, p_q, allPH, allPI, allPQ) + (h * (2**self.m)) + g + 1
+
+    def negLiteral(self, p_H, p_I, p_q, h, g, allPH, allPI, allPQ):  # return a negative literal which represents that hospital h doesn't match  group of interns g in profile (p_H, p_I, p_q)
+        return (-1) * self.posLiteral(p_H, p_I, p_q, h, g, allPH, allPI, allPQ)
+
+    def interpretVariable(self, x, hospRespDict):  # interpret the literal and present it in a readable form
+        g, h, p_q, p_I, p_H = self._literalCodec.decode(x)
+
+        pw = self._groups
+        print ('-> in profile number' + str(p_H) + ' , ' + str(p_I) + ' , ' + str(p_q) + ' match ' + str(h) + '/' + str(pw[g]))
+        self.printProfile(p_H, p_I, p_q)
+
+    def printProfile(self, p_H, p_I, p_q):  # display the preferences and capacities of profile (p_H, p_I, p_q)
+        s_h = '( '
+        s_q = ''
+        for i in self.allHospitalsIndices():
+            s_h = s_h + '>'.join([str(x) for x in self.hospitalsPrefList_R(i, p_H)]) + ' '
+            s_q = s_q + str(self.hospitalsCapa(i, p_q)) + ' '
+        s_h = s_h + ')'
+        s_i = '( '
+        for i in self.allInternsIndices():
+            s_i = s_i + '>'.join([str(x) for x in self.internsPrefList(i, p_I)]) + ' '
+        s_i = s_i + ')'
+        print('-> where hospital profile ' + str(p_H) + ' = ' + s_h)
+        print('-> where hospital capacity ' + str(p_q) + ' = ' + s_q)
+        print('-> where intern profile ' + str(p_I) + ' = ' + s_i)
+
+    def printMechanism(self, mec):  # takes a Matching Mechanism (a MechanismTable, or the true variables of a model) and displays how Mechanism outputs to the profile
+        table = mec if isinstance(mec, MechanismTable) else self.decodeModel(mec)
+        hospitalPrefs = ['>'.join([str(x) for x in prefList]) for prefList in self._responsivePrefLists]
+        internPrefs = ['>'.join([str(x) for x in prefList]) for prefList in self._internPrefLists]
+        pw = self._groups
+        if isinstance(table, DomainMechanismTable):
+            for h, i, q, matching in table.rows():
+                s = '( ' + ''.join([hospitalPrefs[y] + '/Capacity:' + str(c+1) + ' ' for y, c in zip(self._responsiveCodec.decode(h), self._capacityDigits[q])]) + '| '
+                s = s + ''.join([internPrefs[ip] + ' ' for ip in self._internDigits[i]]) + ') --> { '
+                print(s + ''.join([str(k) + str(l) + ' ' for k, g in enumerate(matching) if g != UNMATCHED for l in pw[g]]) + '}')
+            return
+        for h in self.allHospitalsResponsiveProfiles()[0]:
+            for q in self.allHospitalsCapacities():
+                s_h = '( ' + ''.join([hospitalPrefs[y] + '/Capacity:' + str(c+1) + ' ' for y, c in zip(self._responsiveCodec.decode(h), self._capacityDigits[q])]) + '| '
+                for i in self.allInternsProfiles():
+                    s = s_h + ''.join([internPrefs[ip] + ' ' for ip in self._internDigits[i]]) + ') --> { '
+                    for k, g in enumerate(table.matching(h, i, q)):
+                        if g != UNMATCHED:
+                            s = s + ''.join([str(k) + str(l) + ' ' for l in pw[g]])
+                    print(s + '}')
+
+    def decodeModel(self, model):  # return the mechanism of a model as a MechanismTable; model holds its true variables (or all its literals), a NumPy array of them being decoded with array arithmetic
+        if self.symmetry:
+            model = self.expandModel(model)
+        allPH, allPI, allPQ = self.profileCounts()
+        auxBase = self.auxBase()
+        if self.domain is not None:  # a table over the subdomain only, which never spans the whole profile space
+            profiles = sorted(self.domain)
+            table = DomainMechanismTable(self.n, self.m, (allPH, allPI, allPQ), profiles, bytearray([UNMATCHED]) * (len(profiles) * self.n))
+            positions = table.positions
+            for x in (model.tolist() if hasattr(model, 'dtype') else model):
+                if 0 < x <= auxBase:
+                    g, h, p_q, p_I, p_H = self._literalCodec.decode(x)
+                    j = positions.get((p_H * allPI + p_I) * allPQ + p_q)
+                    if j is not None:
+                        table.matches[j * self.n + h] = g
+            return table
+        if hasattr(model, 'dtype'):
+            model = model[(model > 0) & (model <= auxBase)]
+        else:
+            model = [x for x in model if 0 < x <= auxBase]
+        g, h, p_q, p_I, p_H = self._literalCodec.decodeBatch(model)
+        if hasattr(model, 'dtype'):
+            import numpy
+            matches = numpy.full(allPH * allPI * allPQ * self.n, UNMATCHED, dtype=numpy.uint8)
+            matches[((p_H * allPI + p_I) * allPQ + p_q) * self.n + h] = g
+            return MechanismTable(self.n, self.m, (allPH, allPI, allPQ), bytearray(matches.tobytes()))
+        matches = bytearray([UNMATCHED]) * (allPH * allPI * allPQ * self.n)
+        n = self.n
+        for gx, hx, qx, ix, px in zip(g, h, p_q, p_I, p_H):
+            matches[((px * allPI + ix) * allPQ + qx) * n + hx] = gx
+        return MechanismTable(self.n, self.m, (allPH, allPI, allPQ), matches)
+
+    def subsetsOfInternGroupsIndices(self, g):  # return groups that are proper subsets of group g
+        ans = []
+        pw = self._groups
+        gPW = pw[g]
+        for p in pw:
+            if (p != gPW) and (p != ()):
+                if set(p).issubset(gPW):
+                    ans.append(pw.index(p))
+        return ans
+
+    def intersectionOfInternGroupsIndices(self, g):
+        ans = []
+        pw = self._groups
+        gPW = pw[g]
+        for p in pw:
+            if (p != gPW) and (p != ()):
+                if set(p) & set(gPW):
+                    ans.append(pw.index(p))
+        return ans
+
+    def mechanismTemplate(self, p_q):  # return the clauses of cnfMechanism for one profile with capacity profile p_q, with literals relative to the profile: (h, g) is h * 2**m + g + 1 and the j-th auxiliary variable of the AMO encoding is n * 2**m + j + 1
+        pw = self._groups
+        lit = lambda h, g : (h * (2**self.m)) + g + 1
+        aux = [self.n * (2**self.m)]
+        def newVar():
+            aux[0] += 1
+            return aux[0]
+        cnf = []
+        if self.amo != 'pairwise':  # at most one group per hospital, and at most one hospital per intern through auxiliary variables "h takes i"
+            for h in self.allHospitalsIndices():
+                cnf.append([lit(h, g) for g in self.internGroupsIndices(lambda g : len(pw[g]) <= self.hospitalsCapa(h, p_q))])
+                cnf += amoClauses([lit(h, g) for g in self.allInternGroupsIndices()], newVar, self.amo)
+            if self.n > 1:
+                for i in self.allInternsIndices():
+                    takes = []
+                    for h in self.allHospitalsIndices():
+                        y = newVar()
+                        takes.append(y)
+                        groups = self.internGroupsIndices(lambda g : self.inGroup(i, g))
+                        cnf += [[-lit(h, g), y] for g in groups]
+                        cnf.append([-y] + [lit(h, g) for g in groups])
+                    cnf += amoClauses(takes, newVar, self.amo)
+            return cnf
+        for h in self.allHospitalsIndices():
+            cnf.append([lit(h, g) for g in self.internGroupsIndices(lambda g : len(pw[g]) <= self.hospitalsCapa(h, p_q))])
+            for g1 in self.allInternGroupsIndices():
+                for g2 in self.internGroupsIndices(lambda g2 : g1 < g2):
+                    cnf.append([-lit(h, g1), -lit(h, g2)])
+        for g in self.allInternGroupsIndices():
+            if g:
+                for h1 in self.allHospitalsIndices():
+                    for h2 in self.hospitalsIndices(lambda h2 : h1 < h2):
+                        cnf.append([-lit(h1, g), -lit(h2, g)])
+                for g3 in self.intersectionOfInternGroupsIndices(g):
+                    for h1 in self.allHospitalsIndices():
+                        for h2 in self.hospitalsIndices(lambda h2 : h1 < h2):
+                            cnf.append([-lit(h1, g), -lit(h2, g3)])
+                            cnf.append([-lit(h2, g), -lit(h1, g3)])
+        return cnf
+
+    @cached_property
+    def _mechanismBlocks(self):  # (amo, p_q) -> (format of the clauses of one profile, their relative literals, their coefficients of the profile's offset, of its auxiliary offset)
+        return {}
+
+    def mechanismBlocks(self, p_q):  # return the template of mechanismBlock for capacity profile p_q and the current AMO encoding
+        key = (self.amo, p_q)
+        if key not in self._mechanismBlocks:
+            W = self.n * (2**self.m)
+            cnf = self.mechanismTemplate(p_q)
+            fmt = ''.join(' '.join(['%d'] * len(c)) + '\n' for c in cnf)
+            lits = [x for c in cnf for x in c]
+            main = [(1 if x > 0 else -1) if abs(x) <= W else 0 for x in lits]
+            aux = [0 if abs(x) <= W else (1 if x > 0 else -1) for x in lits]
+            self._mechanismBlocks[key] = (fmt, lits, main, aux)
+        return self._mechanismBlocks[key]
+
+    def auxPerProfile(self):  # return the number of auxiliary variables the AMO encoding adds to every profile
+        _, lits, _, _ = self.mechanismBlocks(0)
+        return max([abs(x) for x in lits] + [self.n * (2**self.m)]) - self.n * (2**self.m)
+
+    def auxBase(self):  # return the largest variable of posLiteral; the auxiliary variables come after it
+        allPH, allPI, allPQ = self.profileCounts()
+        return self.profileOffset(allPH-1, allPI-1, allPQ-1, allPH, allPI, allPQ) + self.n * (2**self.m)
+
+    def auxOffset(self, p_H, p_I, p_q, allPH, allPI, allPQ):  # return the offset of the auxiliary variables of profile (p_H, p_I, p_q): its j-th one is auxOffset + j + 1
+        return self.auxBase() + ((p_H * allPI + p_I) * allPQ + p_q) * self.auxPerProfile()
+
+    def mechanismBlock(self, p_H, p_q, internsProfiles, allPH, allPI, allPQ):  # return the clauses of cnfMechanism for the profiles (p_H, p_I, p_q), p_I in internsProfiles, as DIMACS text without the trailing 0
+        fmt, lits, main, aux = self.mechanismBlocks(p_q)
+        W = self.n * (2**self.m)
+        first = self.profileOffset(p_H, 0, p_q, allPH, allPI, allPQ)
+        step = self.profileOffset(p_H, 1, p_q, allPH, allPI, allPQ) - first
+        s = []
+        if not any(aux):
+            pairs = list(zip(lits, main))
+            for p_I in internsProfiles:
+                offset = first + p_I * step
+                s.append(fmt % tuple([x + sign * offset for x, sign in pairs]))
+            return ''.join(s)
+        triples = list(zip(lits, main, aux))
+        auxFirst = self.auxOffset(p_H, 0, p_q, allPH, allPI, allPQ) - W
+        auxStep = allPQ * self.auxPerProfile()
+        for p_I in internsProfiles:
+            offset = first + p_I * step
+            auxOffset = auxFirst + p_I * auxStep
+            s.append(fmt % tuple([x + sign * offset + auxSign * auxOffset for x, sign, auxSign in triples]))
+        return ''.join(s)
+
+    def mechanismClauses(self, p_H, p_q):  # generate the clauses of cnfMechanism for the profiles (p_H, p_I, p_q)
+        allPH, allPI, allPQ = self.profileCounts()
+        W = self.n * (2**self.m)
+        cnf = self.mechanismTemplate(p_q)
+        for p_I in self.innerProfiles(p_H, p_q):
+            offset = self.profileOffset(p_H, p_I, p_q, allPH, allPI, allPQ)
+            auxOffset = self.auxOffset(p_H, p_I, p_q, allPH, allPI, allPQ) - W
+            for c in cnf:
+                yield [(x + (offset if x <= W else auxOffset)) if x > 0 else (x - (offset if -x <= W else auxOffset)) for x in c]
+
+    def benchmarkAMO(self, encodings=AMO_ENCODINGS, axioms=('notBlockedByInterns', 'notBlockedByHospitals', 'fair', 'nonWasteful'), solver=None):  # write cnfMechanism with every AMO encoding to a scratch file and compare variables, clauses, literals, bytes and time,
+        # then the time solveClauses takes on cnfMechanism with the axioms (none: no solving)
+        allPH, allPI, allPQ = self.profileCounts()
+        current = self.amo
+        results = {}
+        try:
+            for encoding in encodings:
+                self.amo = encoding
+                filename = self.axiomFilename('mechanism') + '.' + encoding
+                start = time.time()
+                self.writeAxiomShard('mechanism', self.outerProfiles(), filename)
+                elapsed = time.time() - start
+                templates = [self.mechanismTemplate(p_q) for p_q in self.allHospitalsCapacities()]
+                results[encoding] = {
+                    'variables': self.numberOfVariables(),
+                    'clauses': allPH * allPI * sum(len(cnf) for cnf in templates),
+                    'literals': allPH * allPI * sum(len(c) for cnf in templates for c in cnf),
+                    'bytes': os.path.getsize(filename),
+                    'seconds': elapsed,
+                }
+                removePartial(filename)
+                if axioms:
+                    solution = self.solve(['mechanism'] + list(axioms), solver)
+                    results[encoding]['solveSeconds'] = solution.solveTime
+                    results[encoding]['status'] = solution.status
+                print(encoding.ljust(10) + ' ' + ' '.join(key + '=' + str(round(value, 2) if isinstance(value, (int, float)) else value) for key, value in results[encoding].items()))
+        finally:
+            self.amo = current
+        return results
+
+    def cnfMechanism(self):  # a CNF to ensure that the Mechanism receives the Profile and returns Matching
+        self.writeAxiom('mechanism')
+
+    def profileCounts(self):  # return (allPH, allPI, allPQ), the numbers of hospital's responsive profiles, intern's profiles and capacity profiles
+        return (len(self._responsivePreferences) ** self.n, len(self.allInternsProfiles()), len(self.allHospitalsCapacities()))
+
+    def outerProfiles(self):  # return the pairs (p_H, p_q) over which the axioms are generated, in the order of their files
+        if self.domain is not None:
+            if self.symmetry:
+                raise ValueError('a subdomain cannot be encoded with the symmetric encoding')
+            return sorted(self.domainProfiles())  # the order of the full domain, without going through it
+        allRPH_range, _ = self.allHospitalsResponsiveProfiles()
+        return [(p_H, p_q) for p_H in allRPH_range for p_q in self.allHospitalsCapacities()]
+
+    def axiomFilename(self, axiom):  # return the file which the CNF of axiom is written to
+        return './data/' + AXIOMS[axiom][0] + '(' + str(self.n) + '_' + str(self.m) + ').cnf'
+
+    def axiomClauses(self, axiom, p_H, p_q):  # generate the clauses of axiom for the profiles (p_H, p_I, p_q)
+        return getattr(self, AXIOMS[axiom][1])(p_H, p_q)
+
+    def innerProfiles(self, p_H, p_q):  # return the intern's profiles p_I for which the axioms generate the clauses of (p_H, p_I, p_q)
+        if self.domain is not None:
+            return self.domainProfiles().get((p_H, p_q), [])
+        if self.symmetry:
+            return [p_I for p_I in self.allInternsProfiles() if self.orbit(p_H, p_I, p_q)[0] == (p_H, p_I, p_q)]
+        return self.allInternsProfiles()
+
+    def encodeClauses(self, clauses, stats=None):  # generate the clauses as they are written, i.e. after restriction to the subdomain, propagation and symmetry
+        if self.domain is not None:
+            clauses = self.domainClauses(clauses)
+        if self.propagate:
+            clauses = self.propagateClauses(clauses, stats)
+        if self.symmetry:
+            clauses = self.symmetryClauses(clauses)
+        return clauses
+
+    def encodedClauses(self, axiom, p_H, p_q, stats=None):  # generate the clauses of axiom for the profiles (p_H, p_I, p_q) as they are written
+        return self.encodeClauses(self.axiomClauses(axiom, p_H, p_q), stats)
+
+    def axiomText(self, axiom, p_H, p_q, stats=None):  # return the clauses of axiom for the profiles (p_H, p_I, p_q), one clause per line
+        if axiom == 'mechanism' and not self.propagate and not self.symmetry:  # its clauses never leave their profile, so innerProfiles restricts them to the subdomain
+            return self.mechanismBlock(p_H, p_q, self.innerProfiles(p_H, p_q), *self.profileCounts())
+        return ''.join([' '.join(map(str, c)) + '\n' for c in self.encodedClauses(axiom, p_H, p_q, stats)])
+
+    def writeAxiomShard(self, axiom, pairs, filename, progress=None):  # write the clauses of axiom for the (p_H, p_q) in pairs to filename, and return (filename, propagation statistics, metrics)
+        # resumable: the pairs done are recorded in the checkpoint filename + CHECKPOINT_SUFFIX, and a later call with the same axiom, options and pairs continues after the last recorded pair
+        key = [self.cacheKey(axiom), list(pairs[0]) if pairs else None, list(pairs[-1]) if pairs else None, len(pairs)]  # as JSON gives it back
+        checkpoint = loadCheckpoint(filename, key)
+        stats = checkpoint['stats'] if checkpoint else {'clauses': 0, 'satisfied': 0, 'literals': 0}
+        metrics = checkpoint['metrics'] if checkpoint else newMetrics()
+        counters = self._countPredicates() if self.instrument else None
+        try:
+            with open(filename, 'r+b' if checkpoint else 'wb') as file:
+                file.truncate(checkpoint['bytes'] if checkpoint else 0)
+                file.seek(0, os.SEEK_END)
+                last = time.time()
+                for p_H, p_q in pairs[metrics['pairs']:]:
+                    start = time.time()
+                    text = self.axiomText(axiom, p_H, p_q, stats)
+                    file.write(text.encode())
+                    metrics['outerSeconds'][p_H] = metrics['outerSeconds'].get(p_H, 0.0) + time.time() - start
+                    metrics['clauses'] += text.count('\n')
+                    metrics['pairs'] += 1
+                    if time.time() - last >= CHECKPOINT_INTERVAL or metrics['pairs'] == len(pairs):
+                        saveCheckpoint(filename, file, key, stats, metrics if counters is None else self._countedMetrics(counters, metrics))
+                        last = time.time()
+                    if progress is not None:
+                        progress.report(metrics['pairs'], metrics['clauses'])
+        finally:
+            if counters is not None:
+                self._uncountPredicates(counters, metrics)
+        return (filename, stats, metrics)
+
+    def _countPredicates(self):  # shadow the methods of COUNTED_PREDICATES by counting ones on this market; return the counters for _uncountPredicates
+        calls = dict.fromkeys(COUNTED_PREDICATES, 0)
+        for name in COUNTED_PREDICATES:
+            setattr(self, name, _counted(getattr(self, name), calls, name))
+        return (calls, list(self._orbitCounts))
+
+    def _countedMetrics(self, counters, metrics):  # return a copy of metrics with the counts and the cache hits since _countPredicates added, so that a checkpoint keeps them
+        calls, orbitInfo = counters
+        hits, misses = self._orbitCounts
+        total = dict(metrics, calls=dict(metrics['calls']), cache={name: list(k) for name, k in metrics['cache'].items()})
+        mergeMetrics(total, dict(newMetrics(), calls=calls, cache={'orbit': [hits - orbitInfo[0], misses - orbitInfo[1]]}))
+        return total
+
+    def _uncountPredicates(self, counters, metrics):  # remove the counting methods and add the counts and the cache hits since _countPredicates to metrics (which holds the ones of the run a checkpoint resumes)
+        total = self._countedMetrics(counters, metrics)
+        for name in COUNTED_PREDICATES:
+            delattr(self, name)
+        metrics['calls'] = total['calls']
+        metrics['cache'] = total['cache']
+
+    def cacheKey(self, axiom):  # return the content address of the CNF of axiom: a hash of the axiom, the dimensions, the encoding options and the version of the generators
+        domain = None if self.domain is None else hashlib.sha256(' '.join(map(str, sorted(self.domain))).encode()).hexdigest()  # profile indices may exceed 64 bits
+        options = [axiom, self.n, self.m, self.amo, list(self.propagate), self.symmetry, domain, self.dedup, GENERATOR_VERSION, generatorHash()]
+        return hashlib.sha256(json.dumps(options).encode()).hexdigest()
+
+    def cachedFilename(self, axiom):  # return the file of the cache holding the CNF of axiom with the current options
+        return os.path.join(CACHE_DIR, AXIOMS[axiom][0] + '(' + str(self.n) + '_' + str(self.m) + ')-' + self.cacheKey(axiom)[:20] + '.cnf')
+
+    def cachedEntry(self, axiom):  # return the manifest entry of the CNF of axiom with the current options, or None when the cache doesn't hold it
+        entry = loadManifest().get(self.cacheKey(axiom))
+        if entry is None or not os.path.exists(self.cachedFilename(axiom)):
+            return None
+        return entry
+
+    def writeAxiom(self, axiom, workers=None):  # write the CNF of axiom, or take it from the cache; with several workers, each process writes a shard of outerProfiles() and the shards are joined in order
+        if self.symmetry and axiom in ASYMMETRIC_AXIOMS:
+            raise ValueError(axiom + ' is not invariant under renaming hospitals and interns')
+        start = time.time()
+        if self.cache:
+            entry = self.cachedEntry(axiom)
+            if entry is not None:
+                replaceByCopy(self.cachedFilename(axiom), self.axiomFilename(axiom))
+                if self.propagate:
+                    self.printPropagationStats(axiom, entry['stats'])
+                if self.dedup:
+                    self.printDedupStats(axiom, entry['dedup'])
+                self.finishMetrics(axiom, dict(newMetrics(), clauses=entry.get('clauses', 0), cached=True), start)
+                return
+            target = self.cachedFilename(axiom)
+            os.makedirs(CACHE_DIR, exist_ok=True)
+        else:
+            target = self.axiomFilename(axiom)
+        filename = target + '.partial'  # renamed to target once complete, so that an interrupted run never leaves a truncated CNF behind; the next run resumes it, see writeAxiomShard
+        workers = self.workers if workers is None else workers
+        pairs = self.outerProfiles()
+        progress = Progress(axiom, len(pairs), self.instrument)
+        emitMetrics('start', {'axiom': axiom, 'n': self.n, 'm': self.m, 'pairs': len(pairs), 'workers': workers})
+        if workers <= 1 or len(pairs) <= 1:
+            _, stats, metrics = self.writeAxiomShard(axiom, pairs, filename, progress)
+        else:
+            stats = {'clauses': 0, 'satisfied': 0, 'literals': 0}
+            metrics = newMetrics()
+            nshards = min(len(pairs), workers * 4)
+            bounds = [len(pairs) * k // nshards for k in range(nshards + 1)]
+            tasks = [(axiom, bounds[k], bounds[k+1], filename + '.shard' + str(k)) for k in range(nshards)]
+            with multiprocessing.Pool(workers, initializer=_initWorker, initargs=(self,)) as pool:
+                for shard, shardStats, shardMetrics in pool.imap(_writeShard, tasks):  # every shard keeps its own checkpoint, so the shards are joined once all of them are complete
+                    for key in stats:
+                        stats[key] += shardStats[key]
+                    mergeMetrics(metrics, shardMetrics)
+                    progress.report(metrics['pairs'], metrics['clauses'])
+            with open(filename, 'wb') as file:
+                for task in tasks:
+                    with open(task[3], 'rb') as f:
+                        shutil.copyfileobj(f, file)
+        if self.dedup:
+            dedupStats = dedupCNF(filename, output=target)  # the partial CNF stays as it is until target is complete, so that its checkpoint remains valid
+            metrics['clauses'] -= dedupStats['duplicates'] + dedupStats['subsumed']
+        else:
+            os.replace(filename, target)
+        removePartial(filename)
+        if self.cache:
+            updateManifest(self.cacheKey(axiom), {
+                'axiom': axiom, 'n': self.n, 'm': self.m, 'amo': self.amo, 'propagate': list(self.propagate), 'symmetry': self.symmetry, 'domain': None if self.domain is None else len(self.domain), 'dedup': self.dedup,
+                'version': GENERATOR_VERSION, 'file': os.path.basename(target), 'sha256': fileHash(target), 'bytes': os.path.getsize(target), 'stats': stats,
+                'clauses': metrics['clauses'], 'dedup': dedupStats if self.dedup else None,
+            })
+            replaceByCopy(target, self.axiomFilename(axiom))
+        if self.propagate:
+            self.printPropagationStats(axiom, stats)
+        if self.dedup:
+            self.printDedupStats(axiom, dedupStats)
+        self.finishMetrics(axiom, metrics, start)
+
+    def finishMetrics(self, axiom, metrics, start):  # complete the metrics of the write of axiom started at time start, keep them in generationMetrics and pass them to the hooks
+        metrics['axiom'] = axiom
+        metrics['seconds'] = time.time() - start
+        self.generationMetrics[axiom] = metrics
+        emitMetrics('finish', metrics)
+        if self.instrument:
+            self.printGenerationMetrics(metrics)
+
+    def printGenerationMetrics(self, metrics):  # display the metrics of a write of writeAxiom
+        s = metrics['axiom'] + ': ' + str(metrics['clauses']) + ' clauses in ' + str(round(metrics['seconds'], 2)) + 's'
+        if metrics['cached']:
+            print(s + ' (cached)')
+            return
+        if metrics['seconds'] > 0:
+            s += ' (' + str(int(metrics['clauses'] / metrics['seconds'])) + ' clauses/s)'
+        outer = metrics['outerSeconds']
+        if outer:
+            slowest = max(outer, key=outer.get)
+            s += ', ' + str(len(outer)) + ' p_H: ' + str(round(sum(outer.values()) / len(outer), 4)) + 's mean, ' + str(round(outer[slowest], 4)) + 's max (p_H ' + str(slowest) + ')'
+        print(s)
+        calls = {name: k for name, k in metrics['calls'].items() if k}
+        if calls:
+            print('  calls: ' + ', '.join(name + ' ' + str(k) for name, k in sorted(calls.items(), key=lambda item: -item[1])))
+        for name, (hits, misses) in metrics['cache'].items():
+            if hits + misses:
+                print('  ' + name + ' cache: ' + str(round(100 * hits / (hits + misses), 1)) + '% of ' + str(hits + misses) + ' calls hit')
+
+    def printPropagationStats(self, axiom, stats):
+        self.propagationStats[axiom] = stats
+        print(axiom + ': ' + str(stats['clauses']) + ' clauses, ' + str(stats['satisfied']) + ' satisfied by propagation, ' + str(stats['literals']) + ' falsified literals removed')
+
+    def printDedupStats(self, axiom, stats):
+        self.dedupStats[axiom] = stats
+        ratio = 100 * stats['duplicates'] / stats['clauses'] if stats['clauses'] else 0.0
+        print(axiom + ': ' + str(stats['clauses']) + ' clauses, ' + str(stats['duplicates']) + ' repeated (' + str(round(ratio, 1)) + '%), ' + str(stats['subsumed']) + ' subsumed by units and binary clauses ('
+              + str(stats['binaries']) + ' binary clauses held, ' + str(stats['checks']) + ' pairs checked)')
+
+    def storedClauses(self, axiom):  # generate the clauses of axiom as writeAxiom writes them, read from the cache when it holds them
+        if self.cache and self.cachedEntry(axiom) is not None:
+            with open(self.cachedFilename(axiom), 'r') as file:
+                for line in file:
+                    yield [int(x) for x in line.split()]
+            return
+        if self.dedup:  # dedupCNF needs the whole CNF, so it is written to a scratch file first
+            import tempfile
+            with tempfile.TemporaryDirectory() as tmp:
+                filename = os.path.join(tmp, 'clauses.cnf')
+                with open(filename, 'w') as file:
+                    for p_H, p_q in self.outerProfiles():
+                        file.write(self.axiomText(axiom, p_H, p_q))
+                dedupCNF(filename)
+                with open(filename, 'r') as file:
+                    for line in file:
+                        yield [int(x) for x in line.split()]
+            return
+        for p_H, p_q in self.outerProfiles():
+            yield from self.encodedClauses(axiom, p_H, p_q)
+
+    def toNewLiteral(self, literal, dict):  # rename a literal according to dictionary "dict"
+        if literal < 0:
+            return  -1 *  dict[abs(literal)]
+        else:
+            return dict[literal]
+
+    def numberOfVariables(self):  # return the number of variables posLiteral can take, plus the auxiliary variables of the AMO encoding
+        allPH, allPI, allPQ = self.profileCounts()
+        return allPH * allPI * allPQ * (self.n * (2**self.m) + self.auxPerProfile())
+
+    def largestVariable(self):  # return the largest variable of the CNFs, an auxiliary one included
+        allPH, allPI, allPQ = self.profileCounts()
+        return self.auxBase() + allPH * allPI * allPQ * self.auxPerProfile()
+
+    def variableIndex(self, x):  # return the position of the variable x among all variables: profiles in (p_H, p_I, p_q) order, then (h, g), then the auxiliary variables
+        W = self.n * (2**self.m)
+        allPH, allPI, allPQ = self.profileCounts()
+        if x > self.auxBase():
+            return allPH * allPI * allPQ * W + x - self.auxBase() - 1
+        p, r = divmod(x - 1, W)
+        p_H, rest = divmod(p - 1, allPH * allPI * allPQ)
+        p_I, p_q = divmod(rest, allPH * allPQ)
+        return ((p_H * allPI + p_I) * allPQ + p_q) * W + r
+
+    def indexVariable(self, k):  # inverse of variableIndex
+        W = self.n * (2**self.m)
+        allPH, allPI, allPQ = self.profileCounts()
+        if k >= allPH * allPI * allPQ * W:
+            return self.auxBase() + k - allPH * allPI * allPQ * W + 1
+        p, r = divmod(k, W)
+        p, p_q = divmod(p, allPQ)
+        p_H, p_I = divmod(p, allPI)
+        return self.profileOffset(p_H, p_I, p_q, allPH, allPI, allPQ) + r + 1
+
+    def saveCNF(self, cnfFilename, filename, dictfile):  # Save the CNF (a file or a list of files) as file "filename" in DIMACS format. And save the literal renaming to file "dictfile", see loadRenaming.
+        # a filename ending in .gz, .xz or .zst is compressed on the fly; one ending in .bcnf is written in the binary format of BinaryCNF
+        cnfFilenames = [cnfFilename] if isinstance(cnfFilename, str) else list(cnfFilename)
+        W = self.n * (2**self.m)
+        allPH, allPI, allPQ = self.profileCounts()
+        A = allPH * allPI * allPQ
+        B = allPH * allPQ
+        total = self.numberOfVariables()
+        if self.largestVariable() >= 2**63:
+            raise ValueError('the variables of the ' + str((self.n, self.m)) + ' market exceed 64 bits, which the renaming file of saveCNF cannot hold; solve the CNF with solve() instead')
+        auxBase = self.auxBase()
+        auxIndex = allPH * allPI * allPQ * W - auxBase - 1
+        dense = self.domain is None and total <= DENSE_RENAMING_LIMIT
+        table = array('i' if total < 2**31 else 'q', [0]) * total if dense else {}  # variableIndex (dense), or the variable itself -> new variable
+        renaming = array('q')  # new variable - 1 -> variable
+        writer = clauseWriter(filename)
+        for cnfName in cnfFilenames:
+            writer.section(os.path.splitext(os.path.basename(cnfName))[0])
+            with open(cnfName, 'r') as cnf:
+                for c in cnf:
+                    clause = []
+                    for literal in c.split():
+                        x = int(literal)
+                        v = x if x > 0 else -x
+                        if not dense:
+                            y = table.get(v)
+                            if y is None:
+                                renaming.append(v)
+                                y = table[v] = len(renaming)
+                            clause.append(y if x > 0 else -y)
+                            continue
+                        if v > auxBase:
+                            k = v + auxIndex
+                        else:
+                            p, r = divmod(v - 1, W)
+                            p_H, rest = divmod(p - 1, A)
+                            p_I, p_q = divmod(rest, B)
+                            k = ((p_H * allPI + p_I) * allPQ + p_q) * W + r
+                        y = table[k]
+                        if not y:
+                            renaming.append(v)
+                            y = table[k] = len(renaming)
+                        clause.append(y if x > 0 else -y)
+                    writer.write(clause)
+        writer.close(len(renaming))
+        with open(dictfile, 'wb') as dictF:
+            dictF.write(RENAMING_MAGIC)
+            renaming.tofile(dictF)
+
+    def renamedClauses(self, axioms, selected=()):  # return (renaming, clauses): the clauses of the axioms renamed as saveCNF does, without writing them; renaming maps every new variable - 1 to the original variable
+        # the clauses of the k-th axiom of selected also get the literal -(k+1): the variables 1..len(selected) are the selectors of those axioms (renamed from 0), an axiom holds when its selector is true
+        table = {}
+        renaming = array('q', [0] * len(selected)) if self.largestVariable() < 2**63 else [0] * len(selected)  # a list holds the variables beyond 64 bits
+        clauses = []
+        for axiom in axioms:
+            if self.symmetry and axiom in ASYMMETRIC_AXIOMS:
+                raise ValueError(axiom + ' is not invariant under renaming hospitals and interns')
+            selector = [-(list(selected).index(axiom) + 1)] if axiom in selected else []
+            for c in self.storedClauses(axiom):
+                clause = list(selector)
+                for x in c:
+                    v = x if x > 0 else -x
+                    y = table.get(v)
+                    if y is None:
+                        renaming.append(v)
+                        y = table[v] = len(renaming)
+                    clause.append(y if x > 0 else -y)
+                clauses.append(clause)
+        if self.dedup:
+            clauses = dedupClauses(clauses)
+        return (renaming, clauses)
+
+    def solve(self, axioms, solver=None):  # solve the conjunction of the axioms (names in AXIOMS, 'mechanism' included by the caller) without writing files, see solveClauses
+        start = time.time()
+        renaming, clauses = self.renamedClauses([axioms] if isinstance(axioms, str) else axioms)
+        return solveClauses(len(renaming), clauses, solver, renaming, time.time() - start)
+
+    def sweep(self, axioms, base=('mechanism',), solver=None):  # decide which subsets of axioms are satisfiable together with base, in one CNF with a selector per axiom solved incrementally under assumptions
+        # return {frozenset of axioms: satisfiable}; a subset of a satisfiable set is satisfiable and a superset of an unsatisfiable one is not, so most subsets are never solved
+        axioms = list(axioms)
+        start = time.time()
+        renaming, clauses = self.renamedClauses(list(base) + axioms, axioms)
+        incremental = incrementalSolver(len(renaming), solver)
+        for c in clauses:
+            incremental.addClause(c)
+        results = {}
+        calls = 0
+        for size in range(len(axioms) + 1):
+            for subset in combinations(range(len(axioms)), size):
+                if frozenset(axioms[k] for k in subset) in results:
+                    continue
+                calls += 1
+                if incremental.solve([k + 1 for k in subset]):
+                    model = incremental.model()
+                    found = [k for k in range(len(axioms)) if model[k] > 0]
+                    for sub in powerset(found):
+                        results[frozenset(axioms[k] for k in sub)] = True
+                else:
+                    core = frozenset(axioms[x - 1] for x in incremental.core())
+                    for sup in powerset([a for a in axioms if a not in core]):
+                        results[core | frozenset(sup)] = False
+        print(str(2 ** len(axioms)) + ' combinations decided by ' + str(calls) + ' solver calls in ' + str(round(time.time() - start, 2)) + 's')
+        return results
+
+    def variableProfile(self, x):  # return the profile (p_H, p_I, p_q) of the variable x, an auxiliary one included
+        allPH, allPI, allPQ = self.profileCounts()
+        if x > self.auxBase():
+            p = (x - self.auxBase() - 1) // self.auxPerProfile()
+            p, p_q = divmod(p, allPQ)
+            p_H, p_I = divmod(p, allPI)
+            return (p_H, p_I, p_q)
+        _, _, p_q, p_I, p_H = self._literalCodec.decode(x)
+        return (p_H, p_I, p_q)
+
+    def groupMUS(self, axioms, hard=('mechanism',), solver=None):  # return a minimal list of groups (axiom, (p_H, p_I, p_q)) whose clauses are unsatisfiable together with the hard axioms, or None when all of them are satisfiable
+        # a group is the clauses of an axiom whose first literal lies in the profile; the groups are switched by selector literals, shrunk by the cores of the solver, then by deleting halves of the rest down to single groups
+        groups = {}
+        tagged = []
+        for axiom in list(hard) + list(axioms):
+            if self.symmetry and axiom in ASYMMETRIC_AXIOMS:
+                raise ValueError(axiom + ' is not invariant under renaming hospitals and interns')
+            for p_H, p_q in self.outerProfiles():
+                for c in self.axiomClauses(axiom, p_H, p_q):
+                    key = None if axiom in hard else groups.setdefault((axiom, self.variableProfile(abs(c[0]))), len(groups) + 1)
+                    for d in self.encodeClauses([c]):
+                        tagged.append((key, d))
+        table = {}
+        clauses = []
+        for key, d in tagged:
+            clause = [] if key is None else [-key]
+            for x in d:
+                v = x if x > 0 else -x
+                if v not in table:
+                    table[v] = len(groups) + len(table) + 1
+                clause.append(table[v] if x > 0 else -table[v])
+            clauses.append(clause)
+        incremental = incrementalSolver(len(groups) + len(table), solver)
+        for c in clauses:
+            incremental.addClause(c)
+        selectors = list(range(1, len(groups) + 1))
+        if incremental.solve(selectors):
+            return None
+        while True:
+            core = set(incremental.core())
+            if len(core) == len(selectors):
+                break
+            selectors = [x for x in selectors if x in core]
+            incremental.solve(selectors)
+        k = 0
+        chunk = max(1, len(selectors) // 2)
+        while k < len(selectors):
+            rest = selectors[:k] + selectors[k+chunk:]
+            if not incremental.solve(rest):
+                core = set(incremental.core())
+                selectors = [x for x in selectors if x in core]
+                chunk = min(chunk, max(1, (len(selectors) - k) // 2))
+            elif chunk > 1:
+                chunk //= 2
+            else:
+                k += 1  # the group is necessary; the groups found necessary before stay in every later core
+                chunk = max(1, (len(selectors) - k) // 2)
+        keys = sorted(groups, key=groups.get)
+        return [keys[x - 1] for x in selectors]
+
+    def profileIndex(self, x):  # return the position ((p_H * allPI + p_I) * allPQ + p_q) of the profile of the variable x, an auxiliary one included
+        _, allPI, allPQ = self.profileCounts()
+        p_H, p_I, p_q = self.variableProfile(x)
+        return (p_H * allPI + p_I) * allPQ + p_q
+
+    def mechanismComponents(self, axioms):  # split the clauses of the axioms (cnfMechanism always included) into components that no clause links: return a list of (profile indices, clauses)
+        # cnfMechanism and the stability axioms never link two profiles, so each profile is its own component; the strategy-proofness axioms link the profiles they compare
+        axioms = ['mechanism'] + [axiom for axiom in axioms if axiom != 'mechanism']
+        parent = {}  # profile index -> its parent, for the profiles of the clauses only, so that a subdomain never allocates the whole profile space
+        def find(k):
+            parent.setdefault(k, k)
+            while parent[k] != k:
+                parent[k] = parent[parent[k]]
+                k = parent[k]
+            return k
+        clauses = []
+        for axiom in axioms:
+            if self.symmetry and axiom in ASYMMETRIC_AXIOMS:
+                raise ValueError(axiom + ' is not invariant under renaming hospitals and interns')
+            for c in self.storedClauses(axiom):
+                root = find(self.profileIndex(abs(c[0])))
+                for x in c[1:]:
+                    other = find(self.profileIndex(abs(x)))
+                    if other != root:
+                        parent[other] = root
+                clauses.append(c)
+        components = {}
+        for c in clauses:
+            components.setdefault(find(self.profileIndex(abs(c[0]))), []).append(c)
+        profiles = {}
+        for k in sorted(parent):
+            if find(k) in components:
+                profiles.setdefault(find(k), []).append(k)
+        return [(profiles[root], components[root]) for root in components]
+
+    def componentSolutions(self, clauses, limit=None, solver=None, known=None):  # return the projections on the variables of posLiteral of the models of clauses, at most limit, as tuples of their true variables
+        # enumerated on an incremental solver, every model being blocked by the clause of its true variables of posLiteral (enough since cnfMechanism gives every hospital one group);
+        # components whose clauses are the same up to renaming their variables share their solutions through known: signature -> solutions over the renamed variables
+        table = {}
+        local = []
+        for c in clauses:
+            clause = []
+            for x in c:
+                v = x if x > 0 else -x
+                if v not in table:
+                    table[v] = len(table) + 1
+                clause.append(table[v] if x > 0 else -table[v])
+            local.append(tuple(clause))
+        variables = list(table)
+        auxBase = self.auxBase()
+        main = tuple(v <= auxBase for v in variables)
+        signature = (main, tuple(local))
+        solutions = None if known is None else known.get(signature)
+        if solutions is not None and limit is not None:
+            solutions = solutions[:limit]
+        if solutions is None:
+            solutions = []
+            incremental = incrementalSolver(len(variables), solver)
+            for c in local:
+                incremental.addClause(c)
+            while (limit is None or len(solutions) < limit) and incremental.solve():
+                model = incremental.model()
+                true = tuple(y for y in model if y > 0 and main[y - 1])
+                solutions.append(true)
+                incremental.addClause([-y for y in true])
+            if known is not None:
+                known[signature] = solutions
+        return [tuple(variables[y - 1] for y in true) for true in solutions]
+
+    def countMechanisms(self, axioms, limit=None, sample=None, solver=None, seed=0):  # count the mechanisms satisfying the axioms (cnfMechanism always included), as the product of the counts of the components of mechanismComponents
+        # return {'count', 'log10', 'exact', 'components', 'distinct'}: a component with more than limit solutions counts limit (a lower bound); with sample, only that many random components are counted
+        # and log10 extrapolates their mean to all components (an estimate, count is None); distinct is the number of components solved, the others being the same as one of them up to renaming
+        components = self.mechanismComponents(axioms)
+        exact = sample is None or sample >= len(components)
+        if not exact:
+            chosen = random.Random(seed).sample(components, sample)
+        else:
+            chosen = components
+        known = {}
+        count = 1
+        logCount = 0.0
+        for profiles, clauses in chosen:
+            k = len(self.componentSolutions(clauses, limit, solver, known))
+            if k == 0:
+                return {'count': 0, 'log10': float('-inf'), 'exact': True, 'components': len(components), 'distinct': len(known)}
+            exact = exact and (limit is None or k < limit)
+            count *= k
+            logCount += log10(k)
+        if len(chosen) < len(components):
+            return {'count': None, 'log10': logCount * len(components) / len(chosen), 'exact': False, 'components': len(components), 'distinct': len(known)}
+        return {'count': count, 'log10': logCount, 'exact': exact, 'components': len(components), 'distinct': len(known)}
+
+    def enumerateMechanisms(self, axioms, limit=None, solver=None):  # generate the mechanisms satisfying the axioms (cnfMechanism always included) as MechanismTables, at most limit of them
+        # every component is enumerated once (at most limit solutions each) and the mechanisms are the combinations of their solutions, generated one at a time
+        known = {}
+        solutions = []
+        for profiles, clauses in self.mechanismComponents(axioms):
+            found = self.componentSolutions(clauses, limit, solver, known)
+            if not found:
+                return
+            solutions.append(found)
+        for k, combination in enumerate(product(*solutions)):
+            if limit is not None and k >= limit:
+                return
+            yield self.decodeModel(list(chain.from_iterable(combination)))  # decodeModel expands a model of the symmetric encoding
+
+    def writeMechanisms(self, axioms, filename, limit=None, solver=None):  # write the mechanisms of enumerateMechanisms to filename as they are found, one JSON object per line (the format of MechanismTable.save), and return how many
+        k = 0
+        with open(filename, 'w') as file:
+            for table in self.enumerateMechanisms(axioms, limit, solver):
+                json.dump(table.toDict(), file)
+                file.write('\n')
+                file.flush()
+                k += 1
+        return k
+
+    def printMUS(self, mus):  # display the groups of groupMUS the way interpretVariable does
+        if mus is None:
+            print('-> satisfiable')
+            return
+        for axiom, (p_H, p_I, p_q) in mus:
+            print('-> ' + axiom + ' in profile number' + str(p_H) + ' , ' + str(p_I) + ' , ' + str(p_q))
+            self.printProfile(p_H, p_I, p_q)
+
+
+    #
+    # Encode-time propagation
+    #
+
+    @cached_property
+    def _forcedMasks(self):  # source -> its table of masks, built by forcedTable the first time the source is propagated
+        return {}
+
+    def forcedTable(self, source):  # capacity: [p_q * n + h], notBlockedByInterns: [p_I * n + h], notBlockedByHospitals: [responsive preference] -> mask of the groups g forced false
+        masks = self._forcedMasks
+        if source in masks:
+            return masks[source]
+        pw = self._groups
+        table = []
+        if source == 'capacity':
+            for p_q in self.allHospitalsCapacities():
+                for h in self.allHospitalsIndices():
+                    table.append(sum(1 << g for g in self.internGroupsIndices(lambda g : len(pw[g]) > self.hospitalsCapa(h, p_q))))
+        elif source == 'notBlockedByInterns':
+            for p_I in self.allInternsProfiles():
+                for h in self.allHospitalsIndices():
+                    blocking = self.internsIndices(lambda i : self.internsPrefers(i, -1, h, p_I))
+                    table.append(sum(1 << g for g in self.internGroupsIndices(lambda g : any(i in pw[g] for i in blocking))))
+        else:  # one entry per responsive preference, looked up through hospitalsPrefId_R instead of materialised per hospitals' profile
+            for prefList in self._responsivePrefLists:
+                blocking = self.internsIndices(lambda i : prefList.index(()) < prefList.index((i,)))
+                table.append(sum(1 << g for g in self.internGroupsIndices(lambda g : any(i in pw[g] for i in blocking))))
+        masks[source] = table
+        return table
+
+    def forcedMask(self, p_H, p_I, p_q, h):  # return the mask of the groups g whose variable (h, g) in profile (p_H, p_I, p_q) is forced false by self.propagate
+        mask = 0
+        for source in self.propagate:
+            if source == 'capacity':
+                mask |= self.forcedTable(source)[p_q * self.n + h]
+            elif source == 'notBlockedByInterns':
+                mask |= self.forcedTable(source)[p_I * self.n + h]
+            else:
+                mask |= self.forcedTable(source)[self.hospitalsPrefId_R(h, p_H)]
+        return mask
+
+    def isForced(self, x):  # check whether the variable x is forced false by self.propagate
+        if x > self.auxBase():
             return False
-    return True
-
-def variants_ImprovementForHospital(iProf2, h):
-    variants = []
-    for iProf1 in allInternsProfiles():
-        if (iProf1 != iProf2) & improvementForHospital(iProf1, iProf2, h):
-            variants.append(iProf1)
-    return variants
-
-
-def iVariantsForInterns(i, p):  # return i-variants of the intern's profile p
-    currpref = internsPrefId(i, p)
-    factor = factorial(n+1) ** i
-    rest = p - currpref * factor
-    variants = []
-    for newpref in internsPreferences(lambda newpref: newpref != currpref):
-        variants.append(rest + newpref * factor)
-    return variants
-
-def iVariantsForHospitals(i, p):  # return i-variants of the hosputal's profile p
-    currpref = hospitalsPrefId(i, p)
-    factor = factorial(2**m) ** i
-    rest = p - currpref * factor
-    variants = []
-    for newpref in hospitalsPreferences(lambda newpref: newpref != currpref):
-        variants.append(rest + newpref * factor)
-    return variants
-
-def iVariantsForCapacities(i, q):  # return i-variants of the hospital's capacity vector q
-    currcapa = hospitalsCapa(i, q) - 1
-    factor = m ** i
-    rest = q - currcapa * factor
-    variants = []
-    for newcapa in hospitalsCapacities(lambda newcapa: newcapa < currcapa):
-        variants.append(rest + newcapa * factor)
-    return variants
-
-def iVariantsForHospitals_R(i, p):  # return i-variants of the hosputal's responsive profile p
-    _, y = allHospitalsResponsiveProfiles()
-    currpref = hospitalsPrefId_R(i, p)
-    factor = len(y) ** i
-    rest = p - currpref * factor
-    variants = []
-    for newpref in hospitalsPreferences_R(lambda newpref: newpref != currpref):
-        variants.append(rest + newpref * factor)
-    return variants
-
-def iTruncationVariantsForInterns(i, p):
-    currpref = internsPrefId(i, p)
-    factor = factorial(n+1) ** i
-    rest = p - currpref * factor
-    variants = []
-    for newpref in internsPreferences(lambda newpref: (newpref != currpref) & internsTruncation(newpref, currpref)):
-        variants.append(rest + newpref * factor)
-    return variants
-
-def iTruncationVariantsForHospitals(i, p):
-    _, y = allHospitalsResponsiveProfiles()
-    currpref = hospitalsPrefId_R(i, p)
-    factor = len(y) ** i
-    rest = p - currpref * factor
-    variants = []
-    for newpref in hospitalsPreferences_R(lambda newpref: (newpref != currpref) & hospitalsTruncation(y[newpref], y[currpref])):
-        variants.append(rest + newpref * factor)
-    return variants
-
-def iDroppingVariantsForInterns(i, p):
-    currpref = internsPrefId(i, p)
-    factor = factorial(n+1) ** i
-    rest = p - currpref * factor
-    variants = []
-    for newpref in internsPreferences(lambda newpref: (newpref != currpref) & internsDropping(newpref, currpref)):
-        variants.append(rest + newpref * factor)
-    return variants
-
-def iDroppingVariantsForHospitals(i, p):
-    _, y = allHospitalsResponsiveProfiles()
-    currpref = hospitalsPrefId_R(i, p)
-    factor = len(y) ** i
-    rest = p - currpref * factor
-    variants = []
-    for newpref in hospitalsPreferences_R(lambda newpref: (newpref != currpref) & hospitalsDropping(y[newpref], y[currpref])):
-        variants.append(rest + newpref * factor)
-    return variants
+        W = self.n * (2**self.m)
+        allPH, allPI, allPQ = self.profileCounts()
+        p, r = divmod(x - 1, W)
+        h, g = divmod(r, 2**self.m)
+        p_H, rest = divmod(p - 1, allPH * allPI * allPQ)
+        p_I, p_q = divmod(rest, allPH * allPQ)
+        return bool(self.forcedMask(p_H, p_I, p_q, h) >> g & 1)
+
+    def propagateClauses(self, clauses, stats=None):  # generate clauses without the ones satisfied by the forced assignments and without their falsified literals
+        for c in clauses:
+            if stats is not None:
+                stats['clauses'] += 1
+            if any(x < 0 and self.isForced(-x) for x in c):
+                if stats is not None:
+                    stats['satisfied'] += 1
+                continue
+            d = [x for x in c if x < 0 or not self.isForced(x)]
+            if stats is not None:
+                stats['literals'] += len(c) - len(d)
+            yield d
+
+    def numberOfForcedVariables(self):  # return how many variables of the written profiles (the domain, the orbit representatives) are forced false by self.propagate, i.e. never written
+        count = 0
+        for p_H, p_q in self.outerProfiles():
+            for p_I in self.innerProfiles(p_H, p_q):
+                for h in self.allHospitalsIndices():
+                    count += bin(self.forcedMask(p_H, p_I, p_q, h)).count('1')
+        return count
+
+
+    #
+    # Symmetry: renaming hospitals and interns
+    #
+    # The symmetric encoding is not equisatisfiable with the full one: its models are the anonymous and neutral mechanisms only,
+    # so UNSAT under Market.symmetry rules out those mechanisms and says nothing of the others (solve the full encoding for that).
+
+    @cached_property
+    def _symmetryTables(self):  # (elements (sigma, tau) of the group, their action on intern's preferences, on responsive preferences, on groups)
+        elements = [(sigma, tau) for sigma in permutations(range(self.n)) for tau in permutations(range(self.m))]
+        pw = self._groups
+        internAct = {}
+        for sigma in permutations(range(self.n)):
+            internAct[sigma] = [permutationIndex(tuple(0 if v == 0 else sigma[v-1] + 1 for v in ip)) for ip in self._internPrefLists]
+        groupAct = {}
+        hospitalAct = {}
+        for tau in permutations(range(self.m)):
+            groupAct[tau] = [self._groupIndex[tuple(sorted(tau[i] for i in g))] for g in pw]
+            hospitalAct[tau] = [self.responsivePrefPosition(permutationIndex(tuple(groupAct[tau][self._groupIndex[g]] for g in prefList))) for prefList in self._responsivePrefLists]
+        return (elements,
+                [internAct[sigma] for sigma, tau in elements],
+                [hospitalAct[tau] for sigma, tau in elements],
+                [groupAct[tau] for sigma, tau in elements])
+
+    def profileImage(self, k, p_H, p_I, p_q):  # return the profile obtained from (p_H, p_I, p_q) by the k-th renaming (sigma, tau): hospital h becomes sigma[h], intern i becomes tau[i]
+        elements, internAct, hospitalAct, _ = self._symmetryTables
+        sigma, tau = elements[k]
+        newH = [0] * self.n
+        newQ = [0] * self.n
+        for h in self.allHospitalsIndices():
+            newH[sigma[h]] = hospitalAct[k][self.hospitalsPrefId_R(h, p_H)]
+            newQ[sigma[h]] = self._capacityDigits[p_q][h]
+        newI = [0] * self.m
+        for i in self.allInternsIndices():
+            newI[tau[i]] = internAct[k][self._internDigits[p_I][i]]
+        return (self._responsiveCodec.encode(newH), self._internsCodec.encode(newI), self._capacitiesCodec.encode(newQ))
+
+    def variableImage(self, k, x):  # return the variable x after the k-th renaming of hospitals and interns
+        allPH, allPI, allPQ = self.profileCounts()
+        g, h, p_q, p_I, p_H = self._literalCodec.decode(x)
+        elements, _, _, groupAct = self._symmetryTables
+        P = self.profileImage(k, p_H, p_I, p_q)
+        return self.posLiteral(P[0], P[1], P[2], elements[k][0][h], groupAct[k][g], allPH, allPI, allPQ)
+
+    @cached_property
+    def _orbits(self):  # profile -> its orbit, filled by orbit and emptied when it holds ORBIT_CACHE_SIZE profiles
+        return {}
+
+    @cached_property
+    def _orbitCounts(self):  # [hits, misses] of _orbits
+        return [0, 0]
+
+    def orbit(self, p_H, p_I, p_q):  # return (the representative of the orbit of (p_H, p_I, p_q), i.e. its smallest profile, the renamings mapping (p_H, p_I, p_q) to it)
+        orbits = self._orbits
+        ans = orbits.get((p_H, p_I, p_q))
+        if ans is not None:
+            self._orbitCounts[0] += 1
+            return ans
+        self._orbitCounts[1] += 1
+        images = [self.profileImage(k, p_H, p_I, p_q) for k in range(len(self._symmetryTables[0]))]
+        R = min(images)
+        if len(orbits) >= ORBIT_CACHE_SIZE:
+            orbits.clear()
+        ans = orbits[(p_H, p_I, p_q)] = (R, tuple(k for k, P in enumerate(images) if P == R))
+        return ans
+
+    def canonicalVariable(self, x):  # return the variable of the representative profile that x equals in an anonymous and neutral mechanism
+        if x > self.auxBase():
+            return x
+        allPH, allPI, allPQ = self.profileCounts()
+        g, h, p_q, p_I, p_H = self._literalCodec.decode(x)
+        R, renamings = self.orbit(p_H, p_I, p_q)
+        elements, _, _, groupAct = self._symmetryTables
+        r = min(elements[k][0][h] * (2**self.m) + groupAct[k][g] for k in renamings)
+        return self.profileOffset(R[0], R[1], R[2], allPH, allPI, allPQ) + r + 1
+
+    def symmetryClauses(self, clauses):  # generate clauses over the variables of the representative profiles only, without repeated literals and tautologies
+        for c in clauses:
+            d = []
+            for x in c:
+                y = self.canonicalVariable(x) if x > 0 else -self.canonicalVariable(-x)
+                if y not in d:
+                    d.append(y)
+            if not any(-y in d for y in d):
+                yield d
+
+    def checkSymmetry(self, axioms=None):  # compare, for every axiom (all of AXIOMS by default), the clauses the symmetric encoding writes with the clauses of the full encoding mapped by symmetryClauses
+        # return axiom -> (clauses of the symmetric encoding, canonicalized clauses of the full one, whether they are the same set); the axioms of ASYMMETRIC_AXIOMS are expected to differ
+        full = Market(self.n, self.m, cache=False)
+        symmetric = Market(self.n, self.m, symmetry=True, cache=False)
+        results = {}
+        for axiom in (list(AXIOMS) if axioms is None else axioms):
+            a = set(frozenset(c) for p_H, p_q in symmetric.outerProfiles() for c in symmetric.encodedClauses(axiom, p_H, p_q))
+            b = set(frozenset(c) for p_H, p_q in full.outerProfiles() for c in symmetric.symmetryClauses(full.encodedClauses(axiom, p_H, p_q)))
+            results[axiom] = (len(a), len(b), a == b)
+        return results
+
+    def numberOfOrbits(self):  # return the number of representative profiles the symmetric encoding generates clauses for
+        return sum(len(self.innerProfiles(p_H, p_q)) for p_H, p_q in self.outerProfiles()) if self.symmetry else self.profileCounts()[0] * self.profileCounts()[1] * self.profileCounts()[2]
+
+    def expandModel(self, model):  # take the true variables of a model of a symmetric encoding and return the true variables of the mechanism on all profiles
+        true = set(x for x in model if x > 0)
+        allPH, allPI, allPQ = self.profileCounts()
+        ans = []
+        for p_H in range(allPH):
+            for p_I in self.allInternsProfiles():
+                for p_q in self.allHospitalsCapacities():
+                    for h in self.allHospitalsIndices():
+                        for g in self.allInternGroupsIndices():
+                            x = self.posLiteral(p_H, p_I, p_q, h, g, allPH, allPI, allPQ)
+                            if self.canonicalVariable(x) in true:
+                                ans.append(x)
+        return sorted(ans)
+
+
+    #
+    # Profile subdomains
+    #
+
+    def profileVariants(self, axiom, p_H, p_I, p_q):  # return the profiles other than (p_H, p_I, p_q) that the clauses of axiom for (p_H, p_I, p_q) refer to, see DOMAIN_RELATIONS
+        if axiom not in DOMAIN_RELATIONS:
+            return []
+        indices = self.allHospitalsIndices() if DOMAIN_RELATIONS[axiom][1] == 'hospitals' else self.allInternsIndices()
+        return [v for k in indices for v in self.agentVariants(axiom, k, p_H, p_I, p_q)]
+
+    def agentVariants(self, axiom, k, p_H, p_I, p_q):  # return the profiles that the clauses of axiom for (p_H, p_I, p_q) compare it with for the agent k (a hospital or an intern, see DOMAIN_RELATIONS)
+        part, agents, method = DOMAIN_RELATIONS[axiom]
+        variants = getattr(self, method)
+        if part == 'p_H':
+            return [(v, p_I, p_q) for v in variants(k, p_H)]
+        if part == 'p_q':
+            return [(p_H, p_I, v) for v in variants(k, p_q)]
+        if method == 'variants_ImprovementForHospital':
+            return [(p_H, v, p_q) for v in variants(p_I, k)]
+        return [(p_H, v, p_q) for v in variants(k, p_I)]
+
+    def closeDomain(self, seeds, axioms, depth=None):  # return the profile indices of the seeds (profiles (p_H, p_I, p_q)) and of the profiles the axioms reach from them in at most depth steps (no bound when None)
+        _, allPI, allPQ = self.profileCounts()
+        domain = set()
+        frontier = []
+        for p_H, p_I, p_q in seeds:
+            k = (p_H * allPI + p_I) * allPQ + p_q
+            if k not in domain:
+                domain.add(k)
+                frontier.append((p_H, p_I, p_q))
+        step = 0
+        while frontier and (depth is None or step < depth):
+            reached = []
+            for profile in frontier:
+                for axiom in axioms:
+                    for p_H, p_I, p_q in self.profileVariants(axiom, *profile):
+                        k = (p_H * allPI + p_I) * allPQ + p_q
+                        if k not in domain:
+                            domain.add(k)
+                            reached.append((p_H, p_I, p_q))
+            frontier = reached
+            step += 1
+        return frozenset(domain)
+
+    def randomProfiles(self, k, seed=0):  # return k distinct profiles (p_H, p_I, p_q) drawn at random, to seed closeDomain
+        allPH, allPI, allPQ = self.profileCounts()
+        chosen = random.Random(seed).sample(range(allPH * allPI * allPQ), k)
+        ans = []
+        for x in chosen:
+            p, p_q = divmod(x, allPQ)
+            p_H, p_I = divmod(p, allPI)
+            ans.append((p_H, p_I, p_q))
+        return ans
+
+    def restrictDomain(self, seeds=None, axioms=(), depth=None):  # generate the clauses of the axioms on the closure of the seeds only (all profiles again when seeds is None), and return the number of profiles kept
+        # a clause is kept when all its literals lie in the subdomain, so the CNF is a subset of the full one: an impossibility on a subdomain is an impossibility on all profiles
+        if seeds is None:
+            self.domain = None
+            allPH, allPI, allPQ = self.profileCounts()
+            return allPH * allPI * allPQ
+        self.domain = self.closeDomain(seeds, axioms, depth)
+        return len(self.domain)
+
+    def domainProfiles(self):  # return (p_H, p_q) -> the p_I of the profiles (p_H, p_I, p_q) of the subdomain, in increasing order
+        cached = self.__dict__.get('_domainProfiles')
+        if cached is None or cached[0] is not self.domain:
+            _, allPI, allPQ = self.profileCounts()
+            table = {}
+            for k in sorted(self.domain):
+                p, p_q = divmod(k, allPQ)
+                p_H, p_I = divmod(p, allPI)
+                table.setdefault((p_H, p_q), []).append(p_I)
+            cached = self._domainProfiles = (self.domain, table)
+        return cached[1]
+
+    def domainClauses(self, clauses):  # generate the clauses all of whose literals lie in the subdomain
+        domain = self.domain
+        for c in clauses:
+            if all(self.profileIndex(abs(x)) in domain for x in c):
+                yield c
+
+
+    #
+    # Size planner
+    #
+
+    def planClauses(self, axiom):  # return the numbers of clauses, literals, negative literals and auxiliary literals of the CNF of axiom, counted in closed form from the tables of single preferences
+        # exact without propagation and symmetry (which only remove clauses): every generator is a sum over independent preferences of the agents, so each preference table is summed once and scaled by the number of profiles around it
+        n, m = self.n, self.m
+        allPH, allPI, allPQ = self.profileCounts()
+        Pi, R, G = len(self._internPrefLists), len(self._responsivePreferences), 2**m
+        half = 2**(m-1)  # groups containing a given intern
+        pairs = G * (G-1) // 2  # pairs of groups ordered by a hospital's preference
+        ir, hr = self._internRanks, self._responsiveRanks
+        single = [self.toGroup(i) for i in range(m)]
+        def internsAfter(weight=lambda ip: 1):  # sum over h1 and intern's preferences ip of weight(ip) times the hospitals h2 that ip puts after h1
+            return sum(weight(ip) for h1 in range(n) for ip in range(Pi) for h2 in range(n) if ir[ip*(n+1) + h1+1] < ir[ip*(n+1) + h2+1])
+        if axiom == 'mechanism':
+            templates = [self.mechanismTemplate(p_q) for p_q in self.allHospitalsCapacities()]
+            W = self.n * G
+            return {'clauses': allPH * allPI * sum(len(cnf) for cnf in templates),
+                    'literals': allPH * allPI * sum(len(c) for cnf in templates for c in cnf),
+                    'negatives': allPH * allPI * sum(x < 0 for cnf in templates for c in cnf for x in c),
+                    'auxiliary': allPH * allPI * sum(abs(x) > W for cnf in templates for c in cnf for x in c)}
+        if axiom == 'notBlockedByInterns':
+            clauses = allPH * allPQ * m * Pi**(m-1) * half * sum(1 for h in range(n) for ip in range(Pi) if ir[ip*(n+1)] < ir[ip*(n+1) + h+1])
+            return {'clauses': clauses, 'literals': clauses, 'negatives': clauses, 'auxiliary': 0}
+        if axiom == 'notBlockedByHospitals':
+            clauses = allPI * allPQ * n * R**(n-1) * half * sum(1 for y in range(R) for i in range(m) if hr[y*G] < hr[y*G + single[i]])
+            return {'clauses': clauses, 'literals': clauses, 'negatives': clauses, 'auxiliary': 0}
+        if axiom == 'fair':
+            clauses = allPQ * Pi**(m-1) * R**(n-1) * half**2 * internsAfter() * sum(1 for y in range(R) for i1 in range(m) for i2 in range(m) if hr[y*G + single[i1]] < hr[y*G + single[i2]])
+            negatives = 2 * clauses
+        elif axiom == 'nonWasteful':  # a hospital h1 with capacity q has C(m, q) groups of size q, and the capacities of the other hospitals are free
+            clauses = m**(n-1) * (G-1) * Pi**(m-1) * R**(n-1) * half * internsAfter() * sum(1 for y in range(R) for i in range(m) if hr[y*G + single[i]] < hr[y*G])
+            negatives = clauses
+        elif axiom in ('strategyProofForInterns', 'strategyProofForInternsTruncation', 'strategyProofForInternsDropping'):
+            variants = {'strategyProofForInterns': lambda ip: Pi - 1, 'strategyProofForInternsTruncation': lambda ip: len(self._internTruncations[ip]),
+                        'strategyProofForInternsDropping': lambda ip: len(self._internDroppings[ip])}[axiom]
+            clauses = allPH * allPQ * m * Pi**(m-1) * half * internsAfter(variants)
+            negatives = 2 * clauses
+        elif axiom in ('strategyProofForHospitals', 'strategyProofForHospitalsTruncation', 'strategyProofForHospitalsDropping'):
+            variants = {'strategyProofForHospitals': lambda y: R - 1, 'strategyProofForHospitalsTruncation': lambda y: len(self._hospitalTruncations[y]),
+                        'strategyProofForHospitalsDropping': lambda y: len(self._hospitalDroppings[y])}[axiom]
+            clauses = allPI * allPQ * n * R**(n-1) * pairs * sum(variants(y) for y in range(R))
+            negatives = 2 * clauses
+        elif axiom == 'strategyProofForCapacities':  # a hospital with capacity q has q-1 smaller ones
+            clauses = allPH * allPI * n * m**(n-1) * (m * (m-1) // 2) * pairs
+            negatives = 2 * clauses
+        elif axiom == 'respectingImprovements':  # the improvements for h of an intern's profile are the products of the improvements of its preferences, less the profile itself
+            clauses = allPH * allPQ * pairs * sum(sum(len(self._improvements[h][ip]) for ip in range(Pi))**m - Pi**m for h in range(n))
+            negatives = 2 * clauses
+        else:
+            raise ValueError('unknown axiom: ' + str(axiom))
+        return {'clauses': clauses, 'literals': 2 * clauses, 'negatives': negatives, 'auxiliary': 0}
+
+    def plan(self, axioms=None):  # predict the CNF of every axiom (all of AXIOMS by default) and of saveCNF joining them, without generating anything
+        # return {axiom: {'clauses', 'literals', 'variables', 'bytes', 'exact'}, 'saveCNF': {..., 'binaryBytes', 'memory', 'solveMemory'}}; variables is the largest variable of the file,
+        # bytes assumes the literals spread evenly over the variables, exact tells whether clauses and literals are exact (propagation, symmetry, a subdomain and dedup only make them upper bounds)
+        axioms = list(AXIOMS) if axioms is None else list(axioms)
+        allPH, allPI, allPQ = self.profileCounts()
+        profiles = allPH * allPI * allPQ
+        W = self.n * (2**self.m)
+        auxBase = self.auxBase()
+        aux = profiles * self.auxPerProfile()
+        exact = not self.propagate and not self.symmetry and self.domain is None and not self.dedup
+        main = digitCount(W + 1, auxBase) / (auxBase - W)  # mean digits of a variable of posLiteral
+        auxDigits = digitCount(auxBase + 1, auxBase + aux) / aux if aux else 0
+        result = {}
+        total = {'clauses': 0, 'literals': 0, 'negatives': 0}
+        for axiom in axioms:
+            c = self.planClauses(axiom)
+            digits = (c['literals'] - c['auxiliary']) * main + c['auxiliary'] * auxDigits
+            result[axiom] = {'clauses': c['clauses'], 'literals': c['literals'], 'variables': auxBase + aux if axiom == 'mechanism' else auxBase,
+                             'bytes': int(digits) + c['negatives'] + c['literals'], 'exact': exact}
+            for key in total:
+                total[key] += c[key]
+        nvars = profiles * W + (aux if 'mechanism' in axioms else 0)  # saveCNF renames the variables used to 1..nvars; cnfMechanism uses all of them
+        literals = total['literals']
+        itemsize = 4 if self.numberOfVariables() < 2**31 else 8
+        names = sum(len(AXIOMS[axiom][0]) + len(str(self.n)) + len(str(self.m)) + 3 for axiom in axioms) + max(len(axioms) - 1, 0)
+        result['saveCNF'] = {
+            'clauses': total['clauses'], 'literals': literals, 'variables': nvars, 'exact': exact,
+            'bytes': len(dimacsHeader(nvars, total['clauses'])) + int(literals * digitCount(1, nvars) / nvars if nvars else 0) + total['negatives'] + literals + 2 * total['clauses'],
+            'binaryBytes': len(BINARY_MAGIC) + 32 + 4 * literals + (-4 * literals % 8) + 8 * (total['clauses'] + 1) + 8 * (len(axioms) + 1) + names,
+            'memory': itemsize * self.numberOfVariables() + 8 * nvars,  # the renaming table of saveCNF and the renaming it saves
+            'solveMemory': total['clauses'] * 56 + literals * 36,  # the clauses of renamedClauses as lists of ints, before any solver copies them
+        }
+        return result
+
+    def printPlan(self, plan=None):  # display a plan (by default the one of every axiom) with its sizes in readable units
+        plan = self.plan() if plan is None else plan
+        def size(x):
+            for unit in ('B', 'KiB', 'MiB', 'GiB', 'TiB'):
+                if x < 1024 or unit == 'TiB':
+                    return str(round(x, 1)) + ' ' + unit
+                x /= 1024
+        for name, p in plan.items():
+            s = name.ljust(36) + str(p['clauses']).rjust(16) + ' clauses ' + size(p['bytes']).rjust(12) + ('' if p['exact'] else '  (at most)')
+            if name == 'saveCNF':
+                s += '\n' + ' ' * 36 + str(p['variables']).rjust(16) + ' variables, ' + size(p['binaryBytes']) + ' as ' + BINARY_SUFFIX + ', ' + size(p['memory']) + ' of memory to write, ' + size(p['solveMemory']) + ' to solve in memory'
+            print(s)
+
+
+    #
+    # Deferred acceptance and the axiom checker
+    #
+
+    def hospitalsChoice(self, hr, capacity, mask):  # return the group a hospital with ranks hr and the given capacity prefers among the subsets of the interns in mask
+        masks = self._groupMasks
+        return min((g for g in self.allInternGroupsIndices() if masks[g] & ~mask == 0 and len(self._groups[g]) <= capacity), key=lambda g: hr[g])
+
+    def deferredAcceptance(self, p_H, p_I, p_q, proposing='interns'):  # return the matching of deferred acceptance on profile (p_H, p_I, p_q), as the group index of every hospital
+        # proposing='interns': interns propose to the hospitals they prefer to being unmatched, every hospital holds its choice among the interns it holds and its new proposers;
+        # proposing='hospitals': every hospital proposes to its best capacity acceptable interns that haven't rejected it yet, every intern holds its best acceptable proposal
+        ir = [self.internsRanks(i, p_I) for i in self.allInternsIndices()]
+        hr = [self.hospitalsRanks_R(h, p_H) for h in self.allHospitalsIndices()]
+        capacity = [self.hospitalsCapa(h, p_q) for h in self.allHospitalsIndices()]
+        masks = self._groupMasks
+        if proposing == 'interns':
+            lists = [sorted(self.hospitalsIndices(lambda h : ir[i][h+1] < ir[i][0]), key=lambda h : ir[i][h+1]) for i in self.allInternsIndices()]
+            nextChoice = [0] * self.m
+            held = [0] * self.n
+            free = list(self.allInternsIndices())
+            while free:
+                i = free.pop()
+                if nextChoice[i] == len(lists[i]):
+                    continue
+                h = lists[i][nextChoice[i]]
+                nextChoice[i] += 1
+                applicants = masks[held[h]] | 1 << i
+                held[h] = self.hospitalsChoice(hr[h], capacity[h], applicants)
+                free += self.internsIndices(lambda j : (applicants & ~masks[held[h]]) >> j & 1)
+            return tuple(held)
+        if proposing == 'hospitals':
+            single = [self.toGroup(i) for i in self.allInternsIndices()]
+            lists = [sorted(self.internsIndices(lambda i : hr[h][single[i]] < hr[h][0]), key=lambda i : hr[h][single[i]]) for h in self.allHospitalsIndices()]
+            rejected = [0] * self.n  # hospital -> the mask of the interns that rejected it
+            while True:
+                offers = [[] for _ in self.allInternsIndices()]
+                for h in self.allHospitalsIndices():
+                    for i in [i for i in lists[h] if not rejected[h] >> i & 1][:capacity[h]]:
+                        offers[i].append(h)
+                held = [0] * self.n
+                again = False
+                for i in self.allInternsIndices():
+                    acceptable = [h for h in offers[i] if ir[i][h+1] < ir[i][0]]
+                    best = min(acceptable, key=lambda h : ir[i][h+1]) if acceptable else None
+                    for h in offers[i]:
+                        if h != best:
+                            rejected[h] |= 1 << i
+                            again = True
+                    if best is not None:
+                        held[best] |= 1 << i
+                if not again:
+                    return tuple(masks.index(mask) for mask in held)
+        raise ValueError('unknown proposing side: ' + str(proposing))
+
+    def deferredAcceptanceTable(self, proposing='interns'):  # return the MechanismTable of deferred acceptance on every profile (of the subdomain, when there is one)
+        allPH, allPI, allPQ = self.profileCounts()
+        matches = bytearray()
+        if self.domain is not None:
+            profiles = sorted(self.domain)
+            for k in profiles:
+                p, p_q = divmod(k, allPQ)
+                p_H, p_I = divmod(p, allPI)
+                matches += bytes(self.deferredAcceptance(p_H, p_I, p_q, proposing))
+            return DomainMechanismTable(self.n, self.m, (allPH, allPI, allPQ), profiles, matches)
+        for p_H in range(allPH):
+            for p_I in self.allInternsProfiles():
+                for p_q in self.allHospitalsCapacities():
+                    matches += bytes(self.deferredAcceptance(p_H, p_I, p_q, proposing))
+        return MechanismTable(self.n, self.m, (allPH, allPI, allPQ), matches)
+
+    def checkMechanism(self, table, axioms=None, limit=10):  # check every axiom (all of AXIOMS by default) on the mechanism of a MechanismTable, from its matchings, without SAT nor clauses
+        # return {axiom: (number of violated clauses, the first limit profiles (p_H, p_I, p_q) with one)}: a violation is counted once per clause of the axiom it falsifies
+        # (of the pairwise encoding for 'mechanism'), as checkMechanismClauses does; with Market.symmetry only the representative profiles are checked,
+        # and on a DomainMechanismTable only its profiles, against the variants it holds
+        if isinstance(table, DomainMechanismTable):
+            profiles = [(p_H, p_I, p_q) for p_H, p_I, p_q, _ in table.rows()]
+        else:
+            profiles = [(p_H, p_I, p_q) for p_H, p_q in self.outerProfiles() for p_I in self.innerProfiles(p_H, p_q)]
+        results = {}
+        for axiom in (list(AXIOMS) if axioms is None else axioms):
+            violated = 0
+            found = []
+            for profile in profiles:
+                if axiom in DOMAIN_RELATIONS:
+                    k = self.strategyProofViolations(axiom, table, *profile)
+                else:
+                    k = getattr(self, axiom + 'Violations')(table.matching(*profile), *profile)
+                if k:
+                    violated += k
+                    if len(found) < limit:
+                        found.append(profile)
+            results[axiom] = (violated, found)
+        return results
+
+    def mechanismViolations(self, matching, p_H, p_I, p_q):  # the clauses of cnfMechanism (pairwise) the matching falsifies: a hospital without a group within its capacity, two hospitals sharing interns
+        pw = self._groups
+        masks = self._groupMasks
+        k = 0
+        for h, g in enumerate(matching):
+            if g == UNMATCHED or len(pw[g]) > self.hospitalsCapa(h, p_q):
+                k += 1
+        for h1, g1 in enumerate(matching):
+            for g2 in matching[h1+1:]:
+                if g1 != UNMATCHED and g2 != UNMATCHED and masks[g1] & masks[g2]:
+                    k += 1 if g1 == g2 else 2  # one clause for the same group, one per order of the hospitals for two overlapping ones
+        return k
+
+    def notBlockedByInternsViolations(self, matching, p_H, p_I, p_q):  # the interns matched to a hospital they find unacceptable
+        masks = self._groupMasks
+        ir = [self.internsRanks(i, p_I) for i in self.allInternsIndices()]
+        return sum(1 for h, g in enumerate(matching) if g != UNMATCHED for i in self.allInternsIndices() if masks[g] >> i & 1 and ir[i][0] < ir[i][h+1])
+
+    def notBlockedByHospitalsViolations(self, matching, p_H, p_I, p_q):  # the interns matched to a hospital that finds them unacceptable
+        masks = self._groupMasks
+        hr = [self.hospitalsRanks_R(h, p_H) for h in self.allHospitalsIndices()]
+        return sum(1 for h, g in enumerate(matching) if g != UNMATCHED for i in self.allInternsIndices() if masks[g] >> i & 1 and hr[h][0] < hr[h][self.toGroup(i)])
+
+    def fairViolations(self, matching, p_H, p_I, p_q):  # the (h1, i1, h2, i2), i1 at h2 and i2 at h1, where i1 prefers h1 to h2 and h1 prefers i1 to i2
+        masks = self._groupMasks
+        held = [0 if g == UNMATCHED else masks[g] for g in matching]
+        hr = [self.hospitalsRanks_R(h, p_H) for h in self.allHospitalsIndices()]
+        ir = [self.internsRanks(i, p_I) for i in self.allInternsIndices()]
+        k = 0
+        for h1 in self.allHospitalsIndices():
+            for h2 in self.allHospitalsIndices():
+                for i1 in self.allInternsIndices():
+                    if held[h2] >> i1 & 1 and ir[i1][h1+1] < ir[i1][h2+1]:
+                        k += sum(1 for i2 in self.allInternsIndices() if held[h1] >> i2 & 1 and hr[h1][self.toGroup(i1)] < hr[h1][self.toGroup(i2)])
+        return k
+
+    def nonWastefulViolations(self, matching, p_H, p_I, p_q):  # the (h1, i, h2), i at h2, where h1 finds i acceptable and i prefers h1 to h2, once per group filling h1 other than its own
+        pw = self._groups
+        masks = self._groupMasks
+        hr = [self.hospitalsRanks_R(h, p_H) for h in self.allHospitalsIndices()]
+        ir = [self.internsRanks(i, p_I) for i in self.allInternsIndices()]
+        k = 0
+        for h1, g in enumerate(matching):
+            capa = self.hospitalsCapa(h1, p_q)
+            others = comb(self.m, capa) - (1 if g != UNMATCHED and len(pw[g]) == capa else 0)
+            for i in self.internsIndices(lambda i : hr[h1][self.toGroup(i)] < hr[h1][0]):
+                k += others * sum(1 for h2, g2 in enumerate(matching) if g2 != UNMATCHED and masks[g2] >> i & 1 and ir[i][h1+1] < ir[i][h2+1])
+        return k
+
+    def strategyProofViolations(self, axiom, table, p_H, p_I, p_q):  # the (agent, variant of (p_H, p_I, p_q) held by table) where the matchings of the two profiles falsify a clause of axiom, see DOMAIN_RELATIONS
+        matching = table.matching(p_H, p_I, p_q)
+        k = 0
+        if DOMAIN_RELATIONS[axiom][1] == 'interns':  # i at h2 in the profile, and its group at a hospital h1 that i prefers in the variant
+            masks = self._groupMasks
+            for i in self.allInternsIndices():
+                ir = self.internsRanks(i, p_I)
+                variants = [table.matching(*v) for v in self.agentVariants(axiom, i, p_H, p_I, p_q) if v in table]
+                for h2, g in enumerate(matching):
+                    if g != UNMATCHED and masks[g] >> i & 1:
+                        k += sum(1 for other in variants for h1 in self.allHospitalsIndices() if ir[h1+1] < ir[h2+1] and other[h1] == g)
+            return k
+        better = axiom != 'respectingImprovements'  # the hospital gets a group it prefers in the variant, or a worse one in an improvement for it
+        for h in self.allHospitalsIndices():
+            if matching[h] == UNMATCHED:
+                continue
+            hr = self.hospitalsRanks_R(h, p_H)
+            for v in self.agentVariants(axiom, h, p_H, p_I, p_q):
+                if v in table:
+                    g = table.matching(*v)[h]
+                    if g != UNMATCHED and (hr[g] < hr[matching[h]] if better else hr[matching[h]] < hr[g]):
+                        k += 1
+        return k
+
+    def checkMechanismClauses(self, table, axioms=None, limit=10):  # evaluate the clauses of every axiom on the mechanism of a MechanismTable: as slow as writing the CNF, kept to cross-check checkMechanism
+        # return the results of checkMechanism, the profile of a clause being the one of its first literal; a clause with an auxiliary variable of the AMO encoding counts as satisfied
+        W = self.n * (2**self.m)
+        G = 2**self.m
+        n = self.n
+        allPH, allPI, allPQ = self.profileCounts()
+        A = allPH * allPI * allPQ
+        B = allPH * allPQ
+        auxBase = self.auxBase()
+        matches = table.matches
+        def holds(x):  # whether the literal x is true in the mechanism
+            v = x if x > 0 else -x
+            if v > auxBase:
+                return True
+            p, r = divmod(v - 1, W)
+            p_H, rest = divmod(p - 1, A)
+            p_I, p_q = divmod(rest, B)
+            h, g = divmod(r, G)
+            return (matches[table.index(p_H, p_I, p_q) * n + h] == g) == (x > 0)
+        results = {}
+        for axiom in (list(AXIOMS) if axioms is None else axioms):
+            violated = 0
+            profiles = []
+            for p_H, p_q in self.outerProfiles():
+                clauses = self.axiomClauses(axiom, p_H, p_q)
+                for c in (clauses if self.domain is None else self.domainClauses(clauses)):
+                    if not any(holds(x) for x in c):
+                        violated += 1
+                        profile = self.variableProfile(abs(c[0]))
+                        if len(profiles) < limit and profile not in profiles:
+                            profiles.append(profile)
+            results[axiom] = (violated, profiles)
+        return results
+
+    def printCheck(self, results, table=None):  # display the results of checkMechanism, with the counterexample profiles (and their matchings when table is given)
+        for axiom, (violated, profiles) in results.items():
+            print(axiom + ': ' + ('holds' if not violated else str(violated) + ' violated clauses'))
+            for p_H, p_I, p_q in profiles:
+                print('-> counterexample in profile number' + str(p_H) + ' , ' + str(p_I) + ' , ' + str(p_q))
+                self.printProfile(p_H, p_I, p_q)
+                if table is not None:
+                    print('-> where the matching = ' + ' '.join(str(h) + '/' + str(table.group(p_H, p_I, p_q, h)) for h in self.allHospitalsIndices()))
+
+
+    #
+    # Axioms
+    #
+
+    def notBlockedByInternsClauses(self, p_H, p_q):  # generate the clauses of cnfNotBlockedByInterns for the profiles (p_H, p_I, p_q)
+        allPH, allPI, allPQ = self.profileCounts()
+        for p_I in self.innerProfiles(p_H, p_q):
+            ir = [self.internsRanks(i, p_I) for i in self.allInternsIndices()]
+            for h in self.allHospitalsIndices():
+                for i in self.internsIndices(lambda i : ir[i][0] < ir[i][h+1]):
+                    for g in self.internGroupsIndices(lambda g : self.inGroup(i, g)):
+                        yield [self.negLiteral(p_H, p_I, p_q, h, g, allPH, allPI, allPQ)]
+
+    def cnfNotBlockedByInterns(self):  # CNF stating that the matching mechanism is not blocked by interns
+        self.writeAxiom('notBlockedByInterns')
+
+    def notBlockedByHospitalsClauses(self, p_H, p_q):  # generate the clauses of cnfNotBlockedByHospitals for the profiles (p_H, p_I, p_q)
+        allPH, allPI, allPQ = self.profileCounts()
+        hr = [self.hospitalsRanks_R(h, p_H) for h in self.allHospitalsIndices()]
+        for p_I in self.innerProfiles(p_H, p_q):
+            for h in self.allHospitalsIndices():
+                for i in self.internsIndices(lambda i : hr[h][0] < hr[h][self.toGroup(i)]):
+                    for g in self.internGroupsIndices(lambda g : self.inGroup(i, g)):
+                        yield [self.negLiteral(p_H, p_I, p_q, h, g, allPH, allPI, allPQ)]
+
+    def cnfNotBlockedByHospitals(self):  # CNF stating that the matching mechanism is not blocked by hospitals
+        self.writeAxiom('notBlockedByHospitals')
+
+    def cnfIndividuallyRational(self):  # CNF stating that the matching mechanism is individually rational
+        self.cnfNotBlockedByInterns()
+        self.cnfNotBlockedByHospitals()
+
+    def fairClauses(self, p_H, p_q):  # generate the clauses of cnfFair for the profiles (p_H, p_I, p_q)
+        allPH, allPI, allPQ = self.profileCounts()
+        hr = [self.hospitalsRanks_R(h, p_H) for h in self.allHospitalsIndices()]
+        for p_I in self.innerProfiles(p_H, p_q):
+            ir = [self.internsRanks(i, p_I) for i in self.allInternsIndices()]
+            for h1 in self.allHospitalsIndices():
+                for i1 in self.allInternsIndices():
+                    for h2 in self.hospitalsIndices(lambda h2 : ir[i1][h1+1] < ir[i1][h2+1]):
+                        for i2 in self.internsIndices(lambda i2 : hr[h1][self.toGroup(i1)] < hr[h1][self.toGroup(i2)]):
+                            for g1 in self.internGroupsIndices(lambda g1 : self.inGroup(i1, g1)):
+                                for g2 in self.internGroupsIndices(lambda g2 : self.inGroup(i2, g2)):
+                                    yield [self.negLiteral(p_H, p_I, p_q, h1, g2, allPH, allPI, allPQ), self.negLiteral(p_H, p_I, p_q, h2, g1, allPH, allPI, allPQ)]
+
+    def cnfFair(self):  # CNF stating that the matching mechanism is not blocked by hospital-intern pairs for hospuital's preferences
+        self.writeAxiom('fair')
+
+    def nonWastefulClauses(self, p_H, p_q):  # generate the clauses of cnfNonWasteful for the profiles (p_H, p_I, p_q)
+        allPH, allPI, allPQ = self.profileCounts()
+        hr = [self.hospitalsRanks_R(h, p_H) for h in self.allHospitalsIndices()]
+        for p_I in self.innerProfiles(p_H, p_q):
+            ir = [self.internsRanks(i, p_I) for i in self.allInternsIndices()]
+            for h1 in self.allHospitalsIndices():
+                for i in self.internsIndices(lambda i : hr[h1][self.toGroup(i)] < hr[h1][0]):
+                    for h2 in self.hospitalsIndices(lambda h2 : ir[i][h1+1] < ir[i][h2+1]):
+                        for g1 in self.internGroupsIndices(lambda g1 : self.groupSize(g1, self.hospitalsCapa(h1, p_q))):
+                            for g2 in self.internGroupsIndices(lambda g2 : self.inGroup(i, g2)):
+                                yield [self.posLiteral(p_H, p_I, p_q, h1, g1, allPH, allPI, allPQ), self.negLiteral(p_H, p_I, p_q, h2, g2, allPH, allPI, allPQ)]
+
+    def cnfNonWasteful(self):  # CNF stating that the matching mechanism is not blocked by hospital-intern pairs for hospital's capacities
+        self.writeAxiom('nonWasteful')
+
+    def cnfNotBlockedByHospitalInternPair(self):  # CNF stating that the matching mechanism is not blocked by hospital-intern pairs
+        self.cnfFair()
+        self.cnfNonWasteful()
+
+    def cnfEnvyFree(self):
+        self.cnfIndividuallyRational()
+        self.cnfFair()
+
+    def cnfStable(self): # CNF stating that the matching mechanism is stable
+        self.cnfIndividuallyRational()
+        self.cnfNotBlockedByHospitalInternPair()
+
+
+    def strategyProofForInternsClauses(self, p_H, p_q):  # generate the clauses of cnfStrategyProofForInterns for the profiles (p_H, p_I, p_q)
+        allPH, allPI, allPQ = self.profileCounts()
+        for p_I_1 in self.innerProfiles(p_H, p_q):
+            ir = [self.internsRanks(i, p_I_1) for i in self.allInternsIndices()]
+            for h1 in self.allHospitalsIndices():
+                for i in self.allInternsIndices():
+                    for p_I_2 in self.iVariantsForInterns(i, p_I_1):
+                        for h2 in self.hospitalsIndices(lambda h2 : ir[i][h1+1] < ir[i][h2+1]):
+                            for g in self.internGroupsIndices(lambda g : self.inGroup(i, g)):
+                                yield [self.negLiteral(p_H, p_I_1, p_q, h2, g, allPH, allPI, allPQ), self.negLiteral(p_H, p_I_2, p_q, h1, g, allPH, allPI, allPQ)]
+
+    def cnfStrategyProofForInterns(self):  # CNF stating that the matching mechanism is strategy-proof for interns
+        self.writeAxiom('strategyProofForInterns')
+
+    def strategyProofForHospitalsClauses(self, p_H_1, p_q):  # generate the clauses of cnfStrategyProofForHospitals for the profiles (p_H_1, p_I, p_q)
+        allPH, allPI, allPQ = self.profileCounts()
+        hr = [self.hospitalsRanks_R(h, p_H_1) for h in self.allHospitalsIndices()]
+        for p_I in self.innerProfiles(p_H_1, p_q):
+            for h in self.allHospitalsIndices():
+                for g1 in self.allInternGroupsIndices():
+                    for g2 in self.internGroupsIndices(lambda g2 : hr[h][g1] < hr[h][g2]):
+                        for p_H_2 in self.iVariantsForHospitals_R(h, p_H_1):
+                            yield [self.negLiteral(p_H_1, p_I, p_q, h, g2, allPH, allPI, allPQ), self.negLiteral(p_H_2, p_I, p_q, h, g1, allPH, allPI, allPQ)]
+
+    def cnfStrategyProofForHospitals(self):  # CNF stating that the matching mechanism is strategy-proof for hospitals
+        self.writeAxiom('strategyProofForHospitals')
+
+    def strategyProofForCapacitiesClauses(self, p_H, p_q_1):  # generate the clauses of cnfStrategyProofForCapacities for the profiles (p_H, p_I, p_q_1)
+        allPH, allPI, allPQ = self.profileCounts()
+        hr = [self.hospitalsRanks_R(h, p_H) for h in self.allHospitalsIndices()]
+        for p_I in self.innerProfiles(p_H, p_q_1):
+            for h in self.allHospitalsIndices():
+                for p_q_2 in self.iVariantsForCapacities(h, p_q_1):
+                    for g1 in self.allInternGroupsIndices():
+                        for g2 in self.internGroupsIndices(lambda g2 : hr[h][g1] < hr[h][g2]):
+                            yield [self.negLiteral(p_H, p_I, p_q_1, h, g2, allPH, allPI, allPQ), self.negLiteral(p_H, p_I, p_q_2, h, g1, allPH, allPI, allPQ)]
+
+    def cnfStrategyProofForCapacities(self):  # CNF stating that the matching mechanism is strategy-proof for capacities
+        self.writeAxiom('strategyProofForCapacities')
+
+    def strategyProofForInternsTruncationClauses(self, p_H, p_q):  # generate the clauses of cnfStrategyProofForInternsTruncation for the profiles (p_H, p_I, p_q)
+        allPH, allPI, allPQ = self.profileCounts()
+        for p_I_1 in self.innerProfiles(p_H, p_q):
+            ir = [self.internsRanks(i, p_I_1) for i in self.allInternsIndices()]
+            for h1 in self.allHospitalsIndices():
+                for i in self.allInternsIndices():
+                    for p_I_2 in self.iTruncationVariantsForInterns(i, p_I_1):
+                        for h2 in self.hospitalsIndices(lambda h2 : ir[i][h1+1] < ir[i][h2+1]):
+                            for g in self.internGroupsIndices(lambda g : self.inGroup(i, g)):
+                                yield [self.negLiteral(p_H, p_I_1, p_q, h2, g, allPH, allPI, allPQ), self.negLiteral(p_H, p_I_2, p_q, h1, g, allPH, allPI, allPQ)]
+
+    def cnfStrategyProofForInternsTruncation(self):  # CNF stating that the matching mechanism is strategy-proof for intern's truncation
+        self.writeAxiom('strategyProofForInternsTruncation')
+
+    def strategyProofForInternsDroppingClauses(self, p_H, p_q):  # generate the clauses of cnfStrategyProofForInternsDropping for the profiles (p_H, p_I, p_q)
+        allPH, allPI, allPQ = self.profileCounts()
+        for p_I_1 in self.innerProfiles(p_H, p_q):
+            ir = [self.internsRanks(i, p_I_1) for i in self.allInternsIndices()]
+            for h1 in self.allHospitalsIndices():
+                for i in self.allInternsIndices():
+                    for p_I_2 in self.iDroppingVariantsForInterns(i, p_I_1):
+                        for h2 in self.hospitalsIndices(lambda h2 : ir[i][h1+1] < ir[i][h2+1]):
+                            for g in self.internGroupsIndices(lambda g : self.inGroup(i, g)):
+                                yield [self.negLiteral(p_H, p_I_1, p_q, h2, g, allPH, allPI, allPQ), self.negLiteral(p_H, p_I_2, p_q, h1, g, allPH, allPI, allPQ)]
+
+    def cnfStrategyProofForInternsDropping(self):  # CNF stating that the matching mechanism is strategy-proof for intern's dropping
+        self.writeAxiom('strategyProofForInternsDropping')
+
+    def strategyProofForHospitalsTruncationClauses(self, p_H_1, p_q):  # generate the clauses of cnfStrategyProofForHospitalsTruncation for the profiles (p_H_1, p_I, p_q)
+        allPH, allPI, allPQ = self.profileCounts()
+        hr = [self.hospitalsRanks_R(h, p_H_1) for h in self.allHospitalsIndices()]
+        for p_I in self.innerProfiles(p_H_1, p_q):
+            for h in self.allHospitalsIndices():
+                for g1 in self.allInternGroupsIndices():
+                    for g2 in self.internGroupsIndices(lambda g2 : hr[h][g1] < hr[h][g2]):
+                        for p_H_2 in self.iTruncationVariantsForHospitals(h, p_H_1):
+                            yield [self.negLiteral(p_H_1, p_I, p_q, h, g2, allPH, allPI, allPQ), self.negLiteral(p_H_2, p_I, p_q, h, g1, allPH, allPI, allPQ)]
+
+    def cnfStrategyProofForHospitalsTruncation(self):  # CNF stating that the matching mechanism is strategy-proof for hospital's truncation
+        self.writeAxiom('strategyProofForHospitalsTruncation')
+
+    def strategyProofForHospitalsDroppingClauses(self, p_H_1, p_q):  # generate the clauses of cnfStrategyProofForHospitalsDropping for the profiles (p_H_1, p_I, p_q)
+        allPH, allPI, allPQ = self.profileCounts()
+        hr = [self.hospitalsRanks_R(h, p_H_1) for h in self.allHospitalsIndices()]
+        for p_I in self.innerProfiles(p_H_1, p_q):
+            for h in self.allHospitalsIndices():
+                for g1 in self.allInternGroupsIndices():
+                    for g2 in self.internGroupsIndices(lambda g2 : hr[h][g1] < hr[h][g2]):
+                        for p_H_2 in self.iDroppingVariantsForHospitals(h, p_H_1):
+                            yield [self.negLiteral(p_H_1, p_I, p_q, h, g2, allPH, allPI, allPQ), self.negLiteral(p_H_2, p_I, p_q, h, g1, allPH, allPI, allPQ)]
+
+    def cnfStrategyProofForHospitalsDropping(self):  # CNF stating that the matching mechanism is strategy-proof for hospital's dropping
+        self.writeAxiom('strategyProofForHospitalsDropping')
+
+    def respectingImprovementsClauses(self, p_H, p_q):  # generate the clauses of cnfRespectingImprovements for the profiles (p_H, p_I, p_q)
+        allPH, allPI, allPQ = self.profileCounts()
+        hr = [self.hospitalsRanks_R(h, p_H) for h in self.allHospitalsIndices()]
+        for p_I_2 in self.innerProfiles(p_H, p_q):
+            for h in self.allHospitalsIndices():
+                for g1 in self.allInternGroupsIndices():
+                    for g2 in self.internGroupsIndices(lambda g2 : hr[h][g2] < hr[h][g1]):
+                        for p_I_1 in self.variants_ImprovementForHospital(p_I_2, h):
+                            yield [self.negLiteral(p_H, p_I_1, p_q, h, g1, allPH, allPI, allPQ), self.negLiteral(p_H, p_I_2, p_q, h, g2, allPH, allPI, allPQ)]
+
+    def cnfRespectingImprovements(self):  # CNF stating that the matching mechanism respects improvements of hospital quality
+        self.writeAxiom('respectingImprovements')
+
+
+#
+# Market Dimension
+#
+
+# the default value for dimensions (n:total number of hospitals, m:total number of interns)
+n = 2
+m = 2
+
+_markets = {}
+
+def market(k, l):  # return the market of k hospitals and l interns, sharing its tables with every other user of the same dimensions
+    if (k, l) not in _markets:
+        _markets[(k, l)] = Market(k, l)
+    return _markets[(k, l)]
+
+_market = market(n, m)
+
+# change the value of dimensions
+def setDimension(k, l):   
+    global n, m, _market
+    n = k
+    m = l
+    _market = market(k, l)
+
+# return the current value of dimensions
+def getDimension():
+    return (n, m)
+
+def currentMarket():  # return the market that the module-level functions below work on
+    return _market
+
+
+def setWorkers(k):  # write the CNFs of the current market with k processes
+    _market.workers = k
+
+# the forced assignments applied while writing: 'capacity' (implied by cnfMechanism), 'notBlockedByInterns', 'notBlockedByHospitals'
+# (only sound when the corresponding axiom is part of the final CNF); variables forced false are never written and read as false
+UNIT_SOURCES = ('capacity', 'notBlockedByInterns', 'notBlockedByHospitals')
+
+def setAMO(encoding):  # write cnfMechanism of the current market with the given at-most-one encoding, one of AMO_ENCODINGS
+    if encoding not in AMO_ENCODINGS:
+        raise ValueError('unknown at-most-one encoding: ' + str(encoding))
+    _market.amo = encoding
+
+def setSymmetry(on=True):  # encode only anonymous and neutral mechanisms of the current market, on one representative profile per orbit (decode with expandModel);
+    # an UNSAT answer then only rules out the anonymous and neutral mechanisms, not every mechanism
+    _market.symmetry = on
+
+def setCache(on=True):  # reuse the CNFs of the current market kept in CACHE_DIR (on) or always write them again to ./data (off)
+    _market.cache = on
+
+def setInstrumentation(on=True):  # count the predicate calls and print progress lines and a summary while writing the CNFs of the current market
+    _market.instrument = on
+
+def setDedup(on=True):  # drop the repeated and subsumed clauses from the CNFs of the current market, see dedupCNF
+    _market.dedup = on
+
+def setPropagation(*sources):  # write the CNFs of the current market with the forced assignments of the given sources propagated
+    for source in sources:
+        if source not in UNIT_SOURCES:
+            raise ValueError('unknown source of forced assignments: ' + str(source))
+    _market.propagate = tuple(sources)
 
 
+# the worker processes of Market.writeAxiom
+_workerMarket = None
+
+def _initWorker(mk):
+    global _workerMarket
+    _workerMarket = mk
+
+def _writeShard(task):
+    axiom, start, stop, filename = task
+    return _workerMarket.writeAxiomShard(axiom, _workerMarket.outerProfiles()[start:stop], filename)
+
 
 #
-# Creating and Editing CNF
+# Instrumentation of Market.writeAxiom
 #
 
-def posLiteral(p_H, p_I, p_q, h, g, allPH, allPI, allPQ):  # return a positive literal which represents that hospital h matches group of interns g in profile (p_H, p_I, p_q)
-    p = (p_H * (allPH * allPI * allPQ)) + (p_I * (allPH * allPQ)) + p_q + 1
-    return p * (n * (2**m)) + (h * (2**m)) + g + 1
-
-def negLiteral(p_H, p_I, p_q, h, g, allPH, allPI, allPQ):  # return a negative literal which represents that hospital h doesn't match  group of interns g in profile (p_H, p_I, p_q)
-    return (-1) * posLiteral(p_H, p_I, p_q, h, g, allPH, allPI, allPQ)
-
-def interpretVariable(x, hospRespDict):  # interpret the literal and present it in a readable form
-    g = (x-1) % (2**m)
-    h = ((x - g - 1) % (n * (2**m))) // (2**m)
-    p = ((x - h * (2**m) - g - 1)) // (n * (2**m))
-
-    _, allRPrefH = allHospitalsResponsiveProfiles()
-    allPH = (len(allRPrefH)) ** n
-    allPI = (factorial(n+1)) ** m
-    allPQ = m ** n
-    p_q = (p-1) % allPQ
-    p_I = ((p - p_q - 1) % (allPH * allPI * allPQ)) // (allPH * allPQ)
-    p_H = (p - p_I * (allPH * allPQ) - p_q - 1) // (allPH * allPI * allPQ)
-
-    pw = list(powerset(allInternsIndices()))
-    print ('-> in profile number' + str(p_H) + ' , ' + str(p_I) + ' , ' + str(p_q) + ' match ' + str(h) + '/' + str(pw[g]))
-    s_h = '( '
-    s_q = ''
-    for i in allHospitalsIndices():
-        s_h = s_h + '>'.join([str(x) for x in hospitalsPrefList_R(i, p_H)]) + ' '
-        s_q = s_q + str(hospitalsCapa(i, p_q)) + ' '
-    s_h = s_h + ')'
-    s_i = '( '
-    for i in allInternsIndices():
-        s_i = s_i + '>'.join([str(x) for x in internsPrefList(i, p_I)]) + ' '
-    s_i = s_i + ')'
-    print('-> where hospital profile ' + str(p_H) + ' = ' + s_h)
-    print('-> where hospital capacity ' + str(p_q) + ' = ' + s_q)
-    print('-> where intern profile ' + str(p_I) + ' = ' + s_i)
-
-def printMechanism(mec):  # takes a Matching Mechanism and displays how Mechanism outputs to the profile 
-    allRPH_range, allRPrefH = allHospitalsResponsiveProfiles()
-    allPH = (len(allRPrefH)) ** n
-    allPI = (factorial(n+1)) ** m
-    allPQ = m ** n
-    for h in allRPH_range:
-        for q in allHospitalsCapacities():
-            for i in allInternsProfiles():
-                s = '( '
-                for k in allHospitalsIndices():
-                    s = s + '>'.join([str(x) for x in hospitalsPrefList_R(k, h)]) + '/Capacity:' + str(hospitalsCapa(k, q)) + ' '
-                s = s + '| '
-                for l in allInternsIndices():
-                    s = s = '>'.join([str(x) for x in internsPrefList(l, i)]) + ' '
-                s = s + ') --> { '
-                for k in allHospitalsIndices():
-                    for l in internsIndices(lambda o : posLiteral(h, i, q, k, l, allPH, allPI, allPQ) in mec):
-                        s = s + str(k) + str(l) + ' '
-                s = s + '}'
-                print(s)
-
-def subsetsOfInternGroupsIndices(g):  # return groups that are proper subsets of group g
-    ans = []
-    pw = list(powerset(allInternsIndices()))
-    gPW = pw[g]
-    for p in pw:
-        if (p != gPW) and (p != ()):
-            if set(p).issubset(gPW):
-                ans.append(pw.index(p))
-    return ans
+PROGRESS_INTERVAL = 10.0  # seconds between two progress events (and lines, with Market.instrument) while an axiom is written
+
+# the methods of Market whose calls are counted with Market.instrument, i.e. the predicates and tables the axiom generators query
+COUNTED_PREDICATES = ('internsRanks', 'hospitalsRanks_R', 'inGroup', 'toGroup', 'groupSize', 'hospitalsCapa', 'internsPrefId', 'hospitalsPrefId_R',
+                      'iVariantsForInterns', 'iVariantsForHospitals_R', 'iVariantsForCapacities', 'iTruncationVariantsForInterns', 'iTruncationVariantsForHospitals',
+                      'iDroppingVariantsForInterns', 'iDroppingVariantsForHospitals', 'variants_ImprovementForHospital', 'isForced', 'canonicalVariable', 'orbit')
+
+_metricsHooks = []
+
+def addMetricsHook(hook):  # call hook(event, metrics) on every event of writeAxiom: 'start' and 'finish' of an axiom, and 'progress' every PROGRESS_INTERVAL seconds
+    _metricsHooks.append(hook)
+
+def removeMetricsHook(hook):
+    _metricsHooks.remove(hook)
+
+def emitMetrics(event, metrics):
+    for hook in list(_metricsHooks):
+        hook(event, metrics)
+
+def newMetrics():  # the metrics of a write: clauses written, outer profiles (p_H, p_q) done, seconds spent on every p_H, calls of COUNTED_PREDICATES, cache name -> [hits, misses]
+    return {'axiom': None, 'cached': False, 'seconds': 0.0, 'clauses': 0, 'pairs': 0, 'outerSeconds': {}, 'calls': {}, 'cache': {}}
+
+def mergeMetrics(total, part):  # add the metrics of a shard to total
+    total['clauses'] += part['clauses']
+    total['pairs'] += part['pairs']
+    for p_H, seconds in part['outerSeconds'].items():
+        total['outerSeconds'][p_H] = total['outerSeconds'].get(p_H, 0.0) + seconds
+    for name, k in part['calls'].items():
+        total['calls'][name] = total['calls'].get(name, 0) + k
+    for name, (hits, misses) in part['cache'].items():
+        h, mi = total['cache'].get(name, [0, 0])
+        total['cache'][name] = [h + hits, mi + misses]
+
+def _counted(f, calls, name):
+    def g(*args):
+        calls[name] += 1
+        return f(*args)
+    return g
+
+class Progress:  # the progress of a write over total outer profiles: report(done, clauses) emits a 'progress' event with an ETA every PROGRESS_INTERVAL seconds
+    def __init__(self, axiom, total, verbose=False):
+        self.axiom = axiom
+        self.total = total
+        self.verbose = verbose  # also print the progress lines
+        self.start = self.last = time.time()
+
+    def report(self, done, clauses):
+        now = time.time()
+        if now - self.last < PROGRESS_INTERVAL or done >= self.total:
+            return
+        self.last = now
+        elapsed = now - self.start
+        eta = elapsed * (self.total - done) / done if done else None
+        emitMetrics('progress', {'axiom': self.axiom, 'pairs': done, 'total': self.total, 'clauses': clauses, 'elapsed': elapsed, 'eta': eta})
+        if self.verbose:
+            print(self.axiom + ': ' + str(done) + '/' + str(self.total) + ' outer profiles (' + str(round(100 * done / self.total, 1)) + '%), ' + str(clauses) + ' clauses, '
+                  + str(int(elapsed)) + 's elapsed, ETA ' + (str(int(eta)) + 's' if eta is not None else '?'), flush=True)
+
+
+#
+# Checkpoints of Market.writeAxiomShard
+#
+
+CHECKPOINT_SUFFIX = '.ckpt'  # the checkpoint of a partial CNF: JSON of its key, the bytes of the CNF it covers, the propagation statistics and the metrics so far
+CHECKPOINT_INTERVAL = 30.0  # seconds between two checkpoints while an axiom is written (the last outer profile always gets one)
+
+def saveCheckpoint(filename, file, key, stats, metrics):  # make the clauses written to file durable, then record them in the checkpoint of filename, atomically
+    file.flush()
+    os.fsync(file.fileno())
+    checkpoint = filename + CHECKPOINT_SUFFIX
+    with open(checkpoint + '.tmp', 'w') as f:
+        json.dump({'key': key, 'bytes': file.tell(), 'stats': stats, 'metrics': metrics}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(checkpoint + '.tmp', checkpoint)
+
+def loadCheckpoint(filename, key):  # return the checkpoint of filename, or None when there is none, it was written with another key or the file is shorter than it records
+    try:
+        with open(filename + CHECKPOINT_SUFFIX, 'r') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if checkpoint['key'] != key or not os.path.exists(filename) or os.path.getsize(filename) < checkpoint['bytes']:
+        return None
+    metrics = checkpoint['metrics']
+    metrics['outerSeconds'] = {int(p_H): t for p_H, t in metrics['outerSeconds'].items()}  # JSON made the keys strings
+    return checkpoint
+
+def removePartial(filename):  # remove a partial CNF of Market.writeAxiom, its shards and their checkpoints
+    directory, name = os.path.split(filename)
+    for f in os.listdir(directory or '.'):
+        if f.startswith(name):
+            os.remove(os.path.join(directory, f))
+
+
+#
+# Cache of the axiom CNFs
+#
+
+CACHE_DIR = './data/cache'  # the CNFs of Market.writeAxiom, one file per cacheKey, and manifest.json: cacheKey -> what the file holds and its sha256
+GENERATOR_VERSION = 1  # bump when the clauses of an axiom change in a way the source of Market doesn't show
+
+_generatorHash = None
+
+def generatorHash():  # a hash of the source of this module, so that editing a generator or a helper it uses (amoClauses, MixedRadix, dedupCNF...) never reuses the CNFs written before
+    global _generatorHash
+    if _generatorHash is None:
+        _generatorHash = hashlib.sha256(inspect.getsource(inspect.getmodule(Market)).encode()).hexdigest()
+    return _generatorHash
+
+def fileHash(filename):  # the sha256 of the content of a file
+    h = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def loadManifest():
+    try:
+        with open(os.path.join(CACHE_DIR, 'manifest.json'), 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+def saveManifest(manifest):  # replace the manifest atomically
+    filename = os.path.join(CACHE_DIR, 'manifest.json')
+    with open(filename + '.tmp' + str(os.getpid()), 'w') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(filename + '.tmp' + str(os.getpid()), filename)
+
+MANIFEST_LOCK_TIMEOUT = 60.0  # seconds after which the lock of the manifest is taken as left by a killed process and broken
+
+@contextlib.contextmanager
+def manifestLock():  # hold CACHE_DIR/manifest.lock, so that concurrent processes (the workers of writeAxiom, parallel runs) never lose each other's entries
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    lock = os.path.join(CACHE_DIR, 'manifest.lock')
+    while True:
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock) > MANIFEST_LOCK_TIMEOUT:
+                    os.remove(lock)
+            except FileNotFoundError:
+                pass
+            time.sleep(0.01)
+    try:
+        yield
+    finally:
+        os.remove(lock)
+
+def updateManifest(key, entry):  # add an entry to the manifest
+    with manifestLock():
+        manifest = loadManifest()
+        manifest[key] = entry
+        saveManifest(manifest)
+
+def replaceByCopy(source, filename):  # make filename a copy of source, atomically; never a hard link, which an in-place edit of filename would turn into a corrupted cache file
+    tmp = filename + '.tmp' + str(os.getpid())
+    shutil.copyfile(source, tmp)
+    os.replace(tmp, filename)
+
+def verifyCache():  # check the files of the cache against the sha256 of the manifest, drop the entries that don't match and return their keys
+    with manifestLock():
+        manifest = loadManifest()
+        bad = [key for key, entry in manifest.items() if not os.path.exists(os.path.join(CACHE_DIR, entry['file'])) or fileHash(os.path.join(CACHE_DIR, entry['file'])) != entry['sha256']]
+        for key in bad:
+            path = os.path.join(CACHE_DIR, manifest[key]['file'])
+            if os.path.exists(path):
+                os.remove(path)
+            del manifest[key]
+        if bad:
+            saveManifest(manifest)
+    return bad
+
 
-def intersectionOfInternGroupsIndices(g):
+#
+# DIMACS files
+#
+
+DEDUP_CHUNK = 1 << 20  # the clauses dedupCNF sorts in memory at once; a longer CNF is sorted in runs on disk which are merged
+SUBSUMING_BINARIES = 1 << 20  # the most binary clauses dedupCNF holds to subsume longer clauses; the binary clauses after them subsume nothing, which only leaves clauses in
+
+def _clauseKey(line):  # the order of dedupCNF: by length, then by sorted literals, so that units come before the binary clauses and those before the longer clauses they may subsume
+    c = sorted(int(x) for x in line.split())
+    return (len(c), c)
+
+def dedupCNF(filename, chunk=DEDUP_CHUNK, subsume=True, output=None):  # rewrite a CNF written by writeAxiom (one clause per line) to output (filename itself by default) without repeated clauses and, with subsume, without the clauses containing a unit or a binary clause of it
+    # return {'clauses': read, 'duplicates': repeated clauses dropped, 'subsumed': subsumed clauses dropped, 'binaries': binary clauses held for subsumption, 'checks': pairs of literals looked up};
+    # the clauses come out in the order of _clauseKey, with their literals as written. Besides a run of chunk clauses, only the units and at most SUBSUMING_BINARIES binary clauses are kept in memory,
+    # and only the binary clauses whose signs also occur in the longer clauses: none of cnfMechanism, whose binary clauses are negative and whose longer clauses positive
+    stats = {'clauses': 0, 'duplicates': 0, 'subsumed': 0, 'binaries': 0, 'checks': 0}
+    output = filename if output is None else output
+    runs = []
+    longerSigns = set()  # the signs (True: positive) of the literals of the clauses longer than 2
+    try:
+        with open(filename, 'r') as file:
+            while True:
+                lines = list(islice(file, chunk))
+                if not lines:
+                    break
+                stats['clauses'] += len(lines)
+                keyed = sorted((_clauseKey(line), line) for line in lines)
+                run = filename + '.run' + str(len(runs))
+                runs.append(run)
+                with open(run, 'w') as out:
+                    previous = None
+                    for key, line in keyed:
+                        if key == previous:
+                            stats['duplicates'] += 1
+                            continue
+                        previous = key
+                        if key[0] > 2 and len(longerSigns) < 2:
+                            longerSigns.update(x > 0 for x in key[1])
+                        out.write(line)
+        files = [open(run, 'r') for run in runs]
+        try:
+            units = set()
+            binaries = set()
+            with open(output + '.dedup', 'w') as out:
+                previous = None
+                for key, line in heapq.merge(*[((_clauseKey(line), line) for line in f) for f in files]):
+                    if key == previous:
+                        stats['duplicates'] += 1
+                        continue
+                    previous = key
+                    size, lits = key
+                    if subsume and units and any(x in units for x in lits):
+                        stats['subsumed'] += 1
+                        continue
+                    if subsume and size > 2 and binaries:
+                        stats['checks'] += size * (size - 1) // 2
+                        if any(pair in binaries for pair in combinations(lits, 2)):
+                            stats['subsumed'] += 1
+                            continue
+                    if size == 1:
+                        units.add(lits[0])
+                    elif size == 2 and len(binaries) < SUBSUMING_BINARIES and (lits[0] > 0) in longerSigns and (lits[1] > 0) in longerSigns:
+                        binaries.add(tuple(lits))
+                        stats['binaries'] += 1
+                    out.write(line)
+        finally:
+            for f in files:
+                f.close()
+        os.replace(output + '.dedup', output)
+    finally:
+        for run in runs + [output + '.dedup']:
+            if os.path.exists(run):
+                os.remove(run)
+    return stats
+
+def dedupClauses(clauses, stats=None):  # return the clauses (lists of literals) without repeats and without the ones containing a unit or a binary clause of them, in their order; the counts go to stats as in dedupCNF
+    # unlike dedupCNF this works across axioms, e.g. the units of notBlockedByInterns subsume clauses of fair and nonWasteful
+    stats = {'clauses': 0, 'duplicates': 0, 'subsumed': 0, 'binaries': 0, 'checks': 0} if stats is None else stats
+    units = set(c[0] for c in clauses if len(c) == 1)
+    binaries = set(tuple(sorted(c)) for c in clauses if len(c) == 2)
+    stats['binaries'] += len(binaries)
+    seen = set()
     ans = []
-    pw = list(powerset(allInternsIndices()))
-    gPW = pw[g]
-    for p in pw:
-        if (p != gPW) and (p != ()):
-            if set(p) & set(gPW):
-                ans.append(pw.index(p))
+    for c in clauses:
+        stats['clauses'] += 1
+        key = tuple(sorted(c))
+        if key in seen:
+            stats['duplicates'] += 1
+            continue
+        seen.add(key)
+        if len(key) > 1 and any(x in units for x in key):
+            stats['subsumed'] += 1
+            continue
+        if len(key) > 2:
+            stats['checks'] += len(key) * (len(key) - 1) // 2
+            if any(pair in binaries for pair in combinations(key, 2)):
+                stats['subsumed'] += 1
+                continue
+        ans.append(c)
     return ans
 
-def cnfMechanism():  # a CNF to ensure that the Mechanism receives the Profile and returns Matching
-    filename = './data/mechanism' + '(' + str(n) + '_' + str(m) + ').cnf'
-    with open(filename, 'w') as file:
-#        cnf = []
-        pw = list(powerset(allInternsIndices()))
-        allRPH_range, _ = allHospitalsResponsiveProfiles()
-        allPH = len(allRPH_range)
-        allPI = len(allInternsProfiles())
-        allPQ = len(allHospitalsCapacities())
-        for p_H in allRPH_range:
-            for p_q in allHospitalsCapacities():
-                for p_I in allInternsProfiles():
-                    for h in allHospitalsIndices():
-                        s = ''
-                        for g in internGroupsIndices(lambda g : len(pw[g]) <= hospitalsCapa(h, p_q)):
-                            s += (str(posLiteral(p_H, p_I, p_q, h, g, allPH, allPI, allPQ)) + ' ')
-                        file.write(s + '\n')
-#                        cnf.append([posLiteral(p_H, p_I, p_q, h, g, allPH, allPI, allPQ) for g in internGroupsIndices(lambda g : len(pw[g]) <= hospitalsCapa(h, p_q))])
-                        for g1 in allInternGroupsIndices():
-                            for g2 in internGroupsIndices(lambda g2 : g1 < g2):
-                                file.write(str(negLiteral(p_H, p_I, p_q, h, g1, allPH, allPI, allPQ)) + ' ' + str(negLiteral(p_H, p_I, p_q, h, g2, allPH, allPI, allPQ)) + '\n')
-#                                cnf.append([negLiteral(p_H, p_I, p_q, h, g1, allPH, allPI, allPQ), negLiteral(p_H, p_I, p_q, h, g2, allPH, allPI, allPQ)])
-                    for g in allInternGroupsIndices():
-                        if g:
-                            for h1 in allHospitalsIndices():
-                                for h2 in hospitalsIndices(lambda h2 : h1 < h2):
-                                    file.write(str(negLiteral(p_H, p_I, p_q, h1, g, allPH, allPI, allPQ)) + ' ' + str(negLiteral(p_H, p_I, p_q, h2, g, allPH, allPI, allPQ)) + '\n')
-#                                    cnf.append([negLiteral(p_H, p_I, p_q, h1, g, allPH, allPI, allPQ), negLiteral(p_H, p_I, p_q, h2, g, allPH, allPI, allPQ)])
-                            for g3 in intersectionOfInternGroupsIndices(g):
-                                for h1 in allHospitalsIndices():
-                                    for h2 in hospitalsIndices(lambda h2 : h1 < h2):
-                                        file.write(str(negLiteral(p_H, p_I, p_q, h1, g, allPH, allPI, allPQ)) + ' ' + str(negLiteral(p_H, p_I, p_q, h2, g3, allPH, allPI, allPQ)) + '\n')
-                                        file.write(str(negLiteral(p_H, p_I, p_q, h2, g, allPH, allPI, allPQ)) + ' ' + str(negLiteral(p_H, p_I, p_q, h1, g3, allPH, allPI, allPQ)) + '\n')
-#                                        cnf.append([negLiteral(p_H, p_I, p_q, h1, g, allPH, allPI, allPQ), negLiteral(p_H, p_I, p_q, h2, g3, allPH, allPI, allPQ)])
-#                                        cnf.append([negLiteral(p_H, p_I, p_q, h2, g, allPH, allPI, allPQ), negLiteral(p_H, p_I, p_q, h1, g3, allPH, allPI, allPQ)])
-#        return cnf
-
-def toNewLiteral(literal, dict):  # rename a literal according to dictionary "dict"
-    if literal < 0:
-        return  -1 *  dict[abs(literal)]
-    else:
-        return dict[literal]
-
-def saveCNF(cnfFilename, filename, dictfile):  # Save the CNF as file "filename" in DIMACS format. And save a dictionary of literal renaming to file "dict".
-#    allPH = (factorial(2 ** m)) ** n
-#    allPI = (factorial(n+1)) ** m
-#    allPQ = m ** n
-#    p = ((allPH-1) * (allPH * allPI * allPQ)) + ((allPI-1) * (allPH * allPQ)) + (allPQ-1) + 1
-#    nvars = p * (n * (2**m)) + ((n-1) * (2**m)) + ((2**m)-1) + 1
-#    nvars = (((factorial(2 ** m)) ** n) * (m ** n) * ((factorial(n+1)) ** m)) * n * (2 ** m)
-    with open(filename, 'w') as file:
-        with open(dictfile, 'wb') as dictF:
-            mydict = defaultdict(lambda: len(mydict)+1)
-            nclauses = 0
-            with open(cnfFilename, 'r') as cnf:
-                for c in cnf:
-                    for literal in c.split(' '):
-                        dum = mydict[abs(int(literal))]
-                    nclauses += 1
-            pickle.dump(dict(mydict), dictF)
-            nvars = len(mydict)
-            file.write('p cnf ' + str(nvars) + ' ' + str(nclauses) + '\n')
-            with open(cnfFilename, 'r') as cnf:
-                for c in cnf:
-                    file.write(' '.join([str(toNewLiteral(int(literal), mydict)) for literal in c.split(' ')]) + ' 0\n')
+DENSE_RENAMING_LIMIT = 1 << 28  # the most variables saveCNF renames through a dense table; beyond it, and with a subdomain, it uses a dictionary over the variables met
+
+RENAMING_MAGIC = b'M2ORNM1\n'  # first bytes of a renaming file written by saveCNF, followed by the renamed variables as native int64
+
+def dimacsHeader(nvars, nclauses):  # the problem line of a DIMACS file, padded to a fixed width so that it can be patched after the clauses are written
+    return ('p cnf ' + str(nvars) + ' ' + str(nclauses)).ljust(47) + '\n'
+
+COMPRESSED_SUFFIXES = ('.gz', '.xz', '.zst')  # DIMACS files compressed with gzip, xz and zstandard (the last one needs the zstandard module)
+BINARY_SUFFIX = '.bcnf'
+BINARY_MAGIC = b'M2OCNF1\n'  # first bytes of a binary CNF file, see BinaryCNF
+
+def openCompressed(filename, mode):  # open a file for binary reading ('rb') or writing ('wb'), compressed according to its suffix
+    if filename.endswith('.gz'):
+        import gzip
+        return gzip.open(filename, mode, compresslevel=6) if mode == 'wb' else gzip.open(filename, mode)
+    if filename.endswith('.xz'):
+        import lzma
+        return lzma.open(filename, mode)
+    if filename.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError('reading or writing ' + filename + ' needs the zstandard module')
+        if mode == 'rb':  # a buffered reader reads by line, across the frames of the problem line and of the body
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(filename, 'rb'), read_across_frames=True, closefd=True))
+        return zstandard.open(filename, mode)
+    return open(filename, mode)
+
+class DimacsWriter:  # write clauses as a DIMACS file, compressed or not, in one pass: the body is written first and the problem line is put in front of it at the end
+    def __init__(self, filename):
+        self.filename = filename
+        self.compressed = filename.endswith(COMPRESSED_SUFFIXES)
+        root, suffix = os.path.splitext(filename)
+        self.bodyName = root + '.body' + suffix if self.compressed else filename
+        self.file = openCompressed(self.bodyName, 'wb')
+        if not self.compressed:
+            self.file.write(dimacsHeader(0, 0).encode())
+        self.buffer = []
+        self.nclauses = 0
+
+    def section(self, name):
+        pass
+
+    def write(self, clause):
+        self.buffer.append(' '.join(map(str, clause)))
+        if len(self.buffer) >= 65536:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write((' 0\n'.join(self.buffer) + ' 0\n').encode())
+            self.nclauses += len(self.buffer)
+            self.buffer = []
+
+    def close(self, nvars):
+        self.flush()
+        if not self.compressed:
+            self.file.seek(0)
+            self.file.write(dimacsHeader(nvars, self.nclauses).encode())
+            self.file.close()
+            return
+        self.file.close()
+        # gzip members, xz streams and zstandard frames may be concatenated: the problem line is compressed on its own and followed by the compressed body
+        with openCompressed(self.filename, 'wb') as file:
+            file.write(('p cnf ' + str(nvars) + ' ' + str(self.nclauses) + '\n').encode())
+        with open(self.filename, 'ab') as file:
+            with open(self.bodyName, 'rb') as body:
+                shutil.copyfileobj(body, file)
+        os.remove(self.bodyName)
+
+class BinaryWriter:  # write clauses in the binary format of BinaryCNF, in one pass
+    def __init__(self, filename):
+        self.file = open(filename, 'wb')
+        self.file.write(BINARY_MAGIC)
+        self.file.write(array('q', [0, 0, 0, 0]).tobytes())
+        self.literals = array('i')
+        self.nliterals = 0
+        self.offsets = array('q', [0])
+        self.sections = array('q')
+        self.names = []
+
+    def section(self, name):
+        self.sections.append(len(self.offsets) - 1)
+        self.names.append(name)
+
+    def write(self, clause):
+        self.literals.extend(clause)
+        self.nliterals += len(clause)
+        self.offsets.append(self.nliterals)
+        if len(self.literals) >= 1 << 20:
+            self.literals.tofile(self.file)
+            self.literals = array('i')
+
+    def close(self, nvars):
+        self.literals.tofile(self.file)
+        self.file.write(bytes(-self.file.tell() % 8))
+        self.offsets.tofile(self.file)
+        self.sections.append(len(self.offsets) - 1)
+        self.sections.tofile(self.file)
+        self.file.write('\n'.join(self.names).encode())
+        self.file.seek(len(BINARY_MAGIC))
+        self.file.write(array('q', [nvars, len(self.offsets) - 1, self.nliterals, len(self.names)]).tobytes())
+        self.file.close()
+
+def clauseWriter(filename):  # return the writer of saveCNF for filename: section(name) starts the clauses of an axiom, write(clause) adds a clause, close(nvars) finishes the file
+    return BinaryWriter(filename) if filename.endswith(BINARY_SUFFIX) else DimacsWriter(filename)
+
+class BinaryCNF:  # a CNF file written by saveCNF in the binary format, memory-mapped:
+    # BINARY_MAGIC, then native int64 nvars, nclauses, nliterals, nsections, then the literals as int32 (padded to 8 bytes),
+    # the offsets as int64 (the k-th clause is literals[offsets[k]:offsets[k+1]]), the first clause of every section and the end as int64, and the section names separated by newlines
+    def __init__(self, filename):
+        import mmap
+        with open(filename, 'rb') as file:
+            if file.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+                raise ValueError(filename + ' is not a binary CNF file written by saveCNF')
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        start, nsections = self._mapViews()
+        view = self.view
+        bounds = view[start:start + 8 * (nsections + 1)].cast('q')
+        start += 8 * (nsections + 1)
+        names = bytes(view[start:]).decode().split('\n') if nsections else []
+        self.sections = {name: (bounds[k], bounds[k+1]) for k, name in enumerate(names)}  # section name (the axiom file without .cnf) -> (its first clause, its end)
+        bounds.release()
+
+    def _mapViews(self):  # set the views of the literals and the offsets on self.map, return where the sections start and their number
+        self.view = view = memoryview(self.map)
+        start = len(BINARY_MAGIC)
+        self.nvars, self.nclauses, nliterals, nsections = view[start:start+32].cast('q')
+        start += 32
+        self.literals = view[start:start + 4 * nliterals].cast('i')
+        start += 4 * nliterals
+        start += -start % 8
+        self.offsets = view[start:start + 8 * (self.nclauses + 1)].cast('q')
+        return start + 8 * (self.nclauses + 1), nsections
+
+    def __len__(self):
+        return self.nclauses
+
+    def clause(self, k):  # the literals of the k-th clause, without copy: the view must be released (or dropped) before close, copy it (list, bytes) to keep it longer
+        return self.literals[self.offsets[k]:self.offsets[k+1]]
+
+    def clauses(self, start=0, stop=None):  # generate the clauses start..stop-1
+        for k in range(start, self.nclauses if stop is None else stop):
+            yield self.clause(k)
+
+    def section(self, name):  # generate the clauses of the axiom file name, e.g. 'fair(2_2)'
+        return self.clauses(*self.sections[name])
+
+    def close(self):  # unmap the file, fails and stays open while a view returned by clause is still alive
+        self.literals.release()
+        self.offsets.release()
+        self.view.release()
+        try:
+            self.map.close()
+        except BufferError:
+            self._mapViews()
+            raise BufferError('cannot close a BinaryCNF while a clause it returned is still referenced, copy the clauses kept beyond the reader') from None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def loadRenaming(dictfile):  # load a renaming saved by saveCNF: the returned array maps every new variable - 1 to the original variable
+    with open(dictfile, 'rb') as dictF:
+        if dictF.read(len(RENAMING_MAGIC)) != RENAMING_MAGIC:
+            raise ValueError(dictfile + ' is not a renaming file written by saveCNF')
+        renaming = array('q', dictF.read())
+    return renaming
+
+def renamingDict(dictfile):  # the renaming saved by saveCNF as a dictionary: original variable -> new variable
+    return {v: k + 1 for k, v in enumerate(loadRenaming(dictfile))}
+
+
+#
+# Mechanisms decoded from models
+#
+
+UNMATCHED = 255  # the entry of MechanismTable for a hospital the model doesn't match to any group
+
+class MechanismTable:  # the matching of a mechanism on every profile, one byte per hospital: matches[((p_H * allPI + p_I) * allPQ + p_q) * n + h] is the group index hospital h gets
+    def __init__(self, n, m, counts, matches):
+        self.n = n
+        self.m = m
+        self.counts = tuple(counts)  # (allPH, allPI, allPQ)
+        self.matches = matches  # a bytearray
+        self.groups = list(powerset(range(m)))
+
+    def __len__(self):  # the number of profiles
+        return len(self.matches) // self.n
+
+    def __contains__(self, profile):  # whether the table holds the matching of profile (p_H, p_I, p_q)
+        return True
+
+    def index(self, p_H, p_I, p_q):  # the position of profile (p_H, p_I, p_q) in the table
+        allPH, allPI, allPQ = self.counts
+        return (p_H * allPI + p_I) * allPQ + p_q
+
+    def matching(self, p_H, p_I, p_q):  # return the group index of every hospital in profile (p_H, p_I, p_q)
+        k = self.index(p_H, p_I, p_q) * self.n
+        return tuple(self.matches[k:k + self.n])
+
+    def group(self, p_H, p_I, p_q, h):  # return the interns hospital h gets in profile (p_H, p_I, p_q), or None when unmatched
+        g = self.matches[self.index(p_H, p_I, p_q) * self.n + h]
+        return None if g == UNMATCHED else self.groups[g]
+
+    def rows(self):  # generate (p_H, p_I, p_q, matching) for every profile, in the order of the table
+        allPH, allPI, allPQ = self.counts
+        k = 0
+        for p_H in range(allPH):
+            for p_I in range(allPI):
+                for p_q in range(allPQ):
+                    yield (p_H, p_I, p_q, tuple(self.matches[k:k + self.n]))
+                    k += self.n
+
+    def toNumPy(self):  # the table as a NumPy array of shape (allPH, allPI, allPQ, n), without copy
+        import numpy
+        return numpy.frombuffer(self.matches, dtype=numpy.uint8).reshape(self.counts + (self.n,))
+
+    def save(self, filename):  # write the table as CSV (one row per profile, the interns of every hospital separated by spaces), JSON or NumPy .npy, according to the suffix of filename
+        if filename.endswith('.csv'):
+            import csv
+            with open(filename, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['p_H', 'p_I', 'p_q'] + ['hospital' + str(h) for h in range(self.n)])
+                for p_H, p_I, p_q, matching in self.rows():
+                    writer.writerow([p_H, p_I, p_q] + ['-' if g == UNMATCHED else ' '.join(map(str, self.groups[g])) for g in matching])
+        elif filename.endswith('.json'):
+            with open(filename, 'w') as file:
+                json.dump(self.toDict(), file)
+        elif filename.endswith('.npy') and not isinstance(self, DomainMechanismTable):
+            import numpy
+            numpy.save(filename, self.toNumPy())
+        else:
+            raise ValueError('unknown mechanism format: ' + filename)
+
+    def toDict(self):  # the table as the JSON object of save
+        return {'n': self.n, 'm': self.m, 'counts': self.counts, 'groups': self.groups, 'matches': list(self.matches)}
+
+class DomainMechanismTable(MechanismTable):  # the matching of a mechanism on the profiles of a subdomain only (see Market.restrictDomain): matches[j * n + h] for the j-th profile of profiles
+    def __init__(self, n, m, counts, profiles, matches):
+        super().__init__(n, m, counts, matches)
+        self.profiles = profiles  # the profile indices ((p_H * allPI + p_I) * allPQ + p_q) of the subdomain, in increasing order
+        self.positions = {k: j for j, k in enumerate(profiles)}
+
+    def __contains__(self, profile):
+        return MechanismTable.index(self, *profile) in self.positions
+
+    def index(self, p_H, p_I, p_q):  # the position of profile (p_H, p_I, p_q) in the table; a KeyError outside the subdomain
+        return self.positions[MechanismTable.index(self, p_H, p_I, p_q)]
+
+    def rows(self):
+        allPH, allPI, allPQ = self.counts
+        for j, k in enumerate(self.profiles):
+            p, p_q = divmod(k, allPQ)
+            p_H, p_I = divmod(p, allPI)
+            yield (p_H, p_I, p_q, tuple(self.matches[j * self.n:(j + 1) * self.n]))
+
+    def toNumPy(self):  # the table as a NumPy array of shape (number of profiles, n), without copy
+        import numpy
+        return numpy.frombuffer(self.matches, dtype=numpy.uint8).reshape((len(self.profiles), self.n))
+
+    def toDict(self):
+        return dict(MechanismTable.toDict(self), profiles=self.profiles)
+
+def loadMechanism(filename):  # load a MechanismTable saved as JSON or NumPy .npy
+    if filename.endswith('.json'):
+        with open(filename, 'r') as file:
+            d = json.load(file)
+        if 'profiles' in d:
+            return DomainMechanismTable(d['n'], d['m'], d['counts'], d['profiles'], bytearray(d['matches']))
+        return MechanismTable(d['n'], d['m'], d['counts'], bytearray(d['matches']))
+    if filename.endswith('.npy'):
+        import numpy
+        a = numpy.load(filename)
+        n = a.shape[3]
+        m = next(k for k in range(1, a.shape[2] + 1) if k**n == a.shape[2])  # allPQ = m^n
+        return MechanismTable(n, m, a.shape[:3], bytearray(a.astype(numpy.uint8).tobytes()))
+    raise ValueError('unknown mechanism format: ' + filename)
 
 
 #
-# Axioms
+# Solving
 #
 
-def cnfNotBlockedByInterns():  # CNF stating that the matching mechanism is not blocked by interns
-    filename = './data/notBlockedByInterns' + '(' + str(n) + '_' + str(m) + ').cnf'
-    with open(filename, 'w') as file:
-#        cnf = []
-        allRPH_range, _ = allHospitalsResponsiveProfiles()
-        allPH = len(allRPH_range)
-        allPI = len(allInternsProfiles())
-        allPQ = len(allHospitalsCapacities())
-        for p_H in allRPH_range:
-            for p_q in allHospitalsCapacities():
-                for p_I in allInternsProfiles():
-                    for h in allHospitalsIndices():
-                        for i in internsIndices(lambda i : internsPrefers(i, -1, h, p_I)):
-                            for g in internGroupsIndices(lambda g : inGroup(i, g)):
-                                file.write(str(negLiteral(p_H, p_I, p_q, h, g, allPH, allPI, allPQ)) + '\n')
-#                                cnf.append([negLiteral(p_H, p_I, p_q, h, g, allPH, allPI, allPQ)])
-#        return cnf
-
-def cnfNotBlockedByHospitals():  # CNF stating that the matching mechanism is not blocked by hospitals
-    filename = './data/notBlockedByHospitals' + '(' + str(n) + '_' + str(m) + ').cnf'
-    with open(filename, 'w') as file:    
-#        cnf = []
-        allRPH_range, _ = allHospitalsResponsiveProfiles()
-        allPH = len(allRPH_range)
-        allPI = len(allInternsProfiles())
-        allPQ = len(allHospitalsCapacities())
-        for p_H in allRPH_range:
-            for p_q in allHospitalsCapacities():
-                for p_I in allInternsProfiles():
-                    for h in allHospitalsIndices():
-                        for i in internsIndices(lambda i : hospitalsPrefers_R(h, (), (i,), p_H)):
-                            for g in internGroupsIndices(lambda g : inGroup(i, g)):
-                                file.write(str(negLiteral(p_H, p_I, p_q, h, g, allPH, allPI, allPQ)) + '\n')
-#                                cnf.append([negLiteral(p_H, p_I, p_q, h, g, allPH, allPI, allPQ)])
-#        return cnf
-
-def cnfIndividuallyRational():  # CNF stating that the matching mechanism is individually rational
-    cnfNotBlockedByInterns()
-    cnfNotBlockedByHospitals()
-
-def cnfFair():  # CNF stating that the matching mechanism is not blocked by hospital-intern pairs for hospuital's preferences
-    filename = './data/fair' + '(' + str(n) + '_' + str(m) + ').cnf'
-    with open(filename, 'w') as file:    
-#        cnf = []
-        allRPH_range, _ = allHospitalsResponsiveProfiles()
-        allPH = len(allRPH_range)
-        allPI = len(allInternsProfiles())
-        allPQ = len(allHospitalsCapacities())
-        for p_H in allRPH_range:
-            for p_q in allHospitalsCapacities():
-                for p_I in allInternsProfiles():
-                    for h1 in allHospitalsIndices():
-                        for i1 in allInternsIndices():
-                            for h2 in hospitalsIndices(lambda h2 : internsPrefers(i1, h1, h2, p_I)):
-                                for i2 in internsIndices(lambda i2 : hospitalsPrefers_R(h1, (i1,), (i2,), p_H)):
-                                    for g1 in internGroupsIndices(lambda g1 : inGroup(i1, g1)):
-                                        for g2 in internGroupsIndices(lambda g2 : inGroup(i2, g2)):
-                                            file.write(str(negLiteral(p_H, p_I, p_q, h1, g2, allPH, allPI, allPQ)) + ' ' + str(negLiteral(p_H, p_I, p_q, h2, g1, allPH, allPI, allPQ)) + '\n')
-#                                            cnf.append([negLiteral(p_H, p_I, p_q, h1, g2, allPH, allPI, allPQ), negLiteral(p_H, p_I, p_q, h2, g1, allPH, allPI, allPQ)])
-#        return cnf
-
-def cnfNonWasteful():  # CNF stating that the matching mechanism is not blocked by hospital-intern pairs for hospital's capacities
-    filename = './data/non-wasteful' + '(' + str(n) + '_' + str(m) + ').cnf'
-    with open(filename, 'w') as file:    
-#        cnf = []
-        allRPH_range, _ = allHospitalsResponsiveProfiles()
-        allPH = len(allRPH_range)
-        allPI = len(allInternsProfiles())
-        allPQ = len(allHospitalsCapacities())
-        for p_H in allRPH_range:
-            for p_q in allHospitalsCapacities():
-                for p_I in allInternsProfiles():
-                    for h1 in allHospitalsIndices():
-                        for i in internsIndices(lambda i : hospitalsPrefers_R(h1, (i,), (), p_H)):
-                            for h2 in hospitalsIndices(lambda h2 : internsPrefers(i, h1, h2, p_I)):
-                                for g1 in internGroupsIndices(lambda g1 : groupSize(g1, hospitalsCapa(h1, p_q))):
-                                    for g2 in internGroupsIndices(lambda g2 : inGroup(i, g2)):
-                                        file.write(str(posLiteral(p_H, p_I, p_q, h1, g1, allPH, allPI, allPQ)) + ' ' + str(negLiteral(p_H, p_I, p_q, h2, g2, allPH, allPI, allPQ)) + '\n')
-#                                        cnf.append([posLiteral(p_H, p_I, p_q, h1, g1, allPH, allPI, allPQ), negLiteral(p_H, p_I, p_q, h2, g2, allPH, allPI, allPQ)])
-#        return cnf
-
-def cnfNotBlockedByHospitalInternPair():  # CNF stating that the matching mechanism is not blocked by hospital-intern pairs
-    cnfFair()
-    cnfNonWasteful()
-
-def cnfEnvyFree():
-    cnfIndividuallyRational()
-    cnfFair()
-
-def cnfStable(): # CNF stating that the matching mechanism is stable
-    cnfIndividuallyRational()
-    cnfNotBlockedByHospitalInternPair()
-
-
-def cnfStrategyProofForInterns():  # CNF stating that the matching mechanism is strategy-proof for interns
-    filename = './data/strategyProofForInterns' + '(' + str(n) + '_' + str(m) + ').cnf'
-    with open(filename, 'w') as file:    
-#        cnf = []
-        allRPH_range, _ = allHospitalsResponsiveProfiles()
-        allPH = len(allRPH_range)
-        allPI = len(allInternsProfiles())
-        allPQ = len(allHospitalsCapacities())
-        for p_H in allRPH_range:
-            for p_q in allHospitalsCapacities():
-                for p_I_1 in allInternsProfiles():
-                    for h1 in allHospitalsIndices():
-                        for i in allInternsIndices():
-                            for p_I_2 in iVariantsForInterns(i, p_I_1):
-                                for h2 in hospitalsIndices(lambda h2 : internsPrefers(i, h1, h2, p_I_1)):
-                                    for g in internGroupsIndices(lambda g : inGroup(i, g)):
-                                        file.write(str(negLiteral(p_H, p_I_1, p_q, h2, g, allPH, allPI, allPQ)) + ' ' + str(negLiteral(p_H, p_I_2, p_q, h1, g, allPH, allPI, allPQ)) + '\n')
-#                                        cnf.append([negLiteral(p_H, p_I_1, p_q, h2, g, allPH, allPI, allPQ), negLiteral(p_H, p_I_2, p_q, h1, g, allPH, allPI, allPQ)])
-#        return cnf
-
-def cnfStrategyProofForHospitals():  # CNF stating that the matching mechanism is strategy-proof for hospitals
-    filename = './data/strategyProofForHospitals' + '(' + str(n) + '_' + str(m) + ').cnf'
-    with open(filename, 'w') as file:    
-#        cnf = []
-        allRPH_range, _ = allHospitalsResponsiveProfiles()
-        allPH = len(allRPH_range)
-        allPI = len(allInternsProfiles())
-        allPQ = len(allHospitalsCapacities())
-        for p_H_1 in allRPH_range:
-            for p_q in allHospitalsCapacities():
-                for p_I in allInternsProfiles():
-                    for h in allHospitalsIndices():
-                        for g1 in allInternGroupsIndices():
-                            for g2 in internGroupsIndices(lambda g2 : hospitalsPrefers_R(h, indexToGroup(g1), indexToGroup(g2), p_H_1)):
-                                for p_H_2 in iVariantsForHospitals_R(h, p_H_1):
-                                    file.write(str(negLiteral(p_H_1, p_I, p_q, h, g2, allPH, allPI, allPQ)) + ' ' + str(negLiteral(p_H_2, p_I, p_q, h, g1, allPH, allPI, allPQ)) + '\n')
-#                                    cnf.append([negLiteral(p_H_1, p_I, p_q, h, g2, allPH, allPI, allPQ), negLiteral(p_H_2, p_I, p_q, h, g1, allPH, allPI, allPQ)])
-#        return cnf
-
-def cnfStrategyProofForCapacities():  # CNF stating that the matching mechanism is strategy-proof for capacities
-    filename = './data/strategyProofForCapacities' + '(' + str(n) + '_' + str(m) + ').cnf'
-    with open(filename, 'w') as file:    
-#        cnf = []
-        allRPH_range, _ = allHospitalsResponsiveProfiles()
-        allPH = len(allRPH_range)
-        allPI = len(allInternsProfiles())
-        allPQ = len(allHospitalsCapacities())
-        for p_H in allRPH_range:
-            for p_q_1 in allHospitalsCapacities():
-                for p_I in allInternsProfiles():
-                    for h in allHospitalsIndices():
-                        for p_q_2 in iVariantsForCapacities(h, p_q_1):
-                            for g1 in allInternGroupsIndices():
-                                for g2 in internGroupsIndices(lambda g2 : hospitalsPrefers_R(h, indexToGroup(g1), indexToGroup(g2), p_H)):
-                                    file.write(str(negLiteral(p_H, p_I, p_q_1, h, g2, allPH, allPI, allPQ)) + ' ' + str(negLiteral(p_H, p_I, p_q_2, h, g1, allPH, allPI, allPQ)) + '\n')
-#                                    cnf.append([negLiteral(p_H, p_I, p_q_1, h, g2, allPH, allPI, allPQ), negLiteral(p_H, p_I, p_q_2, h, g1, allPH, allPI, allPQ)])
-#        return cnf
-
-def cnfStrategyProofForInternsTruncation():  # CNF stating that the matching mechanism is strategy-proof for intern's truncation
-    filename = './data/strategyProofForInternsTruncation' + '(' + str(n) + '_' + str(m) + ').cnf'
-    with open(filename, 'w') as file:    
-#        cnf = []
-        allRPH_range, _ = allHospitalsResponsiveProfiles()
-        allPH = len(allRPH_range)
-        allPI = len(allInternsProfiles())
-        allPQ = len(allHospitalsCapacities())
-        for p_H in allRPH_range:
-            for p_q in allHospitalsCapacities():
-                for p_I_1 in allInternsProfiles():
-                    for h1 in allHospitalsIndices():
-                        for i in allInternsIndices():
-                            for p_I_2 in iTruncationVariantsForInterns(i, p_I_1):
-                                for h2 in hospitalsIndices(lambda h2 : internsPrefers(i, h1, h2, p_I_1)):
-                                    for g in internGroupsIndices(lambda g : inGroup(i, g)):
-                                        file.write(str(negLiteral(p_H, p_I_1, p_q, h2, g, allPH, allPI, allPQ)) + ' ' + str(negLiteral(p_H, p_I_2, p_q, h1, g, allPH, allPI, allPQ)) + '\n')
-#                                        cnf.append([negLiteral(p_H, p_I_1, p_q, h2, g, allPH, allPI, allPQ), negLiteral(p_H, p_I_2, p_q, h1, g, allPH, allPI, allPQ)])
-#        return cnf
-
-def cnfStrategyProofForInternsDropping():  # CNF stating that the matching mechanism is strategy-proof for intern's dropping
-    filename = './data/strategyProofForInternsDropping' + '(' + str(n) + '_' + str(m) + ').cnf'
-    with open(filename, 'w') as file:    
-#        cnf = []
-        allRPH_range, _ = allHospitalsResponsiveProfiles()
-        allPH = len(allRPH_range)
-        allPI = len(allInternsProfiles())
-        allPQ = len(allHospitalsCapacities())
-        for p_H in allRPH_range:
-            for p_q in allHospitalsCapacities():
-                for p_I_1 in allInternsProfiles():
-                    for h1 in allHospitalsIndices():
-                        for i in allInternsIndices():
-                            for p_I_2 in iDroppingVariantsForInterns(i, p_I_1):
-                                for h2 in hospitalsIndices(lambda h2 : internsPrefers(i, h1, h2, p_I_1)):
-                                    for g in internGroupsIndices(lambda g : inGroup(i, g)):
-                                        file.write(str(negLiteral(p_H, p_I_1, p_q, h2, g, allPH, allPI, allPQ)) + ' ' + str(negLiteral(p_H, p_I_2, p_q, h1, g, allPH, allPI, allPQ)) + '\n')
-#                                        cnf.append([negLiteral(p_H, p_I_1, p_q, h2, g, allPH, allPI, allPQ), negLiteral(p_H, p_I_2, p_q, h1, g, allPH, allPI, allPQ)])
-#        return cnf
-
-def cnfStrategyProofForHospitalsTruncation():  # CNF stating that the matching mechanism is strategy-proof for hospital's truncation
-    filename = './data/strategyProofForHospitalsTruncation' + '(' + str(n) + '_' + str(m) + ').cnf'
-    with open(filename, 'w') as file:    
-#        cnf = []
-        allRPH_range, _ = allHospitalsResponsiveProfiles()
-        allPH = len(allRPH_range)
-        allPI = len(allInternsProfiles())
-        allPQ = len(allHospitalsCapacities())
-        for p_H_1 in allRPH_range:
-            for p_q in allHospitalsCapacities():
-                for p_I in allInternsProfiles():
-                    for h in allHospitalsIndices():
-                        for g1 in allInternGroupsIndices():
-                            for g2 in internGroupsIndices(lambda g2 : hospitalsPrefers_R(h, indexToGroup(g1), indexToGroup(g2), p_H_1)):
-                                for p_H_2 in iTruncationVariantsForHospitals(h, p_H_1):
-                                    file.write(str(negLiteral(p_H_1, p_I, p_q, h, g2, allPH, allPI, allPQ)) + ' ' + str(negLiteral(p_H_2, p_I, p_q, h, g1, allPH, allPI, allPQ)) + '\n')
-#                                    cnf.append([negLiteral(p_H_1, p_I, p_q, h, g2, allPH, allPI, allPQ), negLiteral(p_H_2, p_I, p_q, h, g1, allPH, allPI, allPQ)])
-#        return cnf
-
-def cnfStrategyProofForHospitalsDropping():  # CNF stating that the matching mechanism is strategy-proof for hospital's dropping
-    filename = './data/strategyProofForInternsDropping' + '(' + str(n) + '_' + str(m) + ').cnf'
-    with open(filename, 'w') as file:    
-#        cnf = []
-        allRPH_range, _ = allHospitalsResponsiveProfiles()
-        allPH = len(allRPH_range)
-        allPI = len(allInternsProfiles())
-        allPQ = len(allHospitalsCapacities())
-        for p_H_1 in allRPH_range:
-            for p_q in allHospitalsCapacities():
-                for p_I in allInternsProfiles():
-                    for h in allHospitalsIndices():
-                        for g1 in allInternGroupsIndices():
-                            for g2 in internGroupsIndices(lambda g2 : hospitalsPrefers_R(h, indexToGroup(g1), indexToGroup(g2), p_H_1)):
-                                for p_H_2 in iDroppingVariantsForHospitals(h, p_H_1):
-                                    file.write(str(negLiteral(p_H_1, p_I, p_q, h, g2, allPH, allPI, allPQ)) + ' ' + str(negLiteral(p_H_2, p_I, p_q, h, g1, allPH, allPI, allPQ)) + '\n')
-#                                    cnf.append([negLiteral(p_H_1, p_I, p_q, h, g2, allPH, allPI, allPQ), negLiteral(p_H_2, p_I, p_q, h, g1, allPH, allPI, allPQ)])
-#        return cnf
-
-def cnfRespectingImprovements():  # CNF stating that the matching mechanism respects improvements of hospital quality
-    filename = './data/respectingImprovements' + '(' + str(n) + '_' + str(m) + ').cnf'
-    with open(filename, 'w') as file:    
-#        cnf = []
-        allRPH_range, _ = allHospitalsResponsiveProfiles()
-        allPH = len(allRPH_range)
-        allPI = len(allInternsProfiles())
-        allPQ = len(allHospitalsCapacities())
-        for p_H in allRPH_range:
-            for p_q in allHospitalsCapacities():
-                for p_I_2 in allInternsProfiles():
-                    for h in allHospitalsIndices():
-                        for g1 in allInternGroupsIndices():
-                            for g2 in internGroupsIndices(lambda g2 : hospitalsPrefers_R(h, indexToGroup(g2), indexToGroup(g1), p_H)):
-                                for p_I_1 in variants_ImprovementForHospital(p_I_2, h):
-                                    file.write(str(negLiteral(p_H, p_I_1, p_q, h, g1, allPH, allPI, allPQ)) + ' ' + str(negLiteral(p_H, p_I_2, p_q, h, g2, allPH, allPI, allPQ)) + '\n')
-#                                    cnf.append([negLiteral(p_H, p_I_1, p_q, h, g1, allPH, allPI, allPQ), negLiteral(p_H, p_I_2, p_q, h, g2, allPH, allPI, allPQ)])
-#        return cnf
\ No newline at end of file
+SOLVERS = ('pycosat', 'pysat', 'kissat', 'cadical', 'minisat', 'python')  # the backends of solveClauses, in the order they are tried
+PYTHON_SOLVER_LIMIT = 2000000  # the largest number of literals solveClauses and incrementalSolver give to the pure-Python solver when no other backend is available
+NO_SOLVER = 'no SAT solver available for a CNF this large: install pycosat or python-sat, or put one of kissat, cadical, minisat on PATH'
+
+class Solution:  # the answer of a SAT solver, with the model mapped back to the variables of posLiteral
+    def __init__(self, status, model, solver, nvars, nclauses, encodeTime=0.0, solveTime=0.0):
+        self.status = status  # 'SAT' or 'UNSAT'
+        self.model = model  # the literals of the variables of the CNF, in the original numbering; None when UNSAT
+        self.solver = solver
+        self.nvars = nvars
+        self.nclauses = nclauses
+        self.encodeTime = encodeTime
+        self.solveTime = solveTime
+
+    def __bool__(self):
+        return self.status == 'SAT'
+
+    def __repr__(self):
+        return 'Solution(' + self.status + ', solver=' + self.solver + ', variables=' + str(self.nvars) + ', clauses=' + str(self.nclauses) + ', time=' + str(round(self.encodeTime + self.solveTime, 2)) + ')'
+
+    def trueVariables(self):  # return the original variables set true by the model, in increasing order
+        return sorted(x for x in self.model if x > 0) if self.model is not None else []
+
+def _solverAvailable(name):
+    if name == 'python':
+        return True
+    if name == 'pycosat':
+        try:
+            import pycosat
+        except ImportError:
+            return False
+        return True
+    if name == 'pysat':
+        try:
+            import pysat.solvers
+        except ImportError:
+            return False
+        return True
+    return shutil.which(name) is not None
+
+def availableSolvers():  # return the backends of SOLVERS usable here
+    return [name for name in SOLVERS if _solverAvailable(name)]
+
+def _solvePycosat(nvars, clauses):
+    import pycosat
+    model = pycosat.solve(clauses, vars=nvars)
+    return (None if model == 'UNSAT' else model)
+
+def _solvePysat(nvars, clauses):
+    from pysat.solvers import Solver
+    with Solver(bootstrap_with=clauses) as s:
+        return s.get_model() if s.solve() else None
+
+def _solveBinary(name, nvars, clauses):  # run a solver binary on a temporary DIMACS file; minisat writes its answer to a file, kissat and cadical print it in the competition format
+    import subprocess
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        cnfName = os.path.join(tmp, 'problem.cnf')
+        with open(cnfName, 'w') as file:
+            file.write('p cnf ' + str(nvars) + ' ' + str(len(clauses)) + '\n')
+            file.write(''.join([' '.join(map(str, c)) + ' 0\n' for c in clauses]))
+        if name == 'minisat':
+            outName = os.path.join(tmp, 'model')
+            subprocess.run([name, cnfName, outName], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            with open(outName, 'r') as file:
+                lines = file.read().split('\n')
+            if lines[0] != 'SAT':
+                if lines[0] != 'UNSAT':
+                    raise RuntimeError(name + ' did not solve the CNF')
+                return None
+            return [int(x) for x in lines[1].split() if x != '0']
+        output = subprocess.run([name, cnfName], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout
+        model = []
+        status = None
+        for line in output.split('\n'):
+            if line.startswith('s '):
+                status = line[2:].strip()
+            elif line.startswith('v '):
+                model.extend(int(x) for x in line[2:].split() if x != '0')
+        if status not in ('SATISFIABLE', 'UNSATISFIABLE'):
+            raise RuntimeError(name + ' did not solve the CNF')
+        return model if status == 'SATISFIABLE' else None
+
+def _solvePython(nvars, clauses):
+    solver = CDCL(nvars)
+    for c in clauses:
+        solver.addClause(c)
+    return solver.model() if solver.solve() else None
+
+def solveClauses(nvars, clauses, solver=None, renaming=None, encodeTime=0.0):  # solve clauses over the variables 1..nvars with the given backend (default: the first of availableSolvers()), and map the model back through renaming (see loadRenaming)
+    if solver is None:
+        names = [name for name in availableSolvers() if name != 'python']
+        if not names and sum(len(c) for c in clauses) > PYTHON_SOLVER_LIMIT:
+            raise RuntimeError(NO_SOLVER)
+        solver = names[0] if names else 'python'
+    elif solver not in SOLVERS:
+        raise ValueError('unknown SAT solver: ' + str(solver))
+    start = time.time()
+    if solver == 'pycosat':
+        model = _solvePycosat(nvars, clauses)
+    elif solver == 'pysat':
+        model = _solvePysat(nvars, clauses)
+    elif solver == 'python':
+        model = _solvePython(nvars, clauses)
+    else:
+        model = _solveBinary(solver, nvars, clauses)
+    solveTime = time.time() - start
+    if model is None:
+        return Solution('UNSAT', None, solver, nvars, len(clauses), encodeTime, solveTime)
+    values = {abs(x): x > 0 for x in model}
+    if renaming is not None:
+        model = [renaming[k] if values.get(k + 1, False) else -renaming[k] for k in range(nvars)]
+    else:
+        model = [k if values.get(k, False) else -k for k in range(1, nvars + 1)]
+    return Solution('SAT', model, solver, nvars, len(clauses), encodeTime, solveTime)
+
+def readDIMACS(filename):  # return (number of variables, clauses) of a DIMACS file, compressed or not, or of a binary CNF file
+    if filename.endswith(BINARY_SUFFIX):
+        with BinaryCNF(filename) as cnf:
+            return (cnf.nvars, [c.tolist() for c in cnf.clauses()])
+    nvars = 0
+    clauses = []
+    clause = []
+    with openCompressed(filename, 'rb') as raw:
+        for line in (l.decode() for l in raw):
+            if line.startswith('p '):
+                nvars = int(line.split()[2])
+            elif not line.startswith('c'):
+                for literal in line.split():
+                    x = int(literal)
+                    if x == 0:
+                        clauses.append(clause)
+                        clause = []
+                    else:
+                        clause.append(x)
+    return (nvars, clauses)
+
+def solveDIMACS(filename, dictfile=None, solver=None):  # solve a DIMACS file written by saveCNF, mapping the model back through its renaming file dictfile
+    start = time.time()
+    nvars, clauses = readDIMACS(filename)
+    renaming = loadRenaming(dictfile) if dictfile is not None else None
+    return solveClauses(nvars, clauses, solver, renaming, time.time() - start)
+
+class CDCL:  # a small conflict-driven clause learning solver (two watched literals, first UIP learning, VSIDS, phase saving, Luby restarts) for the markets too small to need a real one
+    def __init__(self, nvars, limit=None):
+        self.nvars = nvars
+        self.limit = limit  # the most literals addClause accepts, see PYTHON_SOLVER_LIMIT
+        self.literals = 0
+        self.clauses = []
+        self.watches = [[] for _ in range(2 * nvars + 2)]  # literal code -> the clauses watching it; the code of x is 2x, of -x is 2x+1
+        self.value = [0] * (2 * nvars + 2)  # literal code -> 1 true, -1 false, 0 unassigned
+        self.level = [0] * (nvars + 1)
+        self.reason = [None] * (nvars + 1)
+        self.phase = [1] * (nvars + 1)  # 1: decide the variable false first, as most variables of a matching are
+        self.activity = [0.0] * (nvars + 1)
+        self.bump = 1.0
+        self.heap = [(0.0, v) for v in range(1, nvars + 1)]
+        self.trail = []
+        self.limits = []  # decision level -> its first position in the trail
+        self.qhead = 0
+        self.ok = True
+        self.conflicts = 0
+        self.failed = []
+
+    def addClause(self, clause):  # add a clause of nonzero literals
+        self.literals += len(clause)
+        if self.limit is not None and self.literals > self.limit:
+            raise RuntimeError(NO_SOLVER)
+        self.backjump(0)
+        lits = []
+        for x in clause:
+            l = 2 * x if x > 0 else -2 * x + 1
+            if l ^ 1 in lits or self.value[l] == 1:
+                return
+            if l not in lits and self.value[l] == 0:
+                lits.append(l)
+        if not lits:
+            self.ok = False
+        elif len(lits) == 1:
+            self.assign(lits[0], None)
+            self.ok = self.ok and self.propagate() is None
+        else:
+            self.clauses.append(lits)
+            self.watches[lits[0]].append(lits)
+            self.watches[lits[1]].append(lits)
+
+    def assign(self, l, reason):
+        self.value[l] = 1
+        self.value[l ^ 1] = -1
+        self.level[l >> 1] = len(self.limits)
+        self.reason[l >> 1] = reason
+        self.trail.append(l)
+
+    def propagate(self):  # return a falsified clause, or None when the assignment is closed under unit propagation
+        value = self.value
+        watches = self.watches
+        while self.qhead < len(self.trail):
+            false = self.trail[self.qhead] ^ 1
+            self.qhead += 1
+            ws = watches[false]
+            kept = []
+            for k in range(len(ws)):
+                c = ws[k]
+                if c[0] == false:
+                    c[0], c[1] = c[1], false
+                if value[c[0]] == 1:
+                    kept.append(c)
+                    continue
+                for j in range(2, len(c)):
+                    if value[c[j]] != -1:
+                        c[1], c[j] = c[j], false
+                        watches[c[1]].append(c)
+                        break
+                else:
+                    kept.append(c)
+                    if value[c[0]] == -1:
+                        kept.extend(ws[k+1:])
+                        watches[false] = kept
+                        self.qhead = len(self.trail)
+                        return c
+                    self.assign(c[0], c)
+            watches[false] = kept
+        return None
+
+    def analyze(self, conflict):  # return (the first UIP clause learnt from conflict, its asserting literal first; the level to backjump to)
+        seen = set()
+        learnt = [None]
+        counter = 0
+        current = len(self.limits)
+        lits = conflict
+        index = len(self.trail)
+        l = None
+        while True:
+            for q in (lits if l is None else lits[1:]):
+                v = q >> 1
+                if v not in seen and self.level[v] > 0:
+                    seen.add(v)
+                    self.activity[v] += self.bump
+                    heapq.heappush(self.heap, (-self.activity[v], v))
+                    if self.level[v] == current:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+            while True:
+                index -= 1
+                l = self.trail[index]
+                if l >> 1 in seen:
+                    break
+            counter -= 1
+            if counter == 0:
+                break
+            lits = self.reason[l >> 1]
+        learnt[0] = l ^ 1
+        if self.activity[l >> 1] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.bump *= 1e-100
+            self.heap = [(-self.activity[v], v) for v in range(1, self.nvars + 1) if self.value[2 * v] == 0]
+            heapq.heapify(self.heap)
+        self.bump /= 0.95
+        if len(learnt) == 1:
+            return (learnt, 0)
+        k = max(range(1, len(learnt)), key=lambda k: self.level[learnt[k] >> 1])
+        learnt[1], learnt[k] = learnt[k], learnt[1]
+        return (learnt, self.level[learnt[1] >> 1])
+
+    def backjump(self, level):
+        if len(self.limits) <= level:
+            return
+        for l in self.trail[self.limits[level]:]:
+            v = l >> 1
+            self.phase[v] = l & 1
+            self.value[l] = self.value[l ^ 1] = 0
+            self.reason[v] = None
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[self.limits[level]:]
+        del self.limits[level:]
+        self.qhead = len(self.trail)
+
+    def decide(self):  # return the literal of the next decision, or None when every variable is assigned
+        while self.heap:
+            _, v = heapq.heappop(self.heap)
+            if self.value[2 * v] == 0:
+                return 2 * v + self.phase[v]
+        return None
+
+    def solve(self, assumptions=()):  # return whether the clauses are satisfiable with the literals assumptions true; the clauses learnt are kept for the next call
+        self.failed = []
+        if not self.ok:
+            return False
+        self.backjump(0)
+        assumed = [2 * x if x > 0 else -2 * x + 1 for x in assumptions]
+        restart = 0
+        budget = 100
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                if not self.limits:
+                    self.ok = False
+                    return False
+                learnt, level = self.analyze(conflict)
+                self.backjump(level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.clauses.append(learnt)
+                    self.watches[learnt[0]].append(learnt)
+                    self.watches[learnt[1]].append(learnt)
+                    self.assign(learnt[0], learnt)
+                budget -= 1
+            elif budget <= 0:
+                restart += 1
+                budget = 100 * _luby(restart)
+                self.backjump(0)
+            elif len(self.limits) < len(assumed):
+                l = assumed[len(self.limits)]
+                if self.value[l] == -1:
+                    self.failed = self.analyzeFinal(l)
+                    return False
+                self.limits.append(len(self.trail))
+                if self.value[l] == 0:
+                    self.assign(l, None)
+            else:
+                l = self.decide()
+                if l is None:
+                    return True
+                self.limits.append(len(self.trail))
+                self.assign(l, None)
+
+    def analyzeFinal(self, l):  # return the assumptions, l among them, that imply the negation of the assumption l
+        failed = [l]
+        seen = set([l >> 1])
+        for q in reversed(self.trail[self.limits[0]:] if self.limits else []):
+            v = q >> 1
+            if v in seen:
+                if self.reason[v] is None:
+                    failed.append(q)
+                else:
+                    seen.update(x >> 1 for x in self.reason[v][1:] if self.level[x >> 1] > 0)
+        return [x >> 1 if x & 1 == 0 else -(x >> 1) for x in failed]
+
+    def model(self):  # the literals of the last satisfying assignment
+        return [v if self.value[2 * v] == 1 else -v for v in range(1, self.nvars + 1)]
+
+    def core(self):  # the assumptions of the last unsatisfiable call which are already unsatisfiable together
+        return self.failed
+
+class _PysatSolver:  # a python-sat solver behind the interface of CDCL
+    def __init__(self, nvars):
+        from pysat.solvers import Solver
+        self.nvars = nvars
+        self.solver = Solver()
+
+    def addClause(self, clause):
+        self.solver.add_clause(clause)
+
+    def solve(self, assumptions=()):
+        return self.solver.solve(assumptions=list(assumptions))
+
+    def model(self):
+        values = {abs(x): x for x in self.solver.get_model()}
+        return [values.get(v, -v) for v in range(1, self.nvars + 1)]
+
+    def core(self):
+        return list(self.solver.get_core())
+
+class _RestartingSolver:  # a solver without incremental interface behind the interface of CDCL: every call solves the clauses again with the assumptions as units, and the whole assumptions are the core
+    def __init__(self, nvars, solver):
+        self.nvars = nvars
+        self.solver = solver
+        self.clauses = []
+        self.answer = None
+
+    def addClause(self, clause):
+        self.clauses.append(list(clause))
+
+    def solve(self, assumptions=()):
+        self.assumptions = list(assumptions)
+        self.answer = solveClauses(self.nvars, self.clauses + [[x] for x in self.assumptions], self.solver)
+        return bool(self.answer)
+
+    def model(self):
+        return self.answer.model
+
+    def core(self):
+        return self.assumptions
+
+def incrementalSolver(nvars, solver=None):  # return a solver over the variables 1..nvars with addClause(clause), solve(assumptions), model() and core(), keeping what it learnt between calls when the backend allows it
+    if solver is None:
+        names = availableSolvers()
+        solver = 'pysat' if 'pysat' in names else names[0]
+        if solver == 'python':  # the same limit as solveClauses when nothing else is available
+            return CDCL(nvars, PYTHON_SOLVER_LIMIT)
+    if solver == 'python':
+        return CDCL(nvars)
+    if solver == 'pysat':
+        return _PysatSolver(nvars)
+    if solver not in SOLVERS:
+        raise ValueError('unknown SAT solver: ' + str(solver))
+    return _RestartingSolver(nvars, solver)
+
+def printLattice(results):  # print the maximal satisfiable and the minimal unsatisfiable sets of axioms of a Market.sweep
+    sat = [s for s, ok in results.items() if ok and not any(ok2 and s < s2 for s2, ok2 in results.items())]
+    unsat = [s for s, ok in results.items() if not ok and not any(not ok2 and s2 < s for s2, ok2 in results.items())]
+    for s in sorted(sat, key=lambda s: (-len(s), sorted(s))):
+        print('SAT   ' + ' + '.join(sorted(s)))
+    for s in sorted(unsat, key=lambda s: (len(s), sorted(s))):
+        print('UNSAT ' + ' + '.join(sorted(s)))
+
+def _luby(k):  # the k-th term (from 0) of the Luby sequence 1 1 2 1 1 2 4 ...
+    size, seq = 1, 0
+    while size < k + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != k:
+        size = (size - 1) >> 1
+        seq -= 1
+        k = k % size
+    return 2 ** seq
+
+
+# every method of Market is also available as a module-level function working on the current market
+def _forward(name):
+    def f(*args, **kwargs):
+        return getattr(_market, name)(*args, **kwargs)
+    f.__name__ = name
+    f.__qualname__ = name
+    return f
+
+for _name, _method in inspect.getmembers(Market, inspect.isfunction):
+    if not _name.startswith('_') and _name != 'getDimension':
+        globals()[_name] = _forward(_name)